@@ -0,0 +1,54 @@
+# app/core/calculation_export.py
+"""
+Streaming export of calculations as NDJSON or CSV.
+
+The generator owns its database session: a StreamingResponse body keeps
+running after the route has returned, so it cannot rely on the request's
+get_async_db session.
+"""
+import csv
+import io
+from typing import AsyncIterator, Optional
+
+from pydantic_core import to_json
+
+from app.crud.calculation import READ_COLUMNS, stream_calculation_partitions
+from app.db.session import AsyncSessionLocal
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def export_calculations(
+    fmt: str,
+    type_: Optional[str] = None,
+    min_id: Optional[int] = None,
+    max_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Yield one text chunk per cursor partition. Only user_id's rows are
+    exported (the rows without an owner when None).
+    """
+    async with AsyncSessionLocal() as db:
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(READ_COLUMNS)
+            yield buf.getvalue()
+
+        async for rows in stream_calculation_partitions(
+            db, type_, min_id, max_id, user_id=user_id, owner_only=True
+        ):
+            if fmt == "csv":
+                buf = io.StringIO()
+                csv.writer(buf).writerows(rows)
+                yield buf.getvalue()
+            else:
+                # inf/nan -> null: Infinity/NaN are not valid JSON
+                yield "".join(
+                    to_json(dict(zip(READ_COLUMNS, row)), inf_nan_mode="null").decode() + "\n"
+                    for row in rows
+                )
@@ -1,98 +1,258 @@
 # app/core/calculation_factory.py
 from abc import ABC, abstractmethod
+from importlib.metadata import entry_points
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type
 import math
+import os
+
+# Per-row outcome of a batch: results[i] is None exactly when errors[i] is set.
+BatchOutcome = Tuple[List[Optional[float]], List[Optional[str]]]
+
+# Admission budget: the largest estimated result (in bits) we agree to compute.
+# Results are stored in a Float column, so ~1024 bits is the useful ceiling.
+MAX_RESULT_BITS = float(os.getenv("CALC_MAX_RESULT_BITS", "1024"))
+
+
+class CalculationTooExpensive(ValueError):
+    """Raised when an operation's estimated cost exceeds MAX_RESULT_BITS."""
 
 
 # ----------------------------
 # Base class for all operations
 # ----------------------------
 class BaseOperation(ABC):
+    """
+    Operations are stateless: the registry builds one instance per type
+    and shares it between all requests.
+    """
+
+    # Expensive operations have a result size that grows with the operands.
+    # They implement estimate_cost and are admission-checked.
+    expensive: bool = False
+    # Heavy operations also do CPU work that grows with the operands
+    # (big-integer math), so they run on the heavy lane when it is enabled
+    heavy: bool = False
+
+    def estimate_cost(self, a: float, b: float) -> float:
+        """Estimated bit-length of the result; constant for cheap operations."""
+        return 0.0
+
+    def validate(self, a: float, b: float) -> None:
+        """Raise ValueError if (a, b) is outside the operation's domain."""
+        return None
+
     @abstractmethod
     def compute(self, a: float, b: float) -> float:
         """Compute the result of the operation."""
         pass
 
+    def compute_batch(
+        self, a_values: Sequence[float], b_values: Sequence[float]
+    ) -> BatchOutcome:
+        """
+        Compute the operation over whole columns of operands.
+        Domain errors are reported per row instead of aborting the batch.
+        Operations without domain checks override this with a tight loop.
+        """
+        results: List[Optional[float]] = []
+        errors: List[Optional[str]] = []
+        for a, b in zip(a_values, b_values):
+            try:
+                results.append(self.compute(a, b))
+                errors.append(None)
+            except (ValueError, OverflowError) as e:
+                results.append(None)
+                errors.append(str(e))
+        return results, errors
+
+
+# ----------------------------
+# Operation registry
+# ----------------------------
+# calc type -> shared operation instance. This is the single source of truth
+# for which types exist (the schemas and the API read it too).
+OPERATION_REGISTRY: Dict[str, BaseOperation] = {}
+
+# Third-party packages can ship operations under this entry point group,
+# pointing at a BaseOperation subclass; the entry point name is the type.
+OPERATION_ENTRY_POINT_GROUP = "app.calculations.operations"
+
+
+def register_operation(name: str) -> Callable[[Type[BaseOperation]], Type[BaseOperation]]:
+    """Class decorator that instantiates the operation once and registers it."""
+
+    def decorator(cls: Type[BaseOperation]) -> Type[BaseOperation]:
+        calc_type = name.lower()
+        if calc_type in OPERATION_REGISTRY:
+            raise ValueError(f"Calculation type already registered: {calc_type}")
+        OPERATION_REGISTRY[calc_type] = cls()
+        return cls
+
+    return decorator
+
+
+def load_operation_plugins() -> None:
+    """Register operations advertised through entry points (skips known types)."""
+    for ep in entry_points(group=OPERATION_ENTRY_POINT_GROUP):
+        if ep.name.lower() in OPERATION_REGISTRY:
+            continue
+        register_operation(ep.name)(ep.load())
+
 
 # ----------------------------
 # Concrete Basic Operations
 # ----------------------------
+@register_operation("add")
 class AddOperation(BaseOperation):
     def compute(self, a: float, b: float) -> float:
         return a + b
 
+    def compute_batch(self, a_values, b_values) -> BatchOutcome:
+        return [a + b for a, b in zip(a_values, b_values)], [None] * len(a_values)
 
+
+@register_operation("sub")
 class SubOperation(BaseOperation):
     def compute(self, a: float, b: float) -> float:
         return a - b
 
+    def compute_batch(self, a_values, b_values) -> BatchOutcome:
+        return [a - b for a, b in zip(a_values, b_values)], [None] * len(a_values)
+
 
+@register_operation("mul")
 class MulOperation(BaseOperation):
     def compute(self, a: float, b: float) -> float:
         return a * b
 
+    def compute_batch(self, a_values, b_values) -> BatchOutcome:
+        return [a * b for a, b in zip(a_values, b_values)], [None] * len(a_values)
 
+
+@register_operation("div")
 class DivOperation(BaseOperation):
-    def compute(self, a: float, b: float) -> float:
+    def validate(self, a: float, b: float) -> None:
         if b == 0:
             raise ValueError("Division by zero is not allowed.")
+
+    def compute(self, a: float, b: float) -> float:
+        self.validate(a, b)
         return a / b
 
 
 # ----------------------------
 # Concrete Advanced Operations
 # ----------------------------
+@register_operation("power")
 class PowerOperation(BaseOperation):
+    # Float operands: a ** b is O(1) (it overflows rather than growing), so
+    # power is budget-checked but not heavy
+    expensive = True
+
+    def estimate_cost(self, a: float, b: float) -> float:
+        # |a ** b| ~ 2 ** (b * log2|a|); only growth (not shrinkage) costs bits
+        if a == 0 or abs(a) == 1:
+            return 0.0
+        return max(0.0, b * math.log2(abs(a)))
+
+    def validate(self, a: float, b: float) -> None:
+        if a < 0 and int(b) != b:
+            raise ValueError("Power of a negative base needs an integer exponent.")
+        if a == 0 and b < 0:
+            raise ValueError("Zero cannot be raised to a negative power.")
+
     def compute(self, a: float, b: float) -> float:
-        return a ** b
+        self.validate(a, b)
+        result = a ** b
+        if isinstance(result, complex):
+            raise ValueError("Power result is not a real number.")
+        return result
 
 
+@register_operation("mod")
 class ModOperation(BaseOperation):
-    def compute(self, a: float, b: float) -> float:
+    def validate(self, a: float, b: float) -> None:
         if b == 0:
             raise ValueError("Modulus by zero is not allowed.")
+
+    def compute(self, a: float, b: float) -> float:
+        self.validate(a, b)
         return a % b
 
 
+@register_operation("floordiv")
 class FloorDivOperation(BaseOperation):
-    def compute(self, a: float, b: float) -> float:
+    def validate(self, a: float, b: float) -> None:
         if b == 0:
             raise ValueError("Floor division by zero is not allowed.")
+
+    def compute(self, a: float, b: float) -> float:
+        self.validate(a, b)
         return a // b
 
 
+@register_operation("sqrt")
 class SqrtOperation(BaseOperation):
-    def compute(self, a: float, b: float) -> float:
+    def validate(self, a: float, b: float) -> None:
         # b is ignored; kept for consistent interface
         if a < 0:
             raise ValueError("Square root of negative number is not allowed.")
+
+    def compute(self, a: float, b: float) -> float:
+        self.validate(a, b)
         return math.sqrt(a)
 
 
+@register_operation("log")
 class LogOperation(BaseOperation):
-    def compute(self, a: float, b: float) -> float:
+    def validate(self, a: float, b: float) -> None:
         """
-        Compute logarithm of a with base b: log_b(a).
+        Logarithm of a with base b: log_b(a).
         a must be > 0, b must be > 0 and != 1.
         """
         if a <= 0:
             raise ValueError("Logarithm is only defined for a > 0.")
         if b <= 0 or b == 1:
             raise ValueError("Logarithm base must be > 0 and != 1.")
+
+    def compute(self, a: float, b: float) -> float:
+        self.validate(a, b)
         return math.log(a, b)
 
 
+@register_operation("factorial")
 class FactorialOperation(BaseOperation):
-    def compute(self, a: float, b: float) -> float:
+    expensive = True
+    heavy = True
+
+    def estimate_cost(self, a: float, b: float) -> float:
+        # log2(n!) via lgamma, without computing n!
+        if a < 0:
+            return 0.0
+        try:
+            return math.lgamma(a + 1) / math.log(2)
+        except OverflowError:
+            # a is so big that even log2(a!) is not a float
+            return math.inf
+
+    def validate(self, a: float, b: float) -> None:
         # b is ignored; factorial only uses a
         if a < 0 or int(a) != a:
             raise ValueError("Factorial is only defined for non-negative integers.")
+
+    def compute(self, a: float, b: float) -> float:
+        self.validate(a, b)
         return math.factorial(int(a))
 
 
+@register_operation("absdiff")
 class AbsDiffOperation(BaseOperation):
     def compute(self, a: float, b: float) -> float:
         return abs(a - b)
 
+    def compute_batch(self, a_values, b_values) -> BatchOutcome:
+        return [abs(a - b) for a, b in zip(a_values, b_values)], [None] * len(a_values)
+
 
 # ----------------------------
 # Factory Class
@@ -100,42 +260,91 @@ class AbsDiffOperation(BaseOperation):
 class CalculationFactory:
     @staticmethod
     def get_operation(calc_type: str) -> BaseOperation:
-        calc_type = calc_type.lower()
-
-        if calc_type == "add":
-            return AddOperation()
-        elif calc_type == "sub":
-            return SubOperation()
-        elif calc_type == "mul":
-            return MulOperation()
-        elif calc_type == "div":
-            return DivOperation()
-        elif calc_type == "power":
-            return PowerOperation()
-        elif calc_type == "mod":
-            return ModOperation()
-        elif calc_type == "floordiv":
-            return FloorDivOperation()
-        elif calc_type == "sqrt":
-            return SqrtOperation()
-        elif calc_type == "log":
-            return LogOperation()
-        elif calc_type == "factorial":
-            return FactorialOperation()
-        elif calc_type == "absdiff":
-            return AbsDiffOperation()
-        else:
+        operation = OPERATION_REGISTRY.get(calc_type.lower())
+        if operation is None:
             raise ValueError(f"Invalid calculation type: {calc_type}")
+        return operation
+
+    @staticmethod
+    def available_types() -> List[str]:
+        return sorted(OPERATION_REGISTRY)
+
+
+load_operation_plugins()
 
 
 # ----------------------------
-# Helper function
+# Helper functions
 # ----------------------------
+def check_cost(operation: BaseOperation, a: float, b: float) -> None:
+    """Reject expensive operations whose estimated result exceeds the budget."""
+    if not operation.expensive:
+        return
+    cost = operation.estimate_cost(a, b)
+    if cost > MAX_RESULT_BITS:
+        raise CalculationTooExpensive(
+            f"Estimated result size of {cost:.0f} bits exceeds the limit of "
+            f"{MAX_RESULT_BITS:.0f} bits."
+        )
+
+
 def perform_calculation(a: float, b: float, calc_type: str) -> float:
     """
     Simple helper that:
     1. Gets the correct operation class using the factory
-    2. Computes the result
+    2. Checks the operands against the cost budget
+    3. Computes the result
     """
     operation = CalculationFactory.get_operation(calc_type)
+    check_cost(operation, a, b)
     return operation.compute(a, b)
+
+
+def perform_calculation_batch(
+    a_array: Sequence[float],
+    b_array: Sequence[float],
+    types: Sequence[str],
+) -> BatchOutcome:
+    """
+    Batch counterpart of perform_calculation:
+    1. Groups row indexes by operation type
+    2. Resolves each operation once and computes its whole group column-wise
+    3. Scatters results/errors back into input order
+    """
+    if not (len(a_array) == len(b_array) == len(types)):
+        raise ValueError("a_array, b_array and types must have the same length.")
+
+    groups: dict[str, List[int]] = {}
+    for i, calc_type in enumerate(types):
+        groups.setdefault(calc_type.lower(), []).append(i)
+
+    results: List[Optional[float]] = [None] * len(types)
+    errors: List[Optional[str]] = [None] * len(types)
+
+    for calc_type, indexes in groups.items():
+        try:
+            operation = CalculationFactory.get_operation(calc_type)
+        except ValueError as e:
+            for i in indexes:
+                errors[i] = str(e)
+            continue
+
+        if operation.expensive:
+            admitted = []
+            for i in indexes:
+                try:
+                    check_cost(operation, a_array[i], b_array[i])
+                    admitted.append(i)
+                except CalculationTooExpensive as e:
+                    errors[i] = str(e)
+            indexes = admitted
+
+        group_results, group_errors = operation.compute_batch(
+            [a_array[i] for i in indexes],
+            [b_array[i] for i in indexes],
+        )
+        for i, result, error in zip(indexes, group_results, group_errors):
+            results[i] = result
+            errors[i] = error
+
+    return results, errors
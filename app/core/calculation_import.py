@@ -0,0 +1,172 @@
+# app/core/calculation_import.py
+"""
+Streaming bulk import of calculations from NDJSON or CSV.
+
+The request body is consumed line by line; rows are validated with the same
+rules as CalculationCreate, computed chunk-wise with perform_calculation_batch
+and written with copy_calculations_async (COPY on PostgreSQL). Memory stays bounded
+by the chunk size and the number of rejects we report, whatever the upload
+size.
+"""
+import csv
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.calculation_factory import (
+    BatchOutcome,
+    perform_calculation,
+    perform_calculation_batch,
+)
+from app.crud.calculation import copy_calculations_async
+from app.schemas.calculation import (
+    CalculationCreate,
+    CalculationImportReject,
+    CalculationImportSummary,
+)
+
+IMPORT_CHUNK_SIZE = 5_000
+MAX_LINE_BYTES = 64 * 1024
+# Rejects beyond this are counted but not listed in the summary
+MAX_REPORTED_REJECTS = 1_000
+
+CSV_FIELDS = ("a", "b", "type")
+
+
+class ImportFormatError(ValueError):
+    """The body cannot be read as the requested format at all."""
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without holding more than one line."""
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ImportFormatError(f"Line longer than {MAX_LINE_BYTES} bytes.")
+    if buffer:
+        yield buffer
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(err["msg"] for err in e.errors())
+
+
+def _compute_rows(chunk: List[Tuple[int, CalculationCreate]]) -> BatchOutcome:
+    results: List[Optional[float]] = []
+    errors: List[Optional[str]] = []
+    for _, calc in chunk:
+        try:
+            results.append(perform_calculation(calc.a, calc.b, calc.type))
+            errors.append(None)
+        except (ValueError, OverflowError) as e:
+            results.append(None)
+            errors.append(str(e) or type(e).__name__)
+    return results, errors
+
+
+class CalculationImporter:
+    def __init__(self, db: AsyncSession, fmt: str):
+        self.db = db
+        self.fmt = fmt
+        self.csv_header: Optional[List[str]] = None
+        self.chunk: List[Tuple[int, CalculationCreate]] = []
+        self.accepted = 0
+        self.rejected = 0
+        self.rejects: List[CalculationImportReject] = []
+
+    def _reject(self, line_no: int, error: str) -> None:
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append(CalculationImportReject(line=line_no, error=error))
+
+    def _parse(self, line_no: int, line: bytes) -> Optional[CalculationCreate]:
+        if self.fmt == "ndjson":
+            return CalculationCreate.model_validate_json(line)
+
+        text = line.decode("utf-8").rstrip("\r")
+        values = next(csv.reader([text]))
+        if self.csv_header is None:
+            header = [v.strip().lower() for v in values]
+            if set(header) != set(CSV_FIELDS):
+                raise ImportFormatError("CSV header must contain exactly: a, b, type.")
+            self.csv_header = header
+            return None
+        if len(values) != len(self.csv_header):
+            raise ValueError(f"Expected {len(self.csv_header)} fields, got {len(values)}.")
+        return CalculationCreate.model_validate(dict(zip(self.csv_header, values)))
+
+    async def feed(self, line_no: int, line: bytes) -> None:
+        if not line.strip():
+            return
+        try:
+            calc = self._parse(line_no, line)
+        except ValidationError as e:
+            self._reject(line_no, _validation_message(e))
+            return
+        except ImportFormatError:
+            raise
+        except ValueError as e:  # includes bad UTF-8 and CSV field counts
+            self._reject(line_no, str(e))
+            return
+        if calc is None:
+            return
+
+        self.chunk.append((line_no, calc))
+        if len(self.chunk) >= IMPORT_CHUNK_SIZE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        chunk, self.chunk = self.chunk, []
+        if chunk:
+            await self._write_chunk(chunk)
+
+    async def _write_chunk(self, chunk: List[Tuple[int, CalculationCreate]]) -> None:
+        # A chunk can hold thousands of factorials; keep the math off the event loop
+        try:
+            results, errors = await run_in_threadpool(
+                perform_calculation_batch,
+                [calc.a for _, calc in chunk],
+                [calc.b for _, calc in chunk],
+                [calc.type for _, calc in chunk],
+            )
+        except (ValueError, OverflowError):
+            # Some row's domain error escaped the batch's own handling; redo
+            # the chunk row by row so only that row is rejected
+            results, errors = await run_in_threadpool(_compute_rows, chunk)
+        rows = []
+        for (line_no, calc), result, error in zip(chunk, results, errors):
+            if error is None and isinstance(result, complex):
+                error = "Result is not a real number."
+            if error is not None:
+                self._reject(line_no, error)
+                continue
+            rows.append({"a": calc.a, "b": calc.b, "type": calc.type, "result": result})
+
+        await copy_calculations_async(self.db, rows)
+        self.accepted += len(rows)
+
+    def summary(self) -> CalculationImportSummary:
+        return CalculationImportSummary(
+            accepted=self.accepted,
+            rejected=self.rejected,
+            rejects=self.rejects,
+            rejects_truncated=self.rejected > len(self.rejects),
+        )
+
+
+async def import_calculations(
+    db: AsyncSession, stream: AsyncIterator[bytes], fmt: str
+) -> CalculationImportSummary:
+    importer = CalculationImporter(db, fmt)
+    line_no = 0
+    async for line in iter_lines(stream):
+        line_no += 1
+        await importer.feed(line_no, line)
+    await importer.flush()
+    return importer.summary()
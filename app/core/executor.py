@@ -0,0 +1,182 @@
+# app/core/executor.py
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from app.core.calculation_factory import (
+    CalculationFactory,
+    check_cost,
+    perform_calculation,
+)
+
+# ----------------------------
+# Settings (opt-in)
+# ----------------------------
+PROCESS_POOL_ENABLED = os.getenv("CALC_PROCESS_POOL_ENABLED", "false").lower() in ("1", "true", "yes")
+PROCESS_POOL_WORKERS = int(os.getenv("CALC_PROCESS_POOL_WORKERS", "2"))
+# Calls allowed to wait for a worker on top of the ones being computed
+PROCESS_POOL_MAX_QUEUE = int(os.getenv("CALC_PROCESS_POOL_MAX_QUEUE", "16"))
+PROCESS_POOL_TIMEOUT = float(os.getenv("CALC_PROCESS_POOL_TIMEOUT", "5"))
+
+
+class HeavyLaneBusy(RuntimeError):
+    """The heavy lane already holds its maximum number of calls."""
+
+
+class HeavyLaneTimeout(RuntimeError):
+    """A heavy call did not finish within its timeout."""
+
+
+class HeavyLaneBroken(RuntimeError):
+    """A worker process died; the pool is replaced for the next call."""
+
+
+# ----------------------------
+# Heavy lane
+# ----------------------------
+class HeavyLane:
+    """
+    Bounded ProcessPoolExecutor for heavy operations, so big-integer work
+    runs outside the request threadpool (and outside its GIL).
+
+    A call holds one slot from submit until its future is done; with every
+    slot taken new calls fail fast with HeavyLaneBusy. On timeout the future
+    is cancelled: a call still waiting in the queue is dropped, while one
+    already running finishes in its worker and keeps its slot until then.
+    If a worker dies the pool is broken for every call on it: those fail
+    with HeavyLaneBroken and the next call starts a fresh pool.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, timeout: float):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.broken = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _discard(self, executor: ProcessPoolExecutor) -> HeavyLaneBroken:
+        # Only the broken pool is dropped, not one another call already replaced it with
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.broken += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+        return HeavyLaneBroken("Calculation worker crashed, try again.")
+
+    def _submit(self, a: float, b: float, calc_type: str) -> Tuple[Future, ProcessPoolExecutor]:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HeavyLaneBusy("Too many expensive calculations in progress, try again later.")
+
+        with self._lock:
+            self.in_flight += 1
+        executor = self._get_executor()
+        try:
+            future = executor.submit(perform_calculation, a, b, calc_type)
+        except BrokenProcessPool:
+            self._release(None)
+            raise self._discard(executor)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future, executor
+
+    def _timed_out(self, future: Future) -> HeavyLaneTimeout:
+        future.cancel()
+        with self._lock:
+            self.timeouts += 1
+        return HeavyLaneTimeout("Calculation timed out.")
+
+    def run(self, a: float, b: float, calc_type: str, timeout: Optional[float] = None) -> float:
+        future, executor = self._submit(a, b, calc_type)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            raise self._timed_out(future)
+        except BrokenProcessPool:
+            raise self._discard(executor)
+
+    async def run_async(
+        self, a: float, b: float, calc_type: str, timeout: Optional[float] = None
+    ) -> float:
+        """Like run(), but waits on the event loop instead of blocking a thread."""
+        future, executor = self._submit(a, b, calc_type)
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                self.timeout if timeout is None else timeout,
+            )
+        except asyncio.TimeoutError:
+            raise self._timed_out(future)
+        except BrokenProcessPool:
+            raise self._discard(executor)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": PROCESS_POOL_ENABLED,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "broken": self.broken,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+heavy_lane = HeavyLane(PROCESS_POOL_WORKERS, PROCESS_POOL_MAX_QUEUE, PROCESS_POOL_TIMEOUT)
+
+
+def run_calculation(a: float, b: float, calc_type: str) -> float:
+    """
+    Compute a calculation on the right lane:
+    - light operations (or the lane switched off) run in-process
+    - heavy ones are admission-checked, then sent to the process pool
+    """
+    operation = CalculationFactory.get_operation(calc_type)
+    if not (PROCESS_POOL_ENABLED and operation.heavy):
+        return perform_calculation(a, b, calc_type)
+
+    # Reject over-budget operands before they take a slot
+    check_cost(operation, a, b)
+    return heavy_lane.run(a, b, calc_type)
+
+
+async def run_calculation_async(a: float, b: float, calc_type: str) -> float:
+    """
+    Async twin of run_calculation. Light operations are computed inline
+    (microseconds, no thread hop); the heavy lane is awaited.
+    """
+    operation = CalculationFactory.get_operation(calc_type)
+    if not (PROCESS_POOL_ENABLED and operation.heavy):
+        return perform_calculation(a, b, calc_type)
+
+    check_cost(operation, a, b)
+    return await heavy_lane.run_async(a, b, calc_type)
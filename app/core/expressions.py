@@ -0,0 +1,283 @@
+# app/core/expressions.py
+"""
+Small expression language over the calculation operations, e.g.
+
+    sqrt(a ^ 2 + b ^ 2)
+    log(x, 10) * 2 - absdiff(a, b)
+
+Infix operators map onto registry operations (+ add, - sub, * mul, / div,
+// floordiv, % mod, ^ power); any registered operation can be called by
+name with one or two arguments (a missing second argument is 0, like the
+unused operand of sqrt/factorial). Expressions compile once into a flat
+plan of operation steps, which is then run column-wise over a whole vector
+of variable bindings.
+"""
+import math
+import re
+from functools import lru_cache
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Union
+
+from app.core.calculation_factory import (
+    BaseOperation,
+    BatchOutcome,
+    CalculationFactory,
+    CalculationTooExpensive,
+    check_cost,
+)
+
+MAX_EXPRESSION_LENGTH = 500
+# Parentheses, calls, unary minus and exponents nest; each level costs a few
+# parser frames, so cap it well below the interpreter's recursion limit
+MAX_NESTING_DEPTH = 50
+
+_BINARY_OPERATORS = {
+    "+": "add",
+    "-": "sub",
+    "*": "mul",
+    "/": "div",
+    "//": "floordiv",
+    "%": "mod",
+    "^": "power",
+}
+
+_TOKEN_RE = re.compile(
+    r"\s*(?:(?P<number>\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)"
+    r"|(?P<name>[A-Za-z_]\w*)"
+    r"|(?P<op>//|[-+*/%^(),]))"
+)
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions that cannot be parsed or evaluated."""
+
+
+# ----------------------------
+# Plan
+# ----------------------------
+class Const(NamedTuple):
+    value: float
+
+
+class Var(NamedTuple):
+    name: str
+
+
+class Reg(NamedTuple):
+    index: int  # output of an earlier step
+
+
+Operand = Union[Const, Var, Reg]
+
+
+class Step(NamedTuple):
+    operation: BaseOperation
+    left: Operand
+    right: Operand
+
+
+class CompiledExpression:
+    def __init__(self, text: str, steps: List[Step], output: Operand, variables: List[str]):
+        self.text = text
+        self.steps = steps
+        self.output = output
+        self.variables = variables
+
+    def evaluate_many(self, bindings: Mapping[str, Sequence[float]]) -> BatchOutcome:
+        """
+        Evaluate the plan for every row of `bindings` (variable -> column).
+        Each step runs once over all still-valid rows; a row that hits a
+        domain error keeps that error and is skipped by later steps.
+        """
+        missing = [name for name in self.variables if name not in bindings]
+        if missing:
+            raise ExpressionError(f"Missing values for variables: {', '.join(missing)}")
+
+        lengths = {len(bindings[name]) for name in self.variables}
+        if len(lengths) > 1:
+            raise ExpressionError("All variables must have the same number of values.")
+        n = lengths.pop() if lengths else 1
+
+        registers: List[List[Optional[float]]] = []
+        errors: List[Optional[str]] = [None] * n
+        live = list(range(n))
+
+        def column(operand: Operand) -> List[float]:
+            if isinstance(operand, Const):
+                return [operand.value] * len(live)
+            source = bindings[operand.name] if isinstance(operand, Var) else registers[operand.index]
+            return [source[i] for i in live]
+
+        for step in self.steps:
+            a_values = column(step.left)
+            b_values = column(step.right)
+            rows = live
+
+            if step.operation.expensive:
+                admitted = []
+                for pos, i in enumerate(rows):
+                    try:
+                        check_cost(step.operation, a_values[pos], b_values[pos])
+                        admitted.append(pos)
+                    except CalculationTooExpensive as e:
+                        errors[i] = str(e)
+                rows = [rows[pos] for pos in admitted]
+                a_values = [a_values[pos] for pos in admitted]
+                b_values = [b_values[pos] for pos in admitted]
+
+            step_results, step_errors = step.operation.compute_batch(a_values, b_values)
+            register: List[Optional[float]] = [None] * n
+            for i, result, error in zip(rows, step_results, step_errors):
+                if error is None and isinstance(result, complex):
+                    error = "Result is not a real number."
+                register[i] = result if error is None else None
+                errors[i] = error
+            registers.append(register)
+            live = [i for i in live if errors[i] is None]
+
+        output = column(self.output)
+        results: List[Optional[float]] = [None] * n
+        for i, value in zip(live, output):
+            if math.isfinite(value):
+                results[i] = value
+            else:
+                errors[i] = "Result is not a finite number."
+        return results, errors
+
+
+# ----------------------------
+# Parser / compiler
+# ----------------------------
+class _Compiler:
+    """Recursive-descent parser that emits plan steps while it parses."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = self._tokenize(text)
+        self.pos = 0
+        self.steps: List[Step] = []
+        self.variables: Dict[str, None] = {}  # insertion-ordered set
+        self.depth = 0
+
+    @staticmethod
+    def _tokenize(text: str) -> List[tuple]:
+        tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = _TOKEN_RE.match(text, pos)
+            if match is None:
+                pos += len(text[pos:]) - len(text[pos:].lstrip())
+                raise ExpressionError(f"Unexpected character at position {pos}: {text[pos]!r}")
+            kind = match.lastgroup
+            tokens.append((kind, match.group(kind)))
+            pos = match.end()
+        return tokens
+
+    def _peek(self) -> Optional[str]:
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos][1]
+        return None
+
+    def _next(self) -> tuple:
+        if self.pos >= len(self.tokens):
+            raise ExpressionError("Unexpected end of expression.")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _expect(self, value: str) -> None:
+        kind, token = self._next()
+        if token != value:
+            raise ExpressionError(f"Expected {value!r} but found {token!r}.")
+
+    def _emit(self, calc_type: str, left: Operand, right: Operand) -> Operand:
+        try:
+            operation = CalculationFactory.get_operation(calc_type)
+        except ValueError as e:
+            raise ExpressionError(str(e))
+        self.steps.append(Step(operation, left, right))
+        return Reg(len(self.steps) - 1)
+
+    def compile(self) -> CompiledExpression:
+        if not self.tokens:
+            raise ExpressionError("Expression is empty.")
+        output = self._expr()
+        if self.pos != len(self.tokens):
+            raise ExpressionError(f"Unexpected token {self._peek()!r}.")
+        return CompiledExpression(self.text, self.steps, output, list(self.variables))
+
+    # expr := term (('+' | '-') term)*
+    def _expr(self) -> Operand:
+        left = self._term()
+        while self._peek() in ("+", "-"):
+            op = self._next()[1]
+            left = self._emit(_BINARY_OPERATORS[op], left, self._term())
+        return left
+
+    # term := unary (('*' | '/' | '//' | '%') unary)*
+    def _term(self) -> Operand:
+        left = self._unary()
+        while self._peek() in ("*", "/", "//", "%"):
+            op = self._next()[1]
+            left = self._emit(_BINARY_OPERATORS[op], left, self._unary())
+        return left
+
+    # unary := '-' unary | power
+    def _unary(self) -> Operand:
+        # Every nested construct passes through here
+        self.depth += 1
+        if self.depth > MAX_NESTING_DEPTH:
+            raise ExpressionError(f"Expression is nested more than {MAX_NESTING_DEPTH} levels deep.")
+        try:
+            return self._unary_inner()
+        finally:
+            self.depth -= 1
+
+    def _unary_inner(self) -> Operand:
+        if self._peek() == "-":
+            self._next()
+            operand = self._unary()
+            if isinstance(operand, Const):
+                return Const(-operand.value)
+            return self._emit("sub", Const(0.0), operand)
+        return self._power()
+
+    # power := atom ('^' unary)?   (right-associative)
+    def _power(self) -> Operand:
+        base = self._atom()
+        if self._peek() == "^":
+            self._next()
+            return self._emit("power", base, self._unary())
+        return base
+
+    # atom := NUMBER | NAME | NAME '(' expr (',' expr)? ')' | '(' expr ')'
+    def _atom(self) -> Operand:
+        kind, token = self._next()
+        if kind == "number":
+            return Const(float(token))
+        if kind == "name":
+            if self._peek() != "(":
+                self.variables.setdefault(token, None)
+                return Var(token)
+            self._next()
+            args = [self._expr()]
+            if self._peek() == ",":
+                self._next()
+                args.append(self._expr())
+            self._expect(")")
+            left = args[0]
+            right = args[1] if len(args) > 1 else Const(0.0)
+            return self._emit(token.lower(), left, right)
+        if token == "(":
+            operand = self._expr()
+            self._expect(")")
+            return operand
+        raise ExpressionError(f"Unexpected token {token!r}.")
+
+
+@lru_cache(maxsize=256)
+def compile_expression(text: str) -> CompiledExpression:
+    """Parse and compile an expression; plans are cached by expression text."""
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters.")
+    return _Compiler(text).compile()
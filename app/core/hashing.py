@@ -0,0 +1,153 @@
+# app/core/hashing.py
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, Tuple, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.security import (
+    bcrypt_rounds,
+    get_password_hash,
+    set_bcrypt_rounds,
+    verify_and_update_password,
+    verify_password,
+)
+
+T = TypeVar("T")
+
+# ----------------------------
+# Settings
+# ----------------------------
+HASH_POOL_ENABLED = os.getenv("PASSWORD_HASH_POOL_ENABLED", "true").lower() in ("1", "true", "yes")
+HASH_POOL_WORKERS = int(os.getenv("PASSWORD_HASH_POOL_WORKERS", str(min(os.cpu_count() or 1, 4))))
+# Hashes running at once (normally = workers; higher only queues inside the pool)
+HASH_POOL_CONCURRENCY = int(os.getenv("PASSWORD_HASH_POOL_CONCURRENCY", str(HASH_POOL_WORKERS)))
+# Calls allowed to wait for a slot before new ones are refused
+HASH_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_POOL_MAX_QUEUE", "256"))
+
+
+class HashingBusy(RuntimeError):
+    """Too many password hashes are already waiting."""
+
+
+class HashingPool:
+    """
+    Process pool reserved for bcrypt, so hashing bursts (logins, sign-ups)
+    neither hold the request threadpool nor compete for the API's GIL.
+
+    At most `max_concurrency` calls run at once; up to `max_queue` more wait
+    on the event loop, and beyond that calls fail fast with HashingBusy.
+    Counters are only touched from the event loop.
+    """
+
+    def __init__(self, max_workers: int, max_concurrency: int, max_queue: int, enabled: bool = True):
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.enabled = enabled
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        if not self.enabled:
+            return await run_in_threadpool(fn, *args)
+
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HashingBusy("Too many password operations in progress, try again later.")
+
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        start = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        waited = time.perf_counter() - start
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+        self.in_flight += 1
+        try:
+            return await asyncio.wrap_future(self._get_executor().submit(fn, *args))
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next call
+            with self._lock:
+                self._executor = None
+            raise
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+hashing_pool = HashingPool(
+    HASH_POOL_WORKERS, HASH_POOL_CONCURRENCY, HASH_POOL_MAX_QUEUE, HASH_POOL_ENABLED
+)
+
+
+def _with_rounds(rounds: int, fn: Callable[..., T], *args) -> T:
+    # Workers may have started before the cost was calibrated; match the parent
+    if bcrypt_rounds() != rounds:
+        set_bcrypt_rounds(rounds)
+    return fn(*args)
+
+
+async def hash_password(password: str) -> str:
+    """Awaitable get_password_hash, run on the hashing pool."""
+    return await hashing_pool.run(_with_rounds, bcrypt_rounds(), get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Awaitable verify_password, run on the hashing pool."""
+    return await hashing_pool.run(
+        _with_rounds, bcrypt_rounds(), verify_password, plain_password, hashed_password
+    )
+
+
+async def check_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Awaitable verify_and_update_password, run on the hashing pool."""
+    return await hashing_pool.run(
+        _with_rounds, bcrypt_rounds(), verify_and_update_password, plain_password, hashed_password
+    )
@@ -0,0 +1,264 @@
+# app/core/idempotency.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.upsert import insert_or_ignore_async
+from app.models.idempotency_key import IdempotencyKey
+
+# ----------------------------
+# Settings
+# ----------------------------
+# How long a stored response is replayed for a retried key
+IDEMPOTENCY_KEY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+# A request still unfinished after this long is presumed dead (worker
+# crash) and its key may be claimed again
+IDEMPOTENCY_LOCK_TIMEOUT_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", "60"))
+IDEMPOTENCY_CACHE_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_CACHE_MAX_ENTRIES", "10000"))
+# Expired rows are deleted at most this often
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "300"))
+
+
+class IdempotencyInProgress(Exception):
+    """A request with the same key has not finished yet."""
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used with a different request body."""
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: bytes
+
+
+class _Entry:
+    __slots__ = ("expires_at", "request_hash", "response")
+
+    def __init__(self, expires_at: float, request_hash: str, response: StoredResponse):
+        self.expires_at = expires_at
+        self.request_hash = request_hash
+        self.response = response
+
+
+def request_fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite hands back naive datetimes; they are stored in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class IdempotencyStore:
+    """
+    Idempotency-Key handling for POST endpoints, backed by the
+    idempotency_keys table with an LRU of finished responses in front.
+
+    begin() claims a key with INSERT ... ON CONFLICT DO NOTHING, so of two
+    concurrent requests with the same key exactly one runs; the other gets
+    IdempotencyInProgress. A retry after complete() gets the stored
+    response back (from memory when this process has it, else from the
+    table). release() frees the key of a request that failed, so its retry
+    runs again.
+
+    complete() commits the stored response together with the write it
+    answers, which the caller leaves uncommitted in the same session.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        lock_timeout: float,
+        max_entries: int,
+        purge_seconds: float = 300.0,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.lock_timeout = lock_timeout
+        self.max_entries = max_entries
+        self.purge_seconds = purge_seconds
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+        self.claims = 0
+        self.cache_replays = 0
+        self.db_replays = 0
+        self.in_progress = 0
+        self.mismatches = 0
+        self.releases = 0
+
+    def _cached(self, endpoint: str, key: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get((endpoint, key))
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                del self._entries[(endpoint, key)]
+                return None
+            self._entries.move_to_end((endpoint, key))
+            return entry
+
+    def _put(self, endpoint: str, key: str, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[(endpoint, key)] = entry
+            self._entries.move_to_end((endpoint, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _row(endpoint: str, key: str):
+        return and_(IdempotencyKey.endpoint == endpoint, IdempotencyKey.key == key)
+
+    async def _purge_expired(self, db: AsyncSession, now: datetime) -> None:
+        if time.monotonic() - self._purged_at < self.purge_seconds:
+            return
+        self._purged_at = time.monotonic()
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+
+    async def begin(
+        self, db: AsyncSession, endpoint: str, key: str, request_hash: str
+    ) -> Optional[StoredResponse]:
+        """
+        Claim `key` for a new request (returns None: run it, then call
+        complete() or release()), or return the response stored for it.
+        Raises IdempotencyKeyReused or IdempotencyInProgress. Commits `db`.
+        """
+        entry = self._cached(endpoint, key)
+        if entry is not None:
+            if entry.request_hash != request_hash:
+                self.mismatches += 1
+                raise IdempotencyKeyReused("Idempotency-Key was already used with a different request")
+            self.cache_replays += 1
+            return entry.response
+
+        now = _utcnow()
+        await self._purge_expired(db, now)
+        claim = {
+            "request_hash": request_hash,
+            "locked_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds),
+        }
+        claimed = await insert_or_ignore_async(
+            db, IdempotencyKey, {"endpoint": endpoint, "key": key, **claim}, IdempotencyKey.key
+        )
+        if claimed is None:
+            # Take over a key that has expired, or whose request died
+            claimed = (
+                await db.execute(
+                    update(IdempotencyKey)
+                    .where(
+                        self._row(endpoint, key),
+                        or_(
+                            IdempotencyKey.expires_at <= now,
+                            and_(
+                                IdempotencyKey.status_code.is_(None),
+                                IdempotencyKey.locked_at
+                                <= now - timedelta(seconds=self.lock_timeout),
+                            ),
+                        ),
+                    )
+                    .values(status_code=None, response_body=None, **claim)
+                    .returning(IdempotencyKey.key)
+                    .execution_options(synchronize_session=False)
+                )
+            ).first()
+        if claimed is not None:
+            await db.commit()
+            self.claims += 1
+            return None
+
+        row = (
+            await db.execute(
+                select(
+                    IdempotencyKey.request_hash,
+                    IdempotencyKey.status_code,
+                    IdempotencyKey.response_body,
+                    IdempotencyKey.expires_at,
+                ).where(self._row(endpoint, key))
+            )
+        ).first()
+        await db.commit()
+        if row is not None and row.request_hash != request_hash:
+            self.mismatches += 1
+            raise IdempotencyKeyReused("Idempotency-Key was already used with a different request")
+        if row is None or row.status_code is None:
+            # (None: the row was purged between the statements; a retry claims it)
+            self.in_progress += 1
+            raise IdempotencyInProgress("A request with this Idempotency-Key is still in progress")
+
+        self.db_replays += 1
+        response = StoredResponse(row.status_code, row.response_body)
+        self._put(endpoint, key, _Entry(_timestamp(row.expires_at), request_hash, response))
+        return response
+
+    async def complete(
+        self,
+        db: AsyncSession,
+        endpoint: str,
+        key: str,
+        request_hash: str,
+        response: StoredResponse,
+    ) -> None:
+        """
+        Store the response of a claimed key and commit `db`, i.e. together
+        with the uncommitted write that produced it.
+        """
+        expires_at = await db.scalar(
+            update(IdempotencyKey)
+            .where(self._row(endpoint, key), IdempotencyKey.status_code.is_(None))
+            .values(status_code=response.status_code, response_body=response.body)
+            .returning(IdempotencyKey.expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if expires_at is not None:
+            self._put(endpoint, key, _Entry(_timestamp(expires_at), request_hash, response))
+
+    async def release(self, db: AsyncSession, endpoint: str, key: str) -> None:
+        """Give up a claimed key after the request failed. Rolls back, then commits `db`."""
+        await db.rollback()
+        await db.execute(
+            delete(IdempotencyKey).where(
+                self._row(endpoint, key), IdempotencyKey.status_code.is_(None)
+            )
+        )
+        await db.commit()
+        self.releases += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "claims": self.claims,
+            "cache_replays": self.cache_replays,
+            "db_replays": self.db_replays,
+            "in_progress": self.in_progress,
+            "mismatches": self.mismatches,
+            "releases": self.releases,
+        }
+
+
+idempotency_store = IdempotencyStore(
+    IDEMPOTENCY_KEY_TTL_SECONDS,
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS,
+    IDEMPOTENCY_CACHE_MAX_ENTRIES,
+    IDEMPOTENCY_PURGE_SECONDS,
+)
@@ -0,0 +1,169 @@
+# app/core/rate_limit.py
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+# ----------------------------
+# Settings
+# ----------------------------
+AUTH_RATE_LIMIT_ENABLED = os.getenv("AUTH_RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Per client IP: bucket size and refill per minute
+AUTH_RATE_LIMIT_IP_BURST = int(os.getenv("AUTH_RATE_LIMIT_IP_BURST", "30"))
+AUTH_RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("AUTH_RATE_LIMIT_IP_PER_MINUTE", "30"))
+# Per account (email), whichever IPs the attempts come from
+AUTH_RATE_LIMIT_ACCOUNT_BURST = int(os.getenv("AUTH_RATE_LIMIT_ACCOUNT_BURST", "10"))
+AUTH_RATE_LIMIT_ACCOUNT_PER_MINUTE = float(os.getenv("AUTH_RATE_LIMIT_ACCOUNT_PER_MINUTE", "10"))
+# Hard cap on tracked buckets (least recently used go first)
+AUTH_RATE_LIMIT_MAX_KEYS = int(os.getenv("AUTH_RATE_LIMIT_MAX_KEYS", "100000"))
+# Use the first X-Forwarded-For hop as the client IP (only behind a trusted proxy)
+AUTH_RATE_LIMIT_TRUST_FORWARDED = os.getenv("AUTH_RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+
+
+class RateLimited(Exception):
+    """A bucket is empty; retry_after is the wait (seconds) for the next token."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class RateLimitBackend(ABC):
+    """
+    Bucket storage. The in-memory backend is per process; a shared store
+    (e.g. Redis with an atomic script) can implement the same call.
+    """
+
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: float, now: float) -> float:
+        """
+        Take one token from `key`'s bucket (refilled at `rate`/s up to
+        `burst`). Returns 0.0 if a token was taken, else the seconds until
+        one will be available.
+        """
+
+    def stats(self) -> dict:
+        return {}
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "full_at")
+
+    def __init__(self, tokens: float, updated: float, full_at: float):
+        self.tokens = tokens
+        self.updated = updated
+        self.full_at = full_at
+
+
+class InMemoryBackend(RateLimitBackend):
+    """
+    Buckets in an OrderedDict kept in last-use order. A bucket that has
+    refilled completely is indistinguishable from a new one, so idle buckets
+    are dropped from the cold end once full; max_keys bounds memory under
+    floods of distinct keys. Every take() is O(1) amortized.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            key = next(iter(buckets))
+            if buckets[key].full_at > now and len(buckets) < self.max_keys:
+                break
+            del buckets[key]
+            self.evicted += 1
+
+    def take(self, key: str, rate: float, burst: float, now: float) -> float:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._evict(now)
+                bucket = _Bucket(burst, now, now)
+                self._buckets[key] = bucket
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+                bucket.updated = now
+
+            if bucket.tokens >= 1.0:
+                bucket.tokens -= 1.0
+                bucket.full_at = now + (burst - bucket.tokens) / rate
+                return 0.0
+            return (1.0 - bucket.tokens) / rate
+
+    def stats(self) -> dict:
+        return {"keys": len(self._buckets), "max_keys": self.max_keys, "evicted": self.evicted}
+
+
+class AuthRateLimiter:
+    """
+    Token buckets in front of the bcrypt-backed auth routes: one per client
+    IP (bursts from a single source) and one per account (attempts spread
+    across many IPs).
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        ip_burst: int,
+        ip_per_minute: float,
+        account_burst: int,
+        account_per_minute: float,
+        enabled: bool = True,
+    ):
+        self.backend = backend
+        self.ip_burst = ip_burst
+        self.ip_rate = ip_per_minute / 60.0
+        self.account_burst = account_burst
+        self.account_rate = account_per_minute / 60.0
+        self.enabled = enabled
+        self.checked = 0
+        self.limited_ip = 0
+        self.limited_account = 0
+
+    def check_ip(self, ip: str) -> None:
+        if not self.enabled:
+            return
+        self.checked += 1
+        retry_after = self.backend.take("ip:" + ip, self.ip_rate, self.ip_burst, time.monotonic())
+        if retry_after:
+            self.limited_ip += 1
+            raise RateLimited(retry_after)
+
+    def check_account(self, account: str) -> None:
+        if not self.enabled:
+            return
+        key = "account:" + account.strip().lower()
+        retry_after = self.backend.take(key, self.account_rate, self.account_burst, time.monotonic())
+        if retry_after:
+            self.limited_account += 1
+            raise RateLimited(retry_after)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "ip_burst": self.ip_burst,
+            "ip_per_minute": self.ip_rate * 60,
+            "account_burst": self.account_burst,
+            "account_per_minute": self.account_rate * 60,
+            "checked": self.checked,
+            "limited_ip": self.limited_ip,
+            "limited_account": self.limited_account,
+            **self.backend.stats(),
+        }
+
+
+auth_rate_limiter = AuthRateLimiter(
+    InMemoryBackend(AUTH_RATE_LIMIT_MAX_KEYS),
+    AUTH_RATE_LIMIT_IP_BURST,
+    AUTH_RATE_LIMIT_IP_PER_MINUTE,
+    AUTH_RATE_LIMIT_ACCOUNT_BURST,
+    AUTH_RATE_LIMIT_ACCOUNT_PER_MINUTE,
+    AUTH_RATE_LIMIT_ENABLED,
+)
@@ -0,0 +1,166 @@
+# app/core/result_cache.py
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Optional, Tuple, Type
+
+# ----------------------------
+# Settings
+# ----------------------------
+CACHE_ENABLED = os.getenv("CALC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_BYTES = int(os.getenv("CALC_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.getenv("CALC_CACHE_TTL_SECONDS", "3600"))
+
+# Rough per-entry bookkeeping cost (key tuple, entry tuple, dict slot)
+_ENTRY_OVERHEAD = 200
+
+
+class _Entry:
+    __slots__ = ("expires_at", "size", "value", "error_type", "error_args")
+
+    def __init__(self, expires_at, size, value, error_type, error_args):
+        self.expires_at = expires_at
+        self.size = size
+        self.value = value
+        self.error_type = error_type
+        self.error_args = error_args
+
+
+class ResultCache:
+    """
+    LRU + TTL cache for calculation results keyed by (type, a, b).
+
+    Eviction is by memory, not entry count: every entry is charged the
+    size of its result (factorial results are big ints), and the least
+    recently used entries are dropped until the total fits in max_bytes.
+    Domain errors (ValueError) are cached too and re-raised on hit.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, enabled: bool = True):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Hashable) -> Optional[_Entry]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry
+
+    @staticmethod
+    def _replay(entry: _Entry) -> float:
+        if entry.error_type is not None:
+            raise entry.error_type(*entry.error_args)
+        return entry.value
+
+    def get_or_compute(
+        self,
+        a: float,
+        b: float,
+        calc_type: str,
+        compute: Callable[[float, float, str], float],
+    ) -> float:
+        if not self.enabled:
+            return compute(a, b, calc_type)
+
+        key = (calc_type.lower(), a, b)
+        entry = self._lookup(key)
+        if entry is not None:
+            return self._replay(entry)
+
+        # Compute outside the lock; concurrent misses on one key may both compute
+        try:
+            value = compute(a, b, calc_type)
+        except ValueError as e:
+            self._store(key, None, type(e), e.args, sys.getsizeof(str(e)))
+            raise
+        self._store(key, value, None, (), sys.getsizeof(value))
+        return value
+
+    async def get_or_compute_async(
+        self,
+        a: float,
+        b: float,
+        calc_type: str,
+        compute: Callable[[float, float, str], Awaitable[float]],
+    ) -> float:
+        if not self.enabled:
+            return await compute(a, b, calc_type)
+
+        key = (calc_type.lower(), a, b)
+        entry = self._lookup(key)
+        if entry is not None:
+            return self._replay(entry)
+
+        try:
+            value = await compute(a, b, calc_type)
+        except ValueError as e:
+            self._store(key, None, type(e), e.args, sys.getsizeof(str(e)))
+            raise
+        self._store(key, value, None, (), sys.getsizeof(value))
+        return value
+
+    def _store(
+        self,
+        key: Hashable,
+        value: Optional[float],
+        error_type: Optional[Type[ValueError]],
+        error_args: Tuple,
+        payload_size: int,
+    ) -> None:
+        size = payload_size + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        entry = _Entry(time.monotonic() + self.ttl_seconds, size, value, error_type, error_args)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+
+calculation_cache = ResultCache(CACHE_MAX_BYTES, CACHE_TTL_SECONDS, CACHE_ENABLED)
@@ -0,0 +1,175 @@
+# app/core/revocation.py
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.bloom import BloomFilter
+from app.core.security import ACCESS_TOKEN_EXPIRE_MINUTES
+from app.db.session import AsyncSessionLocal
+from app.models.token_revocation import TokenRevocation
+
+# ----------------------------
+# Settings
+# ----------------------------
+# How often the filter is rebuilt from the table; also how long a revocation
+# made by another worker can go unseen here
+REVOCATION_REBUILD_SECONDS = float(os.getenv("TOKEN_REVOCATION_REBUILD_SECONDS", "30"))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("TOKEN_REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("TOKEN_REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+
+
+def _token_key(jti: str) -> str:
+    return "jti:" + jti
+
+
+def _user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite hands back naive datetimes; they are stored in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class TokenRevocationList:
+    """
+    Access-token denylist that costs no query for tokens that were never
+    revoked.
+
+    Revoked jtis from the token_revocations table are loaded into a bloom
+    filter; only a filter hit (a revoked token or a rare false positive)
+    is confirmed against the table. Revoke-all cutoffs per user are few,
+    so they are kept in a dict. Both are rebuilt from unexpired rows every
+    rebuild_seconds (lazily, by the first check after that); revocations
+    made in this process apply at once.
+    """
+
+    def __init__(self, rebuild_seconds: float, capacity: int, error_rate: float):
+        self.rebuild_seconds = rebuild_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom: Optional[BloomFilter] = None
+        self._user_cutoffs: Dict[int, float] = {}
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+        # (key, cutoff) revoked here while a rebuild is reading the table
+        self._added_since_rebuild: List[Tuple[str, Optional[float]]] = []
+        self.checks = 0
+        self.bloom_hits = 0
+        self.revoked_hits = 0
+        self.rebuilds = 0
+
+    def _stale(self) -> bool:
+        return self._bloom is None or time.monotonic() - self._built_at >= self.rebuild_seconds
+
+    async def rebuild(self) -> None:
+        """Reload from the table, dropping rows whose tokens have all expired."""
+        self._added_since_rebuild = []
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(TokenRevocation).where(TokenRevocation.expires_at <= datetime.now(timezone.utc))
+            )
+            rows = (await db.execute(select(TokenRevocation.key, TokenRevocation.not_before))).all()
+            await db.commit()
+
+        entries = [
+            (row.key, _timestamp(row.not_before) if row.not_before else None) for row in rows
+        ]
+        # The query may have missed what was revoked here meanwhile
+        entries += self._added_since_rebuild
+        jtis = [key for key, _ in entries if key.startswith("jti:")]
+        bloom = BloomFilter.from_items(jtis, max(self.capacity, 2 * len(jtis)), self.error_rate)
+        cutoffs: Dict[int, float] = {}
+        for key, cutoff in entries:
+            if key.startswith("user:"):
+                user_id = int(key.split(":", 1)[1])
+                cutoffs[user_id] = max(cutoff, cutoffs.get(user_id, 0.0))
+        self._bloom, self._user_cutoffs = bloom, cutoffs
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    async def _ensure_fresh(self) -> None:
+        if not self._stale():
+            return
+        async with self._lock:
+            if self._stale():
+                await self.rebuild()
+
+    async def is_revoked(self, claims: dict, user_id: int) -> bool:
+        await self._ensure_fresh()
+        self.checks += 1
+
+        cutoff = self._user_cutoffs.get(user_id)
+        if cutoff is not None and claims.get("iat", 0) < cutoff:
+            self.revoked_hits += 1
+            return True
+
+        jti = claims.get("jti")
+        if not jti or _token_key(jti) not in self._bloom:
+            return False
+        self.bloom_hits += 1
+        async with AsyncSessionLocal() as db:
+            found = await db.scalar(
+                select(TokenRevocation.key).where(TokenRevocation.key == _token_key(jti))
+            )
+        if found is not None:
+            self.revoked_hits += 1
+            return True
+        return False
+
+    def _note(self, key: str, cutoff: Optional[float] = None) -> None:
+        if cutoff is not None:
+            user_id = int(key.split(":", 1)[1])
+            self._user_cutoffs[user_id] = cutoff
+        elif self._bloom is not None:
+            self._bloom.add(key)
+        self._added_since_rebuild.append((key, cutoff))
+
+    async def revoke_token(self, db: AsyncSession, jti: str, exp: float) -> None:
+        """Revoke one access token until its exp. Commits `db`."""
+        await db.merge(
+            TokenRevocation(
+                key=_token_key(jti),
+                expires_at=datetime.fromtimestamp(exp, timezone.utc),
+            )
+        )
+        await db.commit()
+        self._note(_token_key(jti))
+
+    async def revoke_user(self, db: AsyncSession, user_id: int) -> None:
+        """Revoke every access token issued to a user so far. Commits `db`."""
+        now = datetime.now(timezone.utc)
+        await db.merge(
+            TokenRevocation(
+                key=_user_key(user_id),
+                not_before=now,
+                # Tokens issued before now are all expired by then
+                expires_at=now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+            )
+        )
+        await db.commit()
+        self._note(_user_key(user_id), now.timestamp())
+
+    def stats(self) -> dict:
+        return {
+            "rebuild_seconds": self.rebuild_seconds,
+            "bloom_items": self._bloom.count if self._bloom else 0,
+            "bloom_bits": self._bloom.num_bits if self._bloom else 0,
+            "user_cutoffs": len(self._user_cutoffs),
+            "checks": self.checks,
+            "bloom_hits": self.bloom_hits,
+            "revoked_hits": self.revoked_hits,
+            "rebuilds": self.rebuilds,
+        }
+
+
+token_revocations = TokenRevocationList(
+    REVOCATION_REBUILD_SECONDS, REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_ERROR_RATE
+)
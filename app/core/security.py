@@ -1,15 +1,30 @@
 # app/core/security.py
 
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Any
+from typing import Optional, Any, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+import hashlib
+import hmac
+import json
 import os
+import secrets
+import time
 
 # ======================
 # Password hashing (you probably already have this)
 # ======================
+# Fixed bcrypt cost; when unset, the cost is calibrated at startup
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS")
+# Target time for one hash/verify when calibrating
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "50"))
+PASSWORD_HASH_CALIBRATE = os.getenv("PASSWORD_HASH_CALIBRATE", "true").lower() in ("1", "true", "yes")
+# Where the calibrated cost is kept, so restarts (and workers) agree on it
+PASSWORD_HASH_CONFIG = os.getenv("PASSWORD_HASH_CONFIG", "password_hash.json")
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -21,6 +36,102 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify, and when the stored hash is below the current cost return a
+    fresh hash to save in its place (None otherwise).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def bcrypt_rounds() -> int:
+    rounds = pwd_context.to_dict().get("bcrypt__default_rounds")
+    return rounds or pwd_context.handler("bcrypt").default_rounds
+
+
+def set_bcrypt_rounds(rounds: int) -> None:
+    # min_rounds makes needs_update() flag older, cheaper hashes for rehashing
+    pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+
+
+def time_bcrypt(rounds: int, repeat: int = 3) -> float:
+    """Best-of-`repeat` seconds for one bcrypt hash at `rounds`."""
+    handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        handler.hash("calibration-password")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def choose_bcrypt_rounds(seconds_at_min: float, target_ms: float) -> int:
+    """
+    Highest cost whose hash time stays within target_ms, given the time
+    at BCRYPT_MIN_ROUNDS (each extra round doubles the work). Never
+    below BCRYPT_MIN_ROUNDS.
+    """
+    rounds = BCRYPT_MIN_ROUNDS
+    seconds = seconds_at_min
+    while rounds < BCRYPT_MAX_ROUNDS and seconds * 2 * 1000 <= target_ms:
+        rounds += 1
+        seconds *= 2
+    return rounds
+
+
+def calibrate_bcrypt_rounds(target_ms: float = PASSWORD_HASH_TARGET_MS) -> int:
+    return choose_bcrypt_rounds(time_bcrypt(BCRYPT_MIN_ROUNDS), target_ms)
+
+
+def _load_saved_rounds(path: str, target_ms: float) -> Optional[int]:
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # A changed target means the saved cost no longer applies
+    if saved.get("target_ms") != target_ms:
+        return None
+    return int(saved["bcrypt_rounds"])
+
+
+def save_bcrypt_rounds(rounds: int, path: str = PASSWORD_HASH_CONFIG, target_ms: float = PASSWORD_HASH_TARGET_MS) -> None:
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "bcrypt_rounds": rounds,
+                "target_ms": target_ms,
+                "calibrated_at": datetime.now(timezone.utc).isoformat(),
+            },
+            f,
+        )
+
+
+def configure_password_hashing() -> int:
+    """
+    Pick the bcrypt cost at startup and return it: BCRYPT_ROUNDS if set,
+    else the cost saved in PASSWORD_HASH_CONFIG for the current target,
+    else a fresh calibration (saved for next time when the file is
+    writable). With PASSWORD_HASH_CALIBRATE off, passlib's default stays.
+    """
+    if BCRYPT_ROUNDS:
+        rounds = int(BCRYPT_ROUNDS)
+    else:
+        rounds = _load_saved_rounds(PASSWORD_HASH_CONFIG, PASSWORD_HASH_TARGET_MS)
+        if rounds is None:
+            if not PASSWORD_HASH_CALIBRATE:
+                return bcrypt_rounds()
+            rounds = calibrate_bcrypt_rounds()
+            try:
+                save_bcrypt_rounds(rounds)
+            except OSError:
+                pass
+    set_bcrypt_rounds(rounds)
+    return rounds
+
+
 # ======================
 # JWT settings
 # ======================
@@ -34,14 +145,16 @@ def create_access_token(
     expires_delta: Optional[timedelta] = None,
 ) -> str:
     """
-    Creates a signed JWT with an 'exp' claim.
-    `data` should include a 'sub' (subject), usually user id or email.
+    Creates a signed JWT with 'exp', 'iat' and a unique 'jti' (the handle
+    for revoking this one token). `data` should include a 'sub'
+    (subject), usually user id or email.
     """
     to_encode: dict[str, Any] = data.copy()
-    expire = datetime.now(timezone.utc) + (
-        expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    )
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    # iat keeps sub-second precision so a revoke-all does not catch a
+    # login made in the same second right after it
+    to_encode.update({"exp": expire, "iat": now.timestamp(), "jti": secrets.token_hex(16)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -55,3 +168,25 @@ def decode_access_token(token: str) -> Optional[dict]:
         return payload
     except JWTError:
         return None
+
+
+# ======================
+# Refresh tokens
+# ======================
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+# Key for the stored token HMACs; defaults to the JWT key
+REFRESH_TOKEN_HASH_KEY = os.environ.get("REFRESH_TOKEN_HASH_KEY", SECRET_KEY).encode()
+
+
+def new_refresh_token() -> str:
+    """Opaque random refresh token (256 bits)."""
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Keyed SHA-256 for storage and lookup. The token is random, so a fast
+    keyed hash is enough (bcrypt would put the work back on every refresh),
+    and a leaked table cannot be replayed without the key.
+    """
+    return hmac.new(REFRESH_TOKEN_HASH_KEY, token.encode(), hashlib.sha256).hexdigest()
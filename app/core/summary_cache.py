@@ -0,0 +1,111 @@
+# app/core/summary_cache.py
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.schemas.report import ReportSummary
+
+# ----------------------------
+# Settings
+# ----------------------------
+SUMMARY_CACHE_ENABLED = os.getenv("REPORT_SUMMARY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Upper bound on age; also bounds how long writes made by other workers go unseen
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("REPORT_SUMMARY_CACHE_TTL_SECONDS", "30"))
+# How long a summary may still be served after a local write (0 = never)
+SUMMARY_MAX_STALENESS_SECONDS = float(os.getenv("REPORT_SUMMARY_MAX_STALENESS_SECONDS", "0"))
+
+
+class _Cached:
+    __slots__ = ("summary", "version", "computed_at")
+
+    def __init__(self, summary: ReportSummary, version: int, computed_at: float):
+        self.summary = summary
+        self.version = version
+        self.computed_at = computed_at
+
+
+class SummaryCache:
+    """
+    Caches the report summary against a data-version counter.
+
+    Calculation writes call bump() after they commit. A cached summary is
+    served while its version is current (or, with max_staleness, for that
+    long after a bump) and younger than ttl_seconds. Misses are coalesced:
+    one request recomputes while the others wait on the lock and then reuse
+    its result.
+    """
+
+    def __init__(self, ttl_seconds: float, max_staleness: float = 0.0, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_staleness = max_staleness
+        self.enabled = enabled
+        self.version = 0
+        self._cached: Optional[_Cached] = None
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def bump(self) -> None:
+        self.version += 1
+
+    def _fresh(self) -> Optional[ReportSummary]:
+        cached = self._cached
+        if cached is None:
+            return None
+        age = time.monotonic() - cached.computed_at
+        if age >= self.ttl_seconds:
+            return None
+        if cached.version != self.version and age >= self.max_staleness:
+            return None
+        return cached.summary
+
+    async def get(self, compute: Callable[[], Awaitable[ReportSummary]]) -> ReportSummary:
+        if not self.enabled:
+            return await compute()
+
+        summary = self._fresh()
+        if summary is not None:
+            self.hits += 1
+            return summary
+
+        waited = self._lock.locked()
+        async with self._lock:
+            # Whoever held the lock may have refreshed it for us
+            summary = self._fresh()
+            if summary is not None:
+                self.hits += 1
+                if waited:
+                    self.coalesced += 1
+                return summary
+
+            self.misses += 1
+            # Tag with the version seen before reading, so a write that lands
+            # mid-computation still invalidates this result
+            version = self.version
+            summary = await compute()
+            self._cached = _Cached(summary, version, time.monotonic())
+            return summary
+
+    def clear(self) -> None:
+        self._cached = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "version": self.version,
+            "cached_version": self._cached.version if self._cached else None,
+            "ttl_seconds": self.ttl_seconds,
+            "max_staleness_seconds": self.max_staleness,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+report_summary_cache = SummaryCache(
+    SUMMARY_CACHE_TTL_SECONDS, SUMMARY_MAX_STALENESS_SECONDS, SUMMARY_CACHE_ENABLED
+)
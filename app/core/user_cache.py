@@ -0,0 +1,125 @@
+# app/core/user_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from app.models.user import User
+
+# ----------------------------
+# Settings
+# ----------------------------
+CURRENT_USER_CACHE_ENABLED = os.getenv("CURRENT_USER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CURRENT_USER_CACHE_MAX_ENTRIES = int(os.getenv("CURRENT_USER_CACHE_MAX_ENTRIES", "10000"))
+# Also bounds how long a profile change made by another worker goes unseen
+CURRENT_USER_CACHE_TTL_SECONDS = float(os.getenv("CURRENT_USER_CACHE_TTL_SECONDS", "60"))
+
+
+class _Entry:
+    __slots__ = ("expires_at", "user", "claims")
+
+    def __init__(self, expires_at: float, user: User, claims: dict):
+        self.expires_at = expires_at
+        self.user = user
+        self.claims = claims
+
+
+class CurrentUserCache:
+    """
+    LRU cache of verified bearer tokens -> (User row, claims), so an
+    authenticated request skips both the signature check and the lookup
+    by email.
+
+    An entry lives until the token's `exp` or ttl_seconds, whichever comes
+    first. invalidate_user() drops every token of a user; profile and
+    password changes call it after they commit. Cached users are detached
+    from any session and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; see put()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(entry.user.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry.user.id]
+
+    def get(self, token: str) -> Optional[Tuple[User, dict]]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(token)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry.user, entry.claims
+
+    def put(self, token: str, claims: dict, user: User, generation: int) -> None:
+        """
+        Cache `user` for `token`. `generation` is self.generation read
+        before the user was loaded: if an invalidation happened since, the
+        row may predate it and is not cached.
+        """
+        if not self.enabled:
+            return
+        # Wall clock, to compare with the token's exp claim
+        expires_at = min(claims["exp"], time.time() + self.ttl_seconds)
+        with self._lock:
+            if generation != self.generation:
+                return
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = _Entry(expires_at, user, claims)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+            self.generation += 1
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+current_user_cache = CurrentUserCache(
+    CURRENT_USER_CACHE_MAX_ENTRIES, CURRENT_USER_CACHE_TTL_SECONDS, CURRENT_USER_CACHE_ENABLED
+)
@@ -3,4 +3,20 @@ from app.crud.user import (
     get_user_by_username,
     get_user_by_email,
     create_user,
+    get_user_async,
+    get_user_by_username_async,
+    get_user_by_email_async,
+    create_user_async,
+)
+from app.crud.calculation import (
+    bulk_create_calculations,
+    bulk_create_calculations_async,
+    copy_calculations,
+    copy_calculations_async,
+    iter_calculation_partitions,
+    stream_calculation_partitions,
+    list_calculations_page,
+    list_calculations_page_async,
+    recent_calculations,
+    recent_calculations_async,
 )
@@ -0,0 +1,500 @@
+# app/crud/calculation.py
+import base64
+import binascii
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    DateTime,
+    Row,
+    Select,
+    delete,
+    func,
+    insert,
+    literal_column,
+    select,
+    type_coerce,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.crud.calculation_stats import (
+    record_calculation_changes,
+    record_calculation_changes_async,
+)
+from app.models.calculation import Calculation
+from app.schemas.calculation import CALCULATION_READ_FIELDS
+
+
+def bulk_create_calculations(db: Session, rows: List[dict]) -> List[int]:
+    """
+    Insert many calculations with one executemany INSERT ... RETURNING,
+    update the stats rollup and commit. Returns the new ids in the same
+    order as `rows`.
+    """
+    if not rows:
+        return []
+    ids = db.execute(
+        insert(Calculation).returning(Calculation.id, sort_by_parameter_order=True),
+        rows,
+    ).scalars().all()
+    record_calculation_changes(db, added=[dict(row, id=id_) for row, id_ in zip(rows, ids)])
+    db.commit()
+    return list(ids)
+
+
+def copy_calculations(db: Session, rows: List[dict]) -> None:
+    """
+    Append many calculations without returning ids, update the stats
+    rollup and commit.
+    On PostgreSQL (psycopg2) the rows are streamed with COPY ... FROM STDIN;
+    elsewhere they go through a multi-row INSERT.
+    """
+    if not rows:
+        return
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow((row["a"], row["b"], row["type"], row["result"]))
+        buf.seek(0)
+        dbapi_conn = db.connection().connection
+        with dbapi_conn.cursor() as cur:
+            cur.copy_expert(
+                "COPY calculations (a, b, type, result) FROM STDIN WITH (FORMAT csv)",
+                buf,
+            )
+    else:
+        db.execute(insert(Calculation), rows)
+    record_calculation_changes(db, added=rows)
+    db.commit()
+
+
+async def bulk_create_calculations_async(
+    db: AsyncSession, rows: List[dict], commit: bool = True
+) -> List[int]:
+    """
+    Async version of bulk_create_calculations. With commit=False the caller
+    commits (e.g. together with an idempotency record).
+    """
+    if not rows:
+        return []
+    result = await db.execute(
+        insert(Calculation).returning(Calculation.id, sort_by_parameter_order=True),
+        rows,
+    )
+    ids = result.scalars().all()
+    await record_calculation_changes_async(
+        db, added=[dict(row, id=id_) for row, id_ in zip(rows, ids)]
+    )
+    if commit:
+        await db.commit()
+    return list(ids)
+
+
+async def copy_calculations_async(db: AsyncSession, rows: List[dict]) -> None:
+    """
+    Async version of copy_calculations. On PostgreSQL (asyncpg) the rows go
+    through copy_records_to_table, i.e. binary COPY ... FROM STDIN.
+    """
+    if not rows:
+        return
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "asyncpg":
+        conn = await db.connection()
+        # The asyncpg adapter opens its transaction on the first statement it
+        # runs; do that first so the COPY and the stats update commit together
+        await conn.exec_driver_sql("SELECT 1")
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Calculation.__tablename__,
+            records=[(row["a"], row["b"], row["type"], row["result"]) for row in rows],
+            columns=["a", "b", "type", "result"],
+        )
+    else:
+        await db.execute(insert(Calculation), rows)
+    await record_calculation_changes_async(db, added=rows)
+    await db.commit()
+
+
+# -------------------------
+# Single-row writes (RETURNING instead of a refresh after commit)
+# -------------------------
+_STATS_COLUMNS = (Calculation.type, Calculation.a, Calculation.b, Calculation.id)
+
+
+async def create_calculation_async(db: AsyncSession, row: dict, commit: bool = True) -> Row:
+    """
+    Insert one calculation with INSERT ... RETURNING (no refresh), update
+    the rollup and commit (unless commit=False). An unknown user_id raises
+    IntegrityError (the foreign key decides, so a concurrently deleted user
+    cannot slip in).
+    """
+    created = (
+        await db.execute(insert(Calculation).values(**row).returning(*_read_columns()))
+    ).one()
+    await record_calculation_changes_async(db, added=[dict(row, id=created.id)])
+    if commit:
+        await db.commit()
+    return created
+
+
+def _row_stmt(stmt, calc_id: int, user_id: Optional[int]):
+    stmt = stmt.where(Calculation.id == calc_id)
+    if user_id is not None:
+        stmt = stmt.where(Calculation.user_id == user_id)
+    return stmt
+
+
+async def update_calculation_async(
+    db: AsyncSession, calc_id: int, values: dict, user_id: Optional[int] = None
+) -> Optional[Row]:
+    """
+    Replace a calculation's fields, update the rollup and commit; None if
+    there is no such row (owned by user_id, when given). The old values
+    are read FOR UPDATE (PostgreSQL), so concurrent edits of one row cannot
+    take the same values out of the rollup twice; the new row comes back
+    from UPDATE ... RETURNING.
+    """
+    before = (
+        await db.execute(
+            _row_stmt(select(*_STATS_COLUMNS), calc_id, user_id).with_for_update()
+        )
+    ).first()
+    if before is None:
+        return None
+    updated = (
+        await db.execute(
+            update(Calculation)
+            .where(Calculation.id == calc_id)
+            .values(**values)
+            .returning(*_read_columns())
+            .execution_options(synchronize_session=False)
+        )
+    ).one()
+    await record_calculation_changes_async(
+        db,
+        added=[{"type": updated.type, "a": updated.a, "b": updated.b, "id": updated.id}],
+        removed=[before._asdict()],
+    )
+    await db.commit()
+    return updated
+
+
+async def delete_calculation_async(
+    db: AsyncSession, calc_id: int, user_id: Optional[int] = None
+) -> bool:
+    """
+    DELETE ... RETURNING what the rollup needs, then commit; False if there
+    is no such row (owned by user_id, when given).
+    """
+    removed = (
+        await db.execute(
+            _row_stmt(delete(Calculation), calc_id, user_id)
+            .returning(*_STATS_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+    ).first()
+    if removed is None:
+        return False
+    await record_calculation_changes_async(db, removed=[removed._asdict()])
+    await db.commit()
+    return True
+
+
+# Columns served by the read/export paths. Selecting plain columns instead of
+# Calculation entities skips ORM identity-map bookkeeping for big listings.
+READ_COLUMNS = tuple(name for name in CALCULATION_READ_FIELDS if hasattr(Calculation, name))
+
+
+def _read_columns():
+    return [getattr(Calculation, c) for c in READ_COLUMNS]
+
+
+def _owner_filter(stmt: Select, user_id: Optional[int], owner_only: bool) -> Select:
+    # owner_only: user_id None means rows without an owner, not every row
+    if user_id is not None:
+        return stmt.where(Calculation.user_id == user_id)
+    if owner_only:
+        return stmt.where(Calculation.user_id.is_(None))
+    return stmt
+
+
+def _partition_stmt(
+    type_: Optional[str],
+    min_id: Optional[int],
+    max_id: Optional[int],
+    partition_size: int,
+    user_id: Optional[int],
+    owner_only: bool,
+) -> Select:
+    stmt = _owner_filter(select(*_read_columns()).order_by(Calculation.id), user_id, owner_only)
+    if type_ is not None:
+        stmt = stmt.where(Calculation.type == type_)
+    if min_id is not None:
+        stmt = stmt.where(Calculation.id >= min_id)
+    if max_id is not None:
+        stmt = stmt.where(Calculation.id <= max_id)
+    return stmt.execution_options(yield_per=partition_size)
+
+
+def iter_calculation_partitions(
+    db: Session,
+    type_: Optional[str] = None,
+    min_id: Optional[int] = None,
+    max_id: Optional[int] = None,
+    partition_size: int = 1000,
+    user_id: Optional[int] = None,
+    owner_only: bool = False,
+) -> Iterator[Sequence[Row]]:
+    """
+    Yield calculation rows (READ_COLUMNS, ordered by id) in partitions,
+    read through a server-side cursor so memory does not grow with the table.
+    user_id limits them to one owner's; with owner_only, user_id=None means
+    the rows without an owner.
+    """
+    result = db.execute(
+        _partition_stmt(type_, min_id, max_id, partition_size, user_id, owner_only)
+    )
+    yield from result.partitions()
+
+
+async def stream_calculation_partitions(
+    db: AsyncSession,
+    type_: Optional[str] = None,
+    min_id: Optional[int] = None,
+    max_id: Optional[int] = None,
+    partition_size: int = 1000,
+    user_id: Optional[int] = None,
+    owner_only: bool = False,
+) -> AsyncIterator[Sequence[Row]]:
+    """Async version of iter_calculation_partitions."""
+    result = await db.stream(
+        _partition_stmt(type_, min_id, max_id, partition_size, user_id, owner_only)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+# ----------------------------
+# Keyset pagination
+# ----------------------------
+def encode_cursor(last_id: int) -> str:
+    """Opaque cursor pointing just after `last_id`."""
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Inverse of encode_cursor; raises ValueError for anything else."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+    prefix, _, value = raw.partition(":")
+    if prefix != "id" or not value.isdigit():
+        raise ValueError("Invalid cursor.")
+    return int(value)
+
+
+def _page_stmt(
+    limit: int,
+    after_id: Optional[int],
+    user_id: Optional[int],
+    type_: Optional[str],
+    min_a: Optional[float],
+    max_a: Optional[float],
+    min_b: Optional[float],
+    max_b: Optional[float],
+    min_result: Optional[float],
+    max_result: Optional[float],
+    owner_only: bool,
+) -> Select:
+    stmt = _owner_filter(select(*_read_columns()).order_by(Calculation.id), user_id, owner_only)
+    if after_id is not None:
+        stmt = stmt.where(Calculation.id > after_id)
+    if type_ is not None:
+        stmt = stmt.where(Calculation.type == type_)
+    for column, low, high in (
+        (Calculation.a, min_a, max_a),
+        (Calculation.b, min_b, max_b),
+        (Calculation.result, min_result, max_result),
+    ):
+        if low is not None:
+            stmt = stmt.where(column >= low)
+        if high is not None:
+            stmt = stmt.where(column <= high)
+    # One extra row tells us whether there is a next page
+    return stmt.limit(limit + 1)
+
+
+def _split_page(rows: Sequence[Row], limit: int) -> Tuple[Sequence[Row], Optional[int]]:
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
+
+
+def list_calculations_page(
+    db: Session,
+    limit: int,
+    after_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    type_: Optional[str] = None,
+    min_a: Optional[float] = None,
+    max_a: Optional[float] = None,
+    min_b: Optional[float] = None,
+    max_b: Optional[float] = None,
+    min_result: Optional[float] = None,
+    max_result: Optional[float] = None,
+    owner_only: bool = False,
+) -> Tuple[Sequence[Row], Optional[int]]:
+    """
+    One keyset page ordered by id: WHERE id > after_id ... LIMIT limit + 1.
+    Returns the rows (READ_COLUMNS) and the id to continue after (None on
+    the last page). With owner_only, user_id=None means the rows without
+    an owner instead of every row.
+    """
+    stmt = _page_stmt(
+        limit,
+        after_id,
+        user_id,
+        type_,
+        min_a,
+        max_a,
+        min_b,
+        max_b,
+        min_result,
+        max_result,
+        owner_only,
+    )
+    return _split_page(db.execute(stmt).all(), limit)
+
+
+async def list_calculations_page_async(
+    db: AsyncSession,
+    limit: int,
+    after_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    type_: Optional[str] = None,
+    min_a: Optional[float] = None,
+    max_a: Optional[float] = None,
+    min_b: Optional[float] = None,
+    max_b: Optional[float] = None,
+    min_result: Optional[float] = None,
+    max_result: Optional[float] = None,
+    owner_only: bool = False,
+) -> Tuple[Sequence[Row], Optional[int]]:
+    """Async version of list_calculations_page."""
+    stmt = _page_stmt(
+        limit,
+        after_id,
+        user_id,
+        type_,
+        min_a,
+        max_a,
+        min_b,
+        max_b,
+        min_result,
+        max_result,
+        owner_only,
+    )
+    result = await db.execute(stmt)
+    return _split_page(result.all(), limit)
+
+
+def _recent_stmt(limit: int, user_id: Optional[int], min_id: Optional[int]) -> Select:
+    stmt = select(*_read_columns()).order_by(Calculation.id.desc()).limit(limit)
+    if user_id is not None:
+        stmt = stmt.where(Calculation.user_id == user_id)
+    if min_id is not None:
+        stmt = stmt.where(Calculation.id >= min_id)
+    return stmt
+
+
+def recent_calculations(
+    db: Session, limit: int, user_id: Optional[int] = None, min_id: Optional[int] = None
+) -> Sequence[Row]:
+    """
+    Newest calculations first (READ_COLUMNS), optionally one user's only.
+    min_id bounds the scan (lets PostgreSQL prune id partitions).
+    """
+    return db.execute(_recent_stmt(limit, user_id, min_id)).all()
+
+
+async def recent_calculations_async(
+    db: AsyncSession, limit: int, user_id: Optional[int] = None, min_id: Optional[int] = None
+) -> Sequence[Row]:
+    """Async version of recent_calculations."""
+    result = await db.execute(_recent_stmt(limit, user_id, min_id))
+    return result.all()
+
+
+# ----------------------------
+# Time series
+# ----------------------------
+TIMESERIES_BUCKETS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# SQLite has no date_trunc; truncate by formatting (created_at is UTC text there)
+_SQLITE_BUCKET_FORMATS = {
+    "minute": "%Y-%m-%d %H:%M:00",
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d 00:00:00",
+}
+
+
+def _bucket_column(dialect_name: str, bucket: str):
+    # Rendered inline (bucket is whitelisted) so GROUP BY matches the SELECT
+    # expression exactly; a bind parameter would differ between the two.
+    if dialect_name == "postgresql":
+        return func.date_trunc(literal_column(f"'{bucket}'"), Calculation.created_at)
+    return type_coerce(
+        func.strftime(literal_column(f"'{_SQLITE_BUCKET_FORMATS[bucket]}'"), Calculation.created_at),
+        DateTime,
+    )
+
+
+async def calculation_timeseries_async(
+    db: AsyncSession,
+    bucket: str,
+    start: datetime,
+    end: datetime,
+    type_: Optional[str] = None,
+) -> List[dict]:
+    """
+    Per-bucket, per-type count and result aggregates for start <= created_at < end,
+    grouped in the database. The created_at range is what keeps this cheap on
+    big tables (BRIN on PostgreSQL), so callers must bound it.
+    """
+    bucket_start = _bucket_column(db.get_bind().dialect.name, bucket)
+    stmt = (
+        select(
+            bucket_start.label("bucket_start"),
+            Calculation.type,
+            func.count().label("count"),
+            func.avg(Calculation.result).label("average_result"),
+            func.min(Calculation.result).label("min_result"),
+            func.max(Calculation.result).label("max_result"),
+        )
+        .where(Calculation.created_at >= start, Calculation.created_at < end)
+        .group_by(bucket_start, Calculation.type)
+        .order_by(bucket_start, Calculation.type)
+    )
+    if type_ is not None:
+        stmt = stmt.where(Calculation.type == type_)
+
+    points = []
+    for row in await db.execute(stmt):
+        point = row._asdict()
+        # SQLite hands back naive datetimes; they are UTC
+        if point["bucket_start"].tzinfo is None:
+            point["bucket_start"] = point["bucket_start"].replace(tzinfo=timezone.utc)
+        points.append(point)
+    return points
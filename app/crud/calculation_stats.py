@@ -0,0 +1,303 @@
+# app/crud/calculation_stats.py
+"""
+Maintenance of the calculation_stats rollup (one row per type).
+
+Every write path calls record_calculation_changes(_async) with the rows it
+added and/or removed before it commits, so the rollup moves in the same
+transaction as calculations. Rows written through the ORM unit of work
+(session.add / session.delete) are picked up by mapper events instead.
+Counts and sums are applied as deltas with an upsert (ON CONFLICT DO
+UPDATE; UPDATE then INSERT ... WHERE NOT EXISTS on other dialects); max_id
+only grows on insert and is looked up again (via ix_calculations_type_id)
+when the current max row goes away.
+"""
+import math
+from typing import Dict, Iterable, List, Mapping, Sequence
+
+from sqlalchemy import Executable, Row, case, delete, event, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, attributes
+
+from app.db.upsert import upsert_insert
+from app.models.calculation import Calculation
+from app.models.calculation_stats import CalculationStats
+
+# type, a, b and (when known) id of an added/removed calculation
+StatsRow = Mapping[str, object]
+
+
+def stats_row(calc: Calculation) -> dict:
+    """Snapshot of the fields the rollup needs (take it before mutating calc)."""
+    return {"type": calc.type, "a": calc.a, "b": calc.b, "id": calc.id}
+
+
+def _aggregate(rows: Iterable[StatsRow]) -> Dict[str, list]:
+    """type -> [count, sum_a, sum_b, max id or None if any id is unknown]"""
+    totals: Dict[str, list] = {}
+    for row in rows:
+        entry = totals.setdefault(row["type"], [0, 0.0, 0.0, -1])
+        entry[0] += 1
+        entry[1] += row["a"]
+        entry[2] += row["b"]
+        row_id = row.get("id")
+        if row_id is None or entry[3] is None:
+            entry[3] = None
+        else:
+            entry[3] = max(entry[3], row_id)
+    return totals
+
+
+def _newest_id(type_: str):
+    return select(func.max(Calculation.id)).where(Calculation.type == type_).scalar_subquery()
+
+
+def _add_without_upsert(
+    type_: str, count: int, sum_a: float, sum_b: float, new_max_id
+) -> List[Executable]:
+    """
+    The upsert for dialects without ON CONFLICT: add to an existing row,
+    then insert the row if there was none.
+    """
+    if isinstance(new_max_id, int):
+        new_max_id = literal(new_max_id, CalculationStats.max_id.type)
+    values = [
+        literal(type_, CalculationStats.type.type),
+        literal(count, CalculationStats.count.type),
+        literal(sum_a, CalculationStats.sum_a.type),
+        literal(sum_b, CalculationStats.sum_b.type),
+        new_max_id,
+    ]
+    missing = ~select(CalculationStats.type).where(CalculationStats.type == type_).exists()
+    return [
+        update(CalculationStats)
+        .where(CalculationStats.type == type_)
+        .values(
+            count=CalculationStats.count + count,
+            sum_a=CalculationStats.sum_a + sum_a,
+            sum_b=CalculationStats.sum_b + sum_b,
+            max_id=case(
+                (CalculationStats.max_id.is_(None), new_max_id),
+                (new_max_id > CalculationStats.max_id, new_max_id),
+                else_=CalculationStats.max_id,
+            ),
+        )
+        .execution_options(synchronize_session=False),
+        insert(CalculationStats).from_select(
+            ["type", "count", "sum_a", "sum_b", "max_id"], select(*values).where(missing)
+        ),
+    ]
+
+
+def _change_statements(
+    dialect_name: str,
+    added: Dict[str, list],
+    removed: Dict[str, list],
+) -> List[Executable]:
+    """Statements for per-type totals (see _aggregate) added and removed."""
+    statements: List[Executable] = []
+
+    # Removed rows were loaded first, so their ids are always known
+    for type_, (count, sum_a, sum_b, max_id) in sorted(removed.items()):
+        statements.append(
+            update(CalculationStats)
+            .where(CalculationStats.type == type_)
+            .values(
+                count=CalculationStats.count - count,
+                sum_a=CalculationStats.sum_a - sum_a,
+                sum_b=CalculationStats.sum_b - sum_b,
+                max_id=case(
+                    (CalculationStats.max_id <= max_id, _newest_id(type_)),
+                    else_=CalculationStats.max_id,
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    insert_ = upsert_insert(dialect_name) if added else None
+    for type_, (count, sum_a, sum_b, max_id) in sorted(added.items()):
+        # Ids unknown (COPY): read the newest id of this type instead
+        new_max_id = _newest_id(type_) if max_id is None else max_id
+        if insert_ is None:
+            statements.extend(_add_without_upsert(type_, count, sum_a, sum_b, new_max_id))
+            continue
+        stmt = insert_(CalculationStats).values(
+            type=type_, count=count, sum_a=sum_a, sum_b=sum_b, max_id=new_max_id
+        )
+        excluded = stmt.excluded
+        statements.append(
+            stmt.on_conflict_do_update(
+                index_elements=[CalculationStats.type],
+                set_={
+                    "count": CalculationStats.count + excluded.count,
+                    "sum_a": CalculationStats.sum_a + excluded.sum_a,
+                    "sum_b": CalculationStats.sum_b + excluded.sum_b,
+                    "max_id": case(
+                        (CalculationStats.max_id.is_(None), excluded.max_id),
+                        (excluded.max_id > CalculationStats.max_id, excluded.max_id),
+                        else_=CalculationStats.max_id,
+                    ),
+                },
+            )
+        )
+    return statements
+
+
+def record_calculation_changes(
+    db: Session,
+    added: Sequence[StatsRow] = (),
+    removed: Sequence[StatsRow] = (),
+) -> None:
+    """Apply added/removed rows to the rollup; the caller commits."""
+    statements = _change_statements(
+        db.get_bind().dialect.name, _aggregate(added), _aggregate(removed)
+    )
+    for stmt in statements:
+        db.execute(stmt)
+
+
+def record_removed_totals(db: Session, totals: Mapping[str, Sequence]) -> None:
+    """
+    Take whole per-type totals (type -> (count, sum_a, sum_b, max_id)) out
+    of the rollup, e.g. for a detached partition; the caller commits.
+    """
+    removed = {type_: list(values) for type_, values in totals.items()}
+    for stmt in _change_statements(db.get_bind().dialect.name, {}, removed):
+        db.execute(stmt)
+
+
+async def record_calculation_changes_async(
+    db: AsyncSession,
+    added: Sequence[StatsRow] = (),
+    removed: Sequence[StatsRow] = (),
+) -> None:
+    """Async version of record_calculation_changes."""
+    statements = _change_statements(
+        db.get_bind().dialect.name, _aggregate(added), _aggregate(removed)
+    )
+    for stmt in statements:
+        await db.execute(stmt)
+
+
+# ----------------------------
+# ORM unit-of-work writes
+# ----------------------------
+# Core statements and ORM bulk inserts do not fire these; those paths call
+# record_calculation_changes(_async) themselves.
+def _apply_in_flush(
+    connection: Connection,
+    added: Sequence[StatsRow] = (),
+    removed: Sequence[StatsRow] = (),
+) -> None:
+    for stmt in _change_statements(connection.dialect.name, _aggregate(added), _aggregate(removed)):
+        connection.execute(stmt)
+
+
+@event.listens_for(Calculation, "after_insert")
+def _calculation_inserted(mapper, connection: Connection, target: Calculation) -> None:
+    _apply_in_flush(connection, added=[stats_row(target)])
+
+
+@event.listens_for(Calculation, "after_delete")
+def _calculation_deleted(mapper, connection: Connection, target: Calculation) -> None:
+    _apply_in_flush(connection, removed=[stats_row(target)])
+
+
+@event.listens_for(Calculation, "before_update")
+def _calculation_updating(mapper, connection: Connection, target: Calculation) -> None:
+    # The old values are usually expired by now, so read them back
+    if any(attributes.get_history(target, name).has_changes() for name in ("type", "a", "b")):
+        old = connection.execute(
+            select(Calculation.type, Calculation.a, Calculation.b).where(Calculation.id == target.id)
+        ).one()
+        attributes.instance_state(target).info["stats_row"] = dict(old._mapping, id=target.id)
+
+
+@event.listens_for(Calculation, "after_update")
+def _calculation_updated(mapper, connection: Connection, target: Calculation) -> None:
+    old = attributes.instance_state(target).info.pop("stats_row", None)
+    if old is not None:
+        _apply_in_flush(connection, added=[stats_row(target)], removed=[old])
+
+
+# ----------------------------
+# Reads
+# ----------------------------
+def _stats_stmt():
+    return select(CalculationStats).where(CalculationStats.count > 0)
+
+
+def read_calculation_stats(db: Session) -> Sequence[CalculationStats]:
+    return db.execute(_stats_stmt()).scalars().all()
+
+
+async def read_calculation_stats_async(db: AsyncSession) -> Sequence[CalculationStats]:
+    result = await db.execute(_stats_stmt())
+    return result.scalars().all()
+
+
+# ----------------------------
+# Rebuild / consistency check
+# ----------------------------
+def _rollup_from_calculations():
+    return select(
+        Calculation.type,
+        func.count(Calculation.id).label("count"),
+        func.coalesce(func.sum(Calculation.a), 0.0).label("sum_a"),
+        func.coalesce(func.sum(Calculation.b), 0.0).label("sum_b"),
+        func.max(Calculation.id).label("max_id"),
+    ).group_by(Calculation.type)
+
+
+async def read_user_calculation_stats_async(db: AsyncSession, user_id: int) -> Sequence[Row]:
+    """
+    Rollup-shaped rows (type, count, sum_a, sum_b, max_id) for one user's
+    calculations, aggregated on the fly: the (user_id, id) index limits the
+    scan to that user's rows.
+    """
+    stmt = _rollup_from_calculations().where(Calculation.user_id == user_id)
+    result = await db.execute(stmt)
+    return result.all()
+
+
+def rebuild_calculation_stats(db: Session) -> int:
+    """Recompute the rollup from calculations in one transaction; returns the type count."""
+    db.execute(delete(CalculationStats))
+    db.execute(
+        insert(CalculationStats).from_select(
+            ["type", "count", "sum_a", "sum_b", "max_id"],
+            _rollup_from_calculations(),
+        )
+    )
+    db.commit()
+    return db.scalar(select(func.count()).select_from(CalculationStats))
+
+
+def check_calculation_stats(db: Session, rel_tol: float = 1e-9) -> List[str]:
+    """
+    Compare the rollup with a fresh aggregate over calculations.
+    Returns one message per mismatching type (empty when consistent).
+    """
+    expected = {row[0]: row[1:] for row in db.execute(_rollup_from_calculations())}
+    stored = {
+        stats.type: (stats.count, stats.sum_a, stats.sum_b, stats.max_id)
+        for stats in db.execute(select(CalculationStats)).scalars()
+    }
+
+    problems = []
+    for type_ in sorted(expected.keys() | stored.keys()):
+        want = expected.get(type_, (0, 0.0, 0.0, None))
+        have = stored.get(type_, (0, 0.0, 0.0, None))
+        same = (
+            want[0] == have[0]
+            and want[3] == have[3]
+            # Sums are maintained by float deltas; allow rounding drift
+            and math.isclose(want[1], have[1], rel_tol=rel_tol, abs_tol=1e-6)
+            and math.isclose(want[2], have[2], rel_tol=rel_tol, abs_tol=1e-6)
+        )
+        if not same:
+            problems.append(
+                f"{type_}: stored count={have[0]} sum_a={have[1]} sum_b={have[2]} max_id={have[3]}, "
+                f"expected count={want[0]} sum_a={want[1]} sum_b={want[2]} max_id={want[3]}"
+            )
+    return problems
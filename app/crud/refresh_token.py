@@ -0,0 +1,112 @@
+# app/crud/refresh_token.py
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import REFRESH_TOKEN_EXPIRE_DAYS, hash_refresh_token, new_refresh_token
+from app.models.refresh_token import RefreshToken
+
+
+class RefreshTokenError(Exception):
+    """Unknown, expired or revoked refresh token."""
+
+
+class RefreshTokenReused(RefreshTokenError):
+    """An already rotated token was presented again; its family is now revoked."""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def add_refresh_token(db: AsyncSession, user_id: int, family_id: str | None = None) -> str:
+    """
+    Add a refresh token row (a new family unless family_id is given) and
+    return the token. The caller commits.
+    """
+    token = new_refresh_token()
+    db.add(
+        RefreshToken(
+            token_hash=hash_refresh_token(token),
+            user_id=user_id,
+            family_id=family_id or secrets.token_hex(16),
+            expires_at=_utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+async def rotate_refresh_token_async(db: AsyncSession, token: str) -> Tuple[int, str]:
+    """
+    Spend `token` and issue its successor; returns (user_id, new token).
+
+    The token is retired with a single conditional UPDATE ... RETURNING, so
+    two concurrent refreshes with the same token cannot both succeed. A
+    token that was already retired means it leaked (or a client replayed
+    it): the whole family is revoked and RefreshTokenReused raised.
+    """
+    now = _utcnow()
+    token_hash = hash_refresh_token(token)
+    spent = (
+        await db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.used_at.is_(None),
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > now,
+            )
+            .values(used_at=now)
+            .returning(RefreshToken.user_id, RefreshToken.family_id)
+            .execution_options(synchronize_session=False)
+        )
+    ).first()
+
+    if spent is None:
+        previous = (
+            await db.execute(
+                select(RefreshToken.family_id, RefreshToken.used_at).where(
+                    RefreshToken.token_hash == token_hash
+                )
+            )
+        ).first()
+        if previous is not None and previous.used_at is not None:
+            await revoke_refresh_token_family_async(db, previous.family_id)
+            await db.commit()
+            raise RefreshTokenReused("Refresh token reuse detected")
+        raise RefreshTokenError("Invalid or expired refresh token")
+
+    new_token = add_refresh_token(db, spent.user_id, spent.family_id)
+    await db.commit()
+    return spent.user_id, new_token
+
+
+async def revoke_refresh_token_family_async(db: AsyncSession, family_id: str) -> None:
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=_utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def revoke_user_refresh_tokens_async(db: AsyncSession, user_id: int) -> None:
+    """Revoke every refresh token of a user (e.g. after a password change). Caller commits."""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=_utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def revoke_refresh_token_async(db: AsyncSession, token: str) -> None:
+    """Revoke the family `token` belongs to (logout). Unknown tokens are ignored. Caller commits."""
+    family_id = await db.scalar(
+        select(RefreshToken.family_id).where(RefreshToken.token_hash == hash_refresh_token(token))
+    )
+    if family_id is not None:
+        await revoke_refresh_token_family_async(db, family_id)
@@ -1,22 +1,60 @@
 # app/crud/user.py
+from typing import Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.db.upsert import insert_or_ignore_async, violated_constraint
 from app.models.user import User
 from app.schemas.user import UserCreate
+from app.core.hashing import hash_password
 from app.core.security import get_password_hash
 
 
+class DuplicateUserError(ValueError):
+    """A username or email is already taken; `field` says which (None if unknown)."""
+
+    def __init__(self, field: Optional[str]):
+        super().__init__(f"{field or 'Username or email'} already taken")
+        self.field = field
+
+
+# Unique index (PostgreSQL) or "table.column" (SQLite) -> field
+_UNIQUE_FIELDS = {
+    **{
+        index.name: column.name
+        for index in User.__table__.indexes
+        if index.unique
+        for column in index.columns
+    },
+    **{f"users.{field}": field for field in ("username", "email")},
+}
+
+
+def _duplicate_field(e: IntegrityError) -> Optional[str]:
+    return _UNIQUE_FIELDS.get(violated_constraint(e))
+
+
 def create_user(db: Session, user_in: UserCreate) -> User:
-    """Create a new user with a hashed password."""
+    """
+    Create a new user with a hashed password: one INSERT ... RETURNING, no
+    refresh. A taken username/email raises IntegrityError.
+    """
     hashed_pw = get_password_hash(user_in.password)
-    db_user = User(
-        username=user_in.username,
-        email=user_in.email,
-        password_hash=hashed_pw,   # ✅ matches model field
-    )
-    db.add(db_user)
+    db_user = db.scalars(
+        insert(User)
+        .values(username=user_in.username, email=user_in.email, password_hash=hashed_pw)
+        .returning(User)
+    ).one()
+    # The commit expires the row (SessionLocal has expire_on_commit=True);
+    # put the RETURNING values back so reading them costs no SELECT
+    returned = {attr.key: getattr(db_user, attr.key) for attr in User.__mapper__.column_attrs}
     db.commit()
-    db.refresh(db_user)
+    for key, value in returned.items():
+        set_committed_value(db_user, key, value)
     return db_user
 
 
@@ -28,3 +66,72 @@ def get_user_by_username(db: Session, username: str) -> User | None:
 def get_user_by_email(db: Session, email: str) -> User | None:
     """Return the first user with this email, or None."""
     return db.query(User).filter(User.email == email).first()
+
+
+# -------------------------
+# Async versions (route handlers)
+# -------------------------
+async def create_user_async(db: AsyncSession, user_in: UserCreate) -> User:
+    """Async version of create_user; bcrypt runs on the hashing pool."""
+    hashed_pw = await hash_password(user_in.password)
+    db_user = (
+        await db.scalars(
+            insert(User)
+            .values(username=user_in.username, email=user_in.email, password_hash=hashed_pw)
+            .returning(User)
+        )
+    ).one()
+    await db.commit()
+    return db_user
+
+
+async def insert_user_async(
+    db: AsyncSession, username: str, email: str, password_hash: str
+) -> User | None:
+    """
+    Insert and commit a user in one INSERT ... ON CONFLICT DO NOTHING
+    RETURNING; None (nothing written) if the username or email is taken.
+    The unique indexes decide, so concurrent sign-ups cannot both win.
+    """
+    row = await insert_or_ignore_async(
+        db, User, {"username": username, "email": email, "password_hash": password_hash}, User
+    )
+    if row is None:
+        await db.rollback()
+        return None
+    await db.commit()
+    return row[0]
+
+
+async def update_user_async(db: AsyncSession, user_id: int, values: dict) -> User | None:
+    """
+    Apply `values` and commit in one UPDATE ... RETURNING; None if there is
+    no such user. A taken username/email raises DuplicateUserError.
+    """
+    stmt = select(User).where(User.id == user_id)
+    if values:
+        stmt = update(User).where(User.id == user_id).values(**values).returning(User)
+    try:
+        db_user = (await db.scalars(stmt)).first()
+    except IntegrityError as e:
+        await db.rollback()
+        raise DuplicateUserError(_duplicate_field(e)) from e
+    await db.commit()
+    return db_user
+
+
+async def get_user_async(db: AsyncSession, user_id: int) -> User | None:
+    """Return the user with this id, or None."""
+    return await db.get(User, user_id)
+
+
+async def get_user_by_username_async(db: AsyncSession, username: str) -> User | None:
+    """Return the first user with this username, or None."""
+    result = await db.execute(select(User).where(User.username == username).limit(1))
+    return result.scalars().first()
+
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> User | None:
+    """Return the first user with this email, or None."""
+    result = await db.execute(select(User).where(User.email == email).limit(1))
+    return result.scalars().first()
@@ -0,0 +1,158 @@
+# app/db/partitions.py
+"""
+Optional native PostgreSQL range partitioning of the calculations table by id.
+
+With CALC_PARTITIONED=true the table is created as PARTITION BY RANGE (id),
+one partition per CALC_PARTITION_SIZE ids plus a DEFAULT partition, so an
+insert past the premade ranges is never refused. Keep partitions ahead of
+the data with `python -m scripts.calculation_partitions create` (the
+DEFAULT partition should stay empty: PostgreSQL will not carve a new range
+out of it once it holds matching rows).
+
+Other databases (SQLite) ignore the setting and keep a single table.
+Partitioning applies when the table is created; an existing plain table is
+not converted.
+"""
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Connection, Table, text
+
+PARTITIONED = os.getenv("CALC_PARTITIONED", "false").lower() in ("1", "true", "yes")
+PARTITION_SIZE = int(os.getenv("CALC_PARTITION_SIZE", "10000000"))
+# Empty partitions kept ready above the current max id
+PARTITION_PREMAKE = int(os.getenv("CALC_PARTITION_PREMAKE", "2"))
+ARCHIVE_SCHEMA = os.getenv("CALC_PARTITION_ARCHIVE_SCHEMA", "calculations_archive")
+
+PARENT_TABLE = "calculations"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+_NAME_RE = re.compile(rf"^{PARENT_TABLE}_(p\d+|default)$")
+_BOUND_RE = re.compile(r"FOR VALUES FROM \('?(-?\d+)'?\) TO \('?(-?\d+)'?\)")
+
+
+class PartitionInfo(NamedTuple):
+    name: str
+    lower: Optional[int]  # None for the DEFAULT partition
+    upper: Optional[int]
+
+
+def partition_table_options() -> dict:
+    """Table kwargs for Calculation.__table_args__ (ignored outside PostgreSQL)."""
+    return {"postgresql_partition_by": "RANGE (id)"} if PARTITIONED else {}
+
+
+def partition_name(index: int) -> str:
+    return f"{PARENT_TABLE}_p{index:06d}"
+
+
+def partition_bounds(index: int) -> Tuple[int, int]:
+    return index * PARTITION_SIZE, (index + 1) * PARTITION_SIZE
+
+
+def partition_index(calc_id: int) -> int:
+    return calc_id // PARTITION_SIZE
+
+
+def _is_partitioned(conn: Connection) -> bool:
+    return bool(
+        conn.scalar(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = :name AND c.relnamespace = to_regnamespace(current_schema())"
+            ),
+            {"name": PARENT_TABLE},
+        )
+    )
+
+
+def list_partitions(conn: Connection) -> List[PartitionInfo]:
+    """Attached partitions of calculations, ordered by lower bound (DEFAULT last)."""
+    rows = conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent)"
+        ),
+        {"parent": PARENT_TABLE},
+    ).all()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound or "")
+        if match:
+            partitions.append(PartitionInfo(name, int(match.group(1)), int(match.group(2))))
+        else:
+            partitions.append(PartitionInfo(name, None, None))
+    partitions.sort(key=lambda p: (p.lower is None, p.lower or 0))
+    return partitions
+
+
+def ensure_partitions(conn: Connection, up_to_id: int = 0) -> List[str]:
+    """
+    Create any missing range partitions from 0 through the one holding
+    up_to_id plus PARTITION_PREMAKE more, and the DEFAULT partition.
+    Returns the names created.
+    """
+    existing = {p.name for p in list_partitions(conn)}
+    created = []
+    for index in range(partition_index(up_to_id) + PARTITION_PREMAKE + 1):
+        name = partition_name(index)
+        if name in existing:
+            continue
+        lower, upper = partition_bounds(index)
+        conn.execute(
+            text(
+                f'CREATE TABLE "{name}" PARTITION OF "{PARENT_TABLE}" '
+                f"FOR VALUES FROM ({lower}) TO ({upper})"
+            )
+        )
+        created.append(name)
+    if DEFAULT_PARTITION not in existing:
+        conn.execute(text(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{PARENT_TABLE}" DEFAULT'))
+        created.append(DEFAULT_PARTITION)
+    return created
+
+
+def create_initial_partitions(target: Table, connection: Connection, **kw) -> None:
+    """after_create hook: a partitioned table accepts no rows until partitions exist."""
+    if connection.dialect.name == "postgresql" and _is_partitioned(connection):
+        ensure_partitions(connection)
+
+
+def _require_partition(conn: Connection, name: str) -> PartitionInfo:
+    # Names are interpolated into DDL; only accept partitions that exist
+    for partition in list_partitions(conn):
+        if partition.name == name:
+            return partition
+    raise ValueError(f"{name} is not a partition of {PARENT_TABLE}.")
+
+
+def partition_totals(conn: Connection, name: str) -> Dict[str, tuple]:
+    """type -> (count, sum_a, sum_b, max_id) for one partition's rows."""
+    _require_partition(conn, name)
+    rows = conn.execute(
+        text(f'SELECT type, count(*), sum(a), sum(b), max(id) FROM "{name}" GROUP BY type')
+    ).all()
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def detach_partition(conn: Connection, name: str) -> None:
+    """Detach a partition; its rows leave calculations but stay in the table `name`."""
+    _require_partition(conn, name)
+    conn.execute(text(f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{name}"'))
+
+
+def archive_table(conn: Connection, name: str) -> str:
+    """Move an already detached partition into ARCHIVE_SCHEMA; returns its new name."""
+    if not _NAME_RE.match(name):
+        raise ValueError(f"{name} is not a {PARENT_TABLE} partition name.")
+    if any(p.name == name for p in list_partitions(conn)):
+        raise ValueError(f"{name} is still attached; detach it first.")
+    if conn.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is None:
+        raise ValueError(f"No table named {name}.")
+    conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{ARCHIVE_SCHEMA}"'))
+    conn.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{ARCHIVE_SCHEMA}"'))
+    return f"{ARCHIVE_SCHEMA}.{name}"
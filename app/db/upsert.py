@@ -0,0 +1,63 @@
+# app/db/upsert.py
+import re
+from typing import Any, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Dialects whose insert() construct has ON CONFLICT support
+ON_CONFLICT_DIALECTS = ("postgresql", "sqlite")
+
+# SQLite reports the columns, e.g. "UNIQUE constraint failed: users.email"
+_SQLITE_UNIQUE_RE = re.compile(r"UNIQUE constraint failed: ([\w.]+(?:, [\w.]+)*)")
+
+
+def upsert_insert(dialect_name: str):
+    """
+    The dialect's insert() construct, which has ON CONFLICT support; None on
+    other dialects (callers fall back to a plain INSERT).
+    """
+    if dialect_name not in ON_CONFLICT_DIALECTS:
+        return None
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert
+
+
+async def insert_or_ignore_async(db: AsyncSession, model, values: dict, *returning: Any) -> Optional[Row]:
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING `returning`; the returned
+    row, or None when a unique key already exists. Without ON CONFLICT the
+    row goes in with a plain INSERT inside a savepoint and the
+    IntegrityError is swallowed instead. The caller commits.
+    """
+    insert_ = upsert_insert(db.get_bind().dialect.name)
+    if insert_ is not None:
+        stmt = insert_(model).values(**values).on_conflict_do_nothing().returning(*returning)
+        return (await db.execute(stmt)).first()
+    try:
+        async with db.begin_nested():
+            return (await db.execute(insert(model).values(**values).returning(*returning))).first()
+    except IntegrityError:
+        return None
+
+
+def violated_constraint(e: IntegrityError) -> Optional[str]:
+    """
+    Name of the constraint or unique index behind an IntegrityError, or for
+    SQLite (which has no names) its "table.column" list; None if unknown.
+    """
+    orig = e.orig
+    diag = getattr(orig, "diag", None)  # psycopg2
+    if diag is not None and diag.constraint_name:
+        return diag.constraint_name
+    # asyncpg, wrapped by SQLAlchemy's DBAPI adapter
+    name = getattr(orig.__cause__, "constraint_name", None)
+    if name:
+        return name
+    match = _SQLITE_UNIQUE_RE.search(str(orig))
+    return match.group(1) if match else None
@@ -1,10 +1,150 @@
 # app/dependencies.py
-from typing import Generator
-from app.db.session import SessionLocal
+import math
+from typing import AsyncGenerator, Callable, Generator, NamedTuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.rate_limit import AUTH_RATE_LIMIT_TRUST_FORWARDED, RateLimited, auth_rate_limiter
+from app.core.revocation import token_revocations
+from app.core.security import decode_access_token
+from app.core.user_cache import current_user_cache
+from app.crud.user import get_user_by_email_async
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.models.user import User
+
 
 def get_db() -> Generator:
+    """Blocking session; kept for sync code paths and scripts."""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _too_many_attempts(e: RateLimited) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, try again later.",
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
+def client_ip(request: Request) -> str:
+    if AUTH_RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def check_account_rate_limit(account: str) -> None:
+    try:
+        auth_rate_limiter.check_account(account)
+    except RateLimited as e:
+        raise _too_many_attempts(e)
+
+
+async def auth_rate_limit(request: Request) -> Callable[[str], None]:
+    """
+    Rate-limits the calling IP (429 with Retry-After) and returns the
+    per-account check, which the route calls once it knows the account.
+    """
+    try:
+        auth_rate_limiter.check_ip(client_ip(request))
+    except RateLimited as e:
+        raise _too_many_attempts(e)
+    return check_account_rate_limit
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def _unauthorized() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+class AuthenticatedToken(NamedTuple):
+    user: User
+    claims: dict
+
+
+async def _authenticate(token: str) -> AuthenticatedToken:
+    cached = current_user_cache.get(token)
+    if cached is not None:
+        user, claims = cached
+    else:
+        claims = decode_access_token(token)
+        if not claims or not claims.get("sub"):
+            raise _unauthorized()
+
+        generation = current_user_cache.generation
+        async with AsyncSessionLocal() as db:
+            user = await get_user_by_email_async(db, claims["sub"])
+            if user is None:
+                raise _unauthorized()
+            db.expunge(user)
+        current_user_cache.put(token, claims, user, generation)
+
+    if await token_revocations.is_revoked(claims, user.id):
+        raise _unauthorized()
+    return AuthenticatedToken(user, claims)
+
+
+async def authenticate_bearer(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer),
+) -> AuthenticatedToken:
+    """
+    The bearer token's claims and the user named by its `sub` (email).
+    Verified tokens are cached with their user until `exp`, so repeat
+    requests skip the signature check and the database; the session is
+    only opened on a miss. Every request is checked against the
+    revocation list (in memory unless the token may be revoked).
+    """
+    if credentials is None:
+        raise _unauthorized()
+    return await _authenticate(credentials.credentials)
+
+
+async def get_current_user(auth: AuthenticatedToken = Depends(authenticate_bearer)) -> User:
+    """
+    The authenticated user. The row is shared between requests: read it,
+    don't modify it.
+    """
+    return auth.user
+
+
+async def get_optional_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer),
+) -> User | None:
+    """Like get_current_user, but None without a bearer token (a bad token is still 401)."""
+    if credentials is None:
+        return None
+    return (await _authenticate(credentials.credentials)).user
+
+
+def check_calculation_owner(user_id: int | None, current_user: User | None) -> None:
+    """
+    A user's calculations are only listed for that user: 401 without a
+    token, 403 for someone else's user_id. No user_id means no check.
+    """
+    if user_id is None:
+        return
+    if current_user is None:
+        raise _unauthorized()
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to access another user's calculations",
+        )
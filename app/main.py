@@ -1,29 +1,97 @@
 # app/main.py
 
-from typing import List
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, status
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app.db.base import Base
 from app.db.session import engine
-from app.dependencies import get_db
+from app.dependencies import (
+    auth_rate_limit,
+    check_calculation_owner,
+    get_async_db,
+    get_current_user,
+    get_optional_current_user,
+)
+from app.crud.calculation import (
+    bulk_create_calculations_async,
+    create_calculation_async,
+    delete_calculation_async,
+    update_calculation_async,
+    decode_cursor,
+    encode_cursor,
+    list_calculations_page_async,
+)
+from app.crud.refresh_token import revoke_user_refresh_tokens_async
+from app.crud.user import (
+    DuplicateUserError,
+    get_user_async,
+    get_user_by_email_async,
+    insert_user_async,
+    update_user_async,
+)
 
 from app.models.user import User
-from app.schemas.user import UserCreate
-from app.core.security import get_password_hash, verify_password
+from app.schemas.user import UserCreate, UserRead, UserUpdate, PasswordChange, UserLogin
+from app.core.hashing import (
+    HashingBusy,
+    check_and_update_password,
+    check_password,
+    hash_password,
+    hashing_pool,
+)
+from app.core.security import configure_password_hashing
 
 from app.models.calculation import Calculation
-from app.schemas.calculation import CalculationCreate, CalculationRead
-
-from app.routers import auth
-from app.core.calculation_factory import perform_calculation  # 🔹 NEW IMPORT
-from app.routers import auth, reports
+from app.schemas.calculation import (
+    CalculationCreate,
+    CalculationRead,
+    CalculationPage,
+    CalculationBatchCreate,
+    CalculationBatchResponse,
+    CalculationBatchRowResult,
+    EXPRESSION_CALC_TYPE,
+    ExpressionEvaluate,
+    ExpressionEvaluateResponse,
+    CalculationImportSummary,
+    dump_calculation_json,
+    dump_calculation_page_json,
+)
 
-from app.schemas.user import UserCreate, UserRead, UserUpdate, PasswordChange, UserLogin
-# ↑ add UserUpdate, PasswordChange to this import
+from app.core.calculation_factory import (
+    CalculationFactory,
+    CalculationTooExpensive,
+    perform_calculation_batch,
+)
+from app.core.executor import (
+    HeavyLaneBroken,
+    HeavyLaneBusy,
+    HeavyLaneTimeout,
+    heavy_lane,
+    run_calculation_async,
+)
+from app.core.result_cache import calculation_cache
+from app.core.summary_cache import report_summary_cache
+from app.core.user_cache import current_user_cache
+from app.core.idempotency import (
+    IdempotencyInProgress,
+    IdempotencyKeyReused,
+    StoredResponse,
+    idempotency_store,
+    request_fingerprint,
+)
+from app.core.revocation import token_revocations
+from app.core.expressions import compile_expression
+from app.core.calculation_import import ImportFormatError, import_calculations
+from app.core.calculation_export import EXPORT_MEDIA_TYPES, export_calculations
+from app.routers import auth, reports, metrics
 
 
 # -------------------------
@@ -34,11 +102,49 @@ Base.metadata.create_all(bind=engine)
 # -------------------------
 # FastAPI app
 # -------------------------
-app = FastAPI(title="FastAPI Calculator API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Calibrate (or load) the bcrypt cost before the hashing pool starts
+    await run_in_threadpool(configure_password_hashing)
+    yield
+    # Stop the process pools (no-op if they never started)
+    heavy_lane.shutdown()
+    hashing_pool.shutdown()
+
+
+app = FastAPI(title="FastAPI Calculator API", lifespan=lifespan)
+
+
+@app.exception_handler(HashingBusy)
+async def hashing_busy_handler(request: Request, exc: HashingBusy):
+    # The password hashing queue is full (login/register bursts)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(IdempotencyInProgress)
+async def idempotency_in_progress_handler(request: Request, exc: IdempotencyInProgress):
+    # The first request with this key is still running; retry shortly
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(IdempotencyKeyReused)
+async def idempotency_key_reused_handler(request: Request, exc: IdempotencyKeyReused):
+    return JSONResponse(
+        status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+        content={"detail": str(exc)},
+    )
 
 # Routers (JWT auth router, etc.)
 app.include_router(auth.router)
 app.include_router(reports.router)   # NEW
+app.include_router(metrics.router)
 
 # Static files (CSS/JS) for front-end
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -63,9 +169,13 @@ def register_page():
 def login_page():
     return FileResponse("app/static/html/login.html")
 
+@app.get("/users/me", response_model=UserRead)
+async def read_current_user(user: User = Depends(get_current_user)):
+    return user
+
 @app.get("/users/{user_id}", response_model=UserRead)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def read_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await get_user_async(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -79,38 +189,34 @@ def reports_page():
     return FileResponse("app/static/html/reports.html")
 
 
+_TAKEN_DETAILS = {"username": "Username already taken", "email": "Email already taken"}
+
+
 @app.put("/users/{user_id}", response_model=UserRead)
-def update_user(
+async def update_user(
     user_id: int,
     user_in: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    values = {}
+    if user_in.username:
+        values["username"] = user_in.username
+    if user_in.email:
+        values["email"] = user_in.email
+
+    # One UPDATE ... RETURNING; the unique indexes catch taken names
+    try:
+        user = await update_user_async(db, user_id, values)
+    except DuplicateUserError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=_TAKEN_DETAILS.get(e.field, "Username or email already exists"),
+        )
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # If username is changing, check uniqueness
-    if user_in.username and user_in.username != user.username:
-        existing = db.query(User).filter(User.username == user_in.username).first()
-        if existing:
-            raise HTTPException(
-                status_code=400,
-                detail="Username already taken",
-            )
-        user.username = user_in.username
-
-    # If email is changing, check uniqueness
-    if user_in.email and user_in.email != user.email:
-        existing = db.query(User).filter(User.email == user_in.email).first()
-        if existing:
-            raise HTTPException(
-                status_code=400,
-                detail="Email already taken",
-            )
-        user.email = user_in.email
-
-    db.commit()
-    db.refresh(user)
+    # Cached tokens carry the old row (and an old email no longer matches)
+    current_user_cache.invalidate_user(user.id)
     return user
 
 
@@ -118,65 +224,91 @@ def update_user(
 # USER ROUTES (existing)
 # -------------------------
 @app.post("/users/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
-    existing = (
-        db.query(User)
-        .filter((User.username == user_in.username) | (User.email == user_in.email))
-        .first()
-    )
-    if existing:
+async def register_user(
+    user_in: UserCreate,
+    db: AsyncSession = Depends(get_async_db),
+    check_account=Depends(auth_rate_limit),
+):
+    check_account(user_in.email)
+    # bcrypt is deliberately slow; hash on the hashing pool, not on the event loop
+    hashed_pw = await hash_password(user_in.password)
+    db_user = await insert_user_async(db, user_in.username, user_in.email, hashed_pw)
+    if db_user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or email already exists",
         )
-
-    hashed_pw = get_password_hash(user_in.password)
-    db_user = User(
-        username=user_in.username,
-        email=user_in.email,
-        password_hash=hashed_pw,
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
     return db_user
 
 
 @app.post("/users/login", response_model=UserRead)
-def login_user(user_in: UserLogin, db: Session = Depends(get_db)):
+async def login_user(
+    user_in: UserLogin,
+    db: AsyncSession = Depends(get_async_db),
+    check_account=Depends(auth_rate_limit),
+):
     # Login by email + password
-    db_user = db.query(User).filter(User.email == user_in.email).first()
-    if not db_user or not verify_password(user_in.password, db_user.password_hash):
+    check_account(user_in.email)
+    db_user = await get_user_by_email_async(db, user_in.email)
+    ok, new_hash = (
+        await check_and_update_password(user_in.password, db_user.password_hash)
+        if db_user
+        else (False, None)
+    )
+    if not ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password.",
         )
+    if new_hash:
+        # Stored under an older, cheaper cost; upgrade it while we have the password
+        db_user.password_hash = new_hash
+        await db.commit()
     return db_user
 
 @app.post("/users/{user_id}/change-password")
-def change_password(
+async def change_password(
     user_id: int,
     pw: PasswordChange,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    check_account=Depends(auth_rate_limit),
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await get_user_async(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    check_account(user.email)
 
     # Check old password
-    if not verify_password(pw.old_password, user.password_hash):
+    if not await check_password(pw.old_password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Old password is incorrect",
         )
 
     # Hash and store new password
-    user.password_hash = get_password_hash(pw.new_password)
-    db.commit()
+    user.password_hash = await hash_password(pw.new_password)
+    # Sessions started with the old password can no longer be refreshed
+    await revoke_user_refresh_tokens_async(db, user.id)
+    await db.commit()
+    current_user_cache.invalidate_user(user.id)
 
     return {"detail": "Password updated successfully"}
 
 
+@app.post("/users/{user_id}/revoke-tokens", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_user_tokens(
+    user_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Sign a user out everywhere: every access and refresh token issued so far."""
+    if current_user.id != user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+    await revoke_user_refresh_tokens_async(db, user_id)
+    await token_revocations.revoke_user(db, user_id)
+    current_user_cache.invalidate_user(user_id)
+
+
 # -------------------------
 # CALCULATION ROUTES
 # -------------------------
@@ -186,10 +318,39 @@ def profile_page():
     return FileResponse("app/static/html/profile.html")
 
 
-def _compute_result(a: float, b: float, type_: str) -> float:
-    """Pure function that actually does the math via the calculation factory."""
+async def _compute_result(a: float, b: float, type_: str) -> float:
+    """Does the math via the calculation factory; heavy ops await the heavy lane."""
     try:
-        return perform_calculation(a, b, type_)
+        # Repeated (type, a, b) triples are answered from the result cache
+        return await calculation_cache.get_or_compute_async(a, b, type_, run_calculation_async)
+    except HeavyLaneBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except HeavyLaneTimeout as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e),
+        )
+    except HeavyLaneBroken as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except CalculationTooExpensive as e:
+        # Over the admission budget: refuse before doing the work
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=str(e),
+        )
+    except OverflowError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Result is too large to represent.",
+        )
     except ValueError as e:
         # Convert domain errors into HTTP 400
         raise HTTPException(
@@ -198,10 +359,144 @@ def _compute_result(a: float, b: float, type_: str) -> float:
         )
 
 
-@app.get("/calculations", response_model=List[CalculationRead])
-def browse_calculations(db: Session = Depends(get_db)):
-    calculations = db.query(Calculation).all()
-    return calculations
+def _json_response(content: bytes, status_code: int = status.HTTP_200_OK) -> Response:
+    """Pre-encoded JSON; bypasses response_model validation/serialization."""
+    return Response(content=content, status_code=status_code, media_type="application/json")
+
+
+def _owner_id(current_user: User | None) -> int | None:
+    # Calculations belong to the bearer token's user; anonymous ones to no one
+    return current_user.id if current_user is not None else None
+
+
+def _idempotency_endpoint(endpoint: str, user_id: int | None) -> str:
+    # Keys are per owner: users cannot replay each other's stored responses
+    return endpoint if user_id is None else f"{endpoint} user:{user_id}"
+
+
+async def _idempotent(
+    db: AsyncSession,
+    endpoint: str,
+    idempotency_key: str | None,
+    payload: bytes,
+    handler: Callable[[], Awaitable[Response]],
+) -> Response:
+    """
+    Runs a calculation write once per Idempotency-Key: a retry with the
+    same key and payload gets the stored response back instead of writing
+    again. `handler` writes without committing; the commit here also
+    stores the response, so a crash cannot leave a row without its record.
+    Failed requests store nothing, so their retries run again.
+    """
+    if idempotency_key is None:
+        response = await handler()
+        await db.commit()
+        report_summary_cache.bump()
+        return response
+
+    request_hash = request_fingerprint(payload)
+    stored = await idempotency_store.begin(db, endpoint, idempotency_key, request_hash)
+    if stored is not None:
+        response = _json_response(stored.body, stored.status_code)
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+    try:
+        response = await handler()
+        await idempotency_store.complete(
+            db,
+            endpoint,
+            idempotency_key,
+            request_hash,
+            StoredResponse(response.status_code, bytes(response.body)),
+        )
+    except Exception:
+        await idempotency_store.release(db, endpoint, idempotency_key)
+        raise
+    report_summary_cache.bump()
+    return response
+
+
+@app.get("/calculations/types", response_model=List[str])
+def list_calculation_types():
+    # Straight from the operation registry, including plugin operations
+    return CalculationFactory.available_types()
+
+
+@app.get("/calculations/export")
+async def export_calculations_route(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    type: str | None = None,
+    min_id: int | None = None,
+    max_id: int | None = None,
+    current_user: User | None = Depends(get_optional_current_user),
+):
+    # Split big exports by type and/or id range and run them in parallel.
+    # Only the caller's rows (ownerless ones for anonymous callers)
+    return StreamingResponse(
+        export_calculations(format, type, min_id, max_id, _owner_id(current_user)),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="calculations.{format}"'},
+    )
+
+
+@app.get("/calculations", response_model=CalculationPage)
+async def browse_calculations(
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    type: str | None = None,
+    min_a: float | None = None,
+    max_a: float | None = None,
+    min_b: float | None = None,
+    max_b: float | None = None,
+    min_result: float | None = None,
+    max_result: float | None = None,
+    user_id: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User | None = Depends(get_optional_current_user),
+):
+    # Only the caller's rows (ownerless ones for anonymous callers)
+    check_calculation_owner(user_id, current_user)
+    try:
+        after_id = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    items, last_id = await list_calculations_page_async(
+        db,
+        limit,
+        after_id=after_id,
+        user_id=_owner_id(current_user),
+        type_=type,
+        min_a=min_a,
+        max_a=max_a,
+        min_b=min_b,
+        max_b=max_b,
+        min_result=min_result,
+        max_result=max_result,
+        owner_only=True,
+    )
+    return _json_response(
+        dump_calculation_page_json(
+            items,
+            encode_cursor(last_id) if last_id is not None else None,
+        )
+    )
+
+
+@app.get("/users/{user_id}/calculations", response_model=CalculationPage)
+async def browse_user_calculations(
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    type: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User | None = Depends(get_optional_current_user),
+):
+    # Keyset pages over the (user_id, id) index: only this user's rows are read
+    return await browse_calculations(
+        cursor=cursor, limit=limit, type=type, user_id=user_id, db=db, current_user=current_user
+    )
 
 
 @app.post(
@@ -209,60 +504,242 @@ def browse_calculations(db: Session = Depends(get_db)):
     response_model=CalculationRead,
     status_code=status.HTTP_201_CREATED,
 )
-def add_calculation(
+async def add_calculation(
     calculation_in: CalculationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User | None = Depends(get_optional_current_user),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", min_length=1, max_length=255),
+):
+    user_id = _owner_id(current_user)
+    return await _idempotent(
+        db,
+        _idempotency_endpoint("POST /calculations", user_id),
+        idempotency_key,
+        calculation_in.model_dump_json().encode(),
+        lambda: _create_calculation(calculation_in, user_id, db),
+    )
+
+
+async def _create_calculation(
+    calculation_in: CalculationCreate, user_id: int | None, db: AsyncSession
+) -> Response:
+    result = await _compute_result(calculation_in.a, calculation_in.b, calculation_in.type)
+
+    try:
+        created = await create_calculation_async(
+            db,
+            {
+                "a": calculation_in.a,
+                "b": calculation_in.b,
+                "type": calculation_in.type,
+                "result": result,
+                "user_id": user_id,
+            },
+            commit=False,
+        )
+    except IntegrityError:
+        # Only the user_id foreign key can fail here (user deleted meanwhile)
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User not found",
+        )
+    return _json_response(dump_calculation_json(created), status.HTTP_201_CREATED)
+
+
+@app.post(
+    "/calculations/batch",
+    response_model=CalculationBatchResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def add_calculations_batch(
+    batch_in: CalculationBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User | None = Depends(get_optional_current_user),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", min_length=1, max_length=255),
+):
+    user_id = _owner_id(current_user)
+    return await _idempotent(
+        db,
+        _idempotency_endpoint("POST /calculations/batch", user_id),
+        idempotency_key,
+        batch_in.model_dump_json().encode(),
+        lambda: _create_calculations_batch(batch_in, user_id, db),
+    )
+
+
+async def _create_calculations_batch(
+    batch_in: CalculationBatchCreate, user_id: int | None, db: AsyncSession
+) -> Response:
+    items = batch_in.items
+    # Up to MAX_BATCH_SIZE rows of math; run it in the threadpool
+    results, errors = await run_in_threadpool(
+        perform_calculation_batch,
+        [item.a for item in items],
+        [item.b for item in items],
+        [item.type for item in items],
+    )
+
+    accepted = [i for i, error in enumerate(errors) if error is None]
+    ids = await bulk_create_calculations_async(
+        db,
+        [
+            {
+                "a": items[i].a,
+                "b": items[i].b,
+                "type": items[i].type.lower(),
+                "result": results[i],
+                "user_id": user_id,
+            }
+            for i in accepted
+        ],
+        commit=False,
+    )
+
+    id_by_index = dict(zip(accepted, ids))
+    response = CalculationBatchResponse(
+        accepted=len(accepted),
+        rejected=len(items) - len(accepted),
+        results=[
+            CalculationBatchRowResult(
+                index=i,
+                id=id_by_index.get(i),
+                result=results[i],
+                error=errors[i],
+            )
+            for i in range(len(items))
+        ],
+    )
+    return _json_response(response.model_dump_json().encode(), status.HTTP_201_CREATED)
+
+
+@app.post("/calculations/expression", response_model=ExpressionEvaluateResponse)
+async def evaluate_expression(
+    expression_in: ExpressionEvaluate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User | None = Depends(get_optional_current_user),
 ):
-    result = _compute_result(calculation_in.a, calculation_in.b, calculation_in.type)
+    try:
+        # Compiled plans are cached by expression text
+        plan = compile_expression(expression_in.expression)
+        results, errors = await run_in_threadpool(plan.evaluate_many, expression_in.variables)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
-    db_calc = Calculation(
-        a=calculation_in.a,
-        b=calculation_in.b,
-        type=calculation_in.type,
-        result=result,
+    accepted = [i for i, error in enumerate(errors) if error is None]
+    id_by_index: dict[int, int] = {}
+    if expression_in.store:
+        # a/b columns keep the "a"/"b" bindings when the expression uses them
+        a_values = expression_in.variables["a"] if "a" in plan.variables else None
+        b_values = expression_in.variables["b"] if "b" in plan.variables else None
+        ids = await bulk_create_calculations_async(
+            db,
+            [
+                {
+                    "a": a_values[i] if a_values else 0.0,
+                    "b": b_values[i] if b_values else 0.0,
+                    "type": EXPRESSION_CALC_TYPE,
+                    "result": results[i],
+                    "expression": plan.text,
+                    "user_id": _owner_id(current_user),
+                }
+                for i in accepted
+            ],
+        )
+        report_summary_cache.bump()
+        id_by_index = dict(zip(accepted, ids))
+
+    response = ExpressionEvaluateResponse(
+        expression=plan.text,
+        accepted=len(accepted),
+        rejected=len(errors) - len(accepted),
+        results=[
+            CalculationBatchRowResult(
+                index=i,
+                id=id_by_index.get(i),
+                result=results[i],
+                error=errors[i],
+            )
+            for i in range(len(errors))
+        ],
     )
-    db.add(db_calc)
-    db.commit()
-    db.refresh(db_calc)
-    return db_calc
+    return _json_response(to_json(response, inf_nan_mode="null"))
+
+
+@app.post("/calculations/import", response_model=CalculationImportSummary)
+async def import_calculations_route(
+    request: Request,
+    format: str | None = Query(None, pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Format from ?format=, else from the Content-Type (text/csv -> csv)
+    fmt = format
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "csv" if content_type.startswith("text/csv") else "ndjson"
+
+    try:
+        return await import_calculations(db, request.stream(), fmt)
+    except ImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    finally:
+        # Chunks commit as they go, so even a failed import may have written rows
+        report_summary_cache.bump()
 
 
 @app.get("/calculations/{calc_id}", response_model=CalculationRead)
-def read_calculation(calc_id: int, db: Session = Depends(get_db)):
-    calc = db.query(Calculation).filter(Calculation.id == calc_id).first()
-    if not calc:
+async def read_calculation(
+    calc_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User | None = Depends(get_optional_current_user),
+):
+    calc = await db.get(Calculation, calc_id)
+    # Someone else's row is as good as missing
+    if not calc or calc.user_id != _owner_id(current_user):
         raise HTTPException(status_code=404, detail="Calculation not found")
-    return calc
+    return _json_response(dump_calculation_json(calc))
 
 
 @app.put("/calculations/{calc_id}", response_model=CalculationRead)
-def edit_calculation(
+async def edit_calculation(
     calc_id: int,
     calculation_in: CalculationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
 ):
-    calc = db.query(Calculation).filter(Calculation.id == calc_id).first()
-    if not calc:
+    result = await _compute_result(calculation_in.a, calculation_in.b, calculation_in.type)
+
+    # Only the owner's row matches; anyone else gets 404
+    calc = await update_calculation_async(
+        db,
+        calc_id,
+        {
+            "a": calculation_in.a,
+            "b": calculation_in.b,
+            "type": calculation_in.type,
+            "result": result,
+        },
+        user_id=current_user.id,
+    )
+    if calc is None:
         raise HTTPException(status_code=404, detail="Calculation not found")
-
-    result = _compute_result(calculation_in.a, calculation_in.b, calculation_in.type)
-
-    calc.a = calculation_in.a
-    calc.b = calculation_in.b
-    calc.type = calculation_in.type
-    calc.result = result
-
-    db.commit()
-    db.refresh(calc)
-    return calc
+    report_summary_cache.bump()
+    return _json_response(dump_calculation_json(calc))
 
 
 @app.delete("/calculations/{calc_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_calculation(calc_id: int, db: Session = Depends(get_db)):
-    calc = db.query(Calculation).filter(Calculation.id == calc_id).first()
-    if not calc:
+async def delete_calculation(
+    calc_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    if not await delete_calculation_async(db, calc_id, user_id=current_user.id):
         raise HTTPException(status_code=404, detail="Calculation not found")
-
-    db.delete(calc)
-    db.commit()
+    report_summary_cache.bump()
     return
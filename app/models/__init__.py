@@ -1,2 +1,10 @@
 # app/models/__init__.py
 from app.models.user import User  # noqa: F401
+from app.models.calculation import Calculation  # noqa: F401
+from app.models.calculation_stats import CalculationStats  # noqa: F401
+from app.models.refresh_token import RefreshToken  # noqa: F401
+from app.models.token_revocation import TokenRevocation  # noqa: F401
+from app.models.idempotency_key import IdempotencyKey  # noqa: F401
+
+# Keeps calculation_stats in step with ORM writes to calculations
+import app.crud.calculation_stats  # noqa: F401,E402
@@ -1,14 +1,37 @@
-from sqlalchemy import Column, Integer, Float, String
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Float, String, Index, event, func
 
 # ⬇️ IMPORTANT: copy this line EXACTLY from app/models/user.py
 from app.db.base import Base  # OR from app.db.base_class import Base — use whatever user.py uses
+from app.db.partitions import create_initial_partitions, partition_table_options
 
 
 class Calculation(Base):
     __tablename__ = "calculations"
 
     id = Column(Integer, primary_key=True, index=True)
-    a = Column(Float, nullable=False)
-    b = Column(Float, nullable=False)
+    # a/b/result are indexed for the range filters of GET /calculations
+    a = Column(Float, nullable=False, index=True)
+    b = Column(Float, nullable=False, index=True)
     type = Column(String, nullable=False, index=True)
-    result = Column(Float, nullable=False)
+    result = Column(Float, nullable=False, index=True)
+    # Set for rows stored by the expression endpoint (type == "expression")
+    expression = Column(String, nullable=True)
+    # Owner; None for anonymous calculations
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    # Set by the database, so COPY/bulk inserts get it too (UTC on SQLite)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # Keyset pages filtered by type: WHERE type = ? AND id > ? ORDER BY id
+        Index("ix_calculations_type_id", "type", "id"),
+        # Per-user keyset pages / recent lists: WHERE user_id = ? [AND id > ?] ORDER BY id
+        Index("ix_calculations_user_id_id", "user_id", "id"),
+        # Rows arrive in time order, so a BRIN index (a few pages for the whole
+        # table) is enough for range scans; other databases get a B-tree
+        Index("ix_calculations_created_at", "created_at", postgresql_using="brin"),
+        # PARTITION BY RANGE (id) on PostgreSQL when CALC_PARTITIONED is set
+        partition_table_options(),
+    )
+
+
+event.listen(Calculation.__table__, "after_create", create_initial_partitions)
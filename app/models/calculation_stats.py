@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Float, Integer, String
+
+from app.db.base import Base
+
+
+class CalculationStats(Base):
+    """
+    Per-type rollup of the calculations table, kept in step with it by the
+    write paths (app/crud/calculation_stats.py) so reports never scan
+    calculations.
+    """
+    __tablename__ = "calculation_stats"
+
+    type = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sum_a = Column(Float, nullable=False, default=0.0)
+    sum_b = Column(Float, nullable=False, default=0.0)
+    # None once every row of this type is gone
+    max_id = Column(Integer, nullable=True)
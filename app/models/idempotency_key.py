@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Response stored for an Idempotency-Key header (app/core/idempotency.py).
+    A row with no status_code is a request still in progress, claimed at
+    locked_at. Rows are dropped once expires_at passes.
+    """
+    __tablename__ = "idempotency_keys"
+
+    # "POST /calculations" etc.; the same key may be used on each endpoint
+    endpoint = Column(String(64), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    # SHA-256 of the validated request body
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+
+from app.db.base import Base
+
+
+class RefreshToken(Base):
+    """
+    One issued refresh token. Only an HMAC of the token is stored. Each
+    use retires the row (used_at) and issues a successor in the same
+    family; presenting a retired token revokes the whole family.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Shared by every token rotated from the same login
+    family_id = Column(String(32), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    used_at = Column(DateTime(timezone=True), nullable=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, String
+
+from app.db.base import Base
+
+
+class TokenRevocation(Base):
+    """
+    Denylist for access tokens, read through the bloom filter in
+    app/core/revocation.py. `key` is "jti:<jti>" for one token or
+    "user:<id>" for every token of a user issued before `not_before`.
+    Rows are dropped once expires_at passes: by then the tokens they
+    cover have expired anyway.
+    """
+    __tablename__ = "token_revocations"
+
+    key = Column(String(64), primary_key=True)
+    not_before = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
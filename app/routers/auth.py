@@ -1,18 +1,19 @@
 # app/routers/auth.py
-from datetime import datetime, timedelta
-
 from fastapi import APIRouter, Depends, HTTPException, status
-from jose import jwt
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
-
-from app.core.security import get_password_hash, verify_password
-from app.dependencies import get_db
-from app.models.user import User
-
-SECRET_KEY = "change-me-in-real-life"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.hashing import check_and_update_password, hash_password
+from app.core.security import create_access_token
+from app.core.revocation import token_revocations
+from app.crud.refresh_token import (
+    RefreshTokenError,
+    add_refresh_token,
+    revoke_refresh_token_async,
+    rotate_refresh_token_async,
+)
+from app.crud.user import get_user_async, get_user_by_email_async, insert_user_async
+from app.dependencies import AuthenticatedToken, auth_rate_limit, authenticate_bearer, get_async_db
 
 router = APIRouter(tags=["auth"])
 
@@ -31,48 +32,93 @@ class LoginRequest(BaseModel):
 class TokenResponse(BaseModel):
   access_token: str
   token_type: str = "bearer"
+  refresh_token: str | None = None
+
 
+class RefreshRequest(BaseModel):
+  refresh_token: str
 
-def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
-  to_encode = data.copy()
-  expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-  to_encode.update({"exp": expire})
-  return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+class LogoutRequest(BaseModel):
+  refresh_token: str | None = None
 
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(payload: RegisterRequest, db: Session = Depends(get_db)):
-  existing = (
-      db.query(User)
-      .filter((User.username == payload.username) | (User.email == payload.email))
-      .first()
+async def register(
+    payload: RegisterRequest,
+    db: AsyncSession = Depends(get_async_db),
+    check_account=Depends(auth_rate_limit),
+):
+  check_account(payload.email)
+  user = await insert_user_async(
+      db, payload.username, payload.email, await hash_password(payload.password)
   )
-  if existing:
+  if user is None:
     raise HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST,
         detail="Username or email already exists",
     )
-
-  user = User(
-      username=payload.username,
-      email=payload.email,
-      password_hash=get_password_hash(payload.password),
-  )
-  db.add(user)
-  db.commit()
-  db.refresh(user)
   return {"id": user.id, "username": user.username, "email": user.email}
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):  # ✅
+async def login(
+    payload: LoginRequest,
+    db: AsyncSession = Depends(get_async_db),
+    check_account=Depends(auth_rate_limit),
+):
+    check_account(payload.email)
+    user = await get_user_by_email_async(db, payload.email)
+    ok, new_hash = (
+        await check_and_update_password(payload.password, user.password_hash)
+        if user
+        else (False, None)
+    )
+    if not ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
+    if new_hash:
+        # Rehash at the current cost
+        user.password_hash = new_hash
+    refresh_token = add_refresh_token(db, user.id)
+    await db.commit()
 
     token = create_access_token({"sub": user.email})
-    return TokenResponse(access_token=token)
-
+    return TokenResponse(access_token=token, refresh_token=refresh_token)
+
+
+@router.post("/token/refresh", response_model=TokenResponse)
+async def refresh(payload: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Trade a refresh token for a new access token and its successor refresh
+    token, without a password check. Each refresh token works once.
+    """
+    try:
+        user_id, refresh_token = await rotate_refresh_token_async(db, payload.refresh_token)
+    except RefreshTokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+        )
+    user = await get_user_async(db, user_id)
+    token = create_access_token({"sub": user.email})
+    return TokenResponse(access_token=token, refresh_token=refresh_token)
+
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    payload: LogoutRequest | None = None,
+    auth: AuthenticatedToken = Depends(authenticate_bearer),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Revoke the bearer access token and, if given, the refresh token's family."""
+    if payload is not None and payload.refresh_token:
+        await revoke_refresh_token_async(db, payload.refresh_token)
+    # Tokens issued before jti existed can only be revoked per user
+    if auth.claims.get("jti"):
+        await token_revocations.revoke_token(db, auth.claims["jti"], auth.claims["exp"])
+    else:
+        await token_revocations.revoke_user(db, auth.user.id)
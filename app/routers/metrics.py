@@ -0,0 +1,63 @@
+# app/routers/metrics.py
+from fastapi import APIRouter
+
+from app.core.executor import heavy_lane
+from app.core.hashing import hashing_pool
+from app.core.idempotency import idempotency_store
+from app.core.rate_limit import auth_rate_limiter
+from app.core.revocation import token_revocations
+from app.core.result_cache import calculation_cache
+from app.core.summary_cache import report_summary_cache
+from app.core.user_cache import current_user_cache
+from app.db.pool import pool_status
+from app.db.session import async_engine, engine
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/calculation-cache")
+def get_calculation_cache_stats() -> dict:
+    return calculation_cache.stats()
+
+
+@router.get("/heavy-lane")
+def get_heavy_lane_stats() -> dict:
+    return heavy_lane.stats()
+
+
+@router.get("/password-hashing")
+def get_password_hashing_stats() -> dict:
+    return hashing_pool.stats()
+
+
+@router.get("/auth-rate-limit")
+def get_auth_rate_limit_stats() -> dict:
+    return auth_rate_limiter.stats()
+
+
+@router.get("/current-user-cache")
+def get_current_user_cache_stats() -> dict:
+    return current_user_cache.stats()
+
+
+@router.get("/token-revocations")
+def get_token_revocation_stats() -> dict:
+    return token_revocations.stats()
+
+
+@router.get("/idempotency")
+def get_idempotency_stats() -> dict:
+    return idempotency_store.stats()
+
+
+@router.get("/report-summary-cache")
+def get_report_summary_cache_stats() -> dict:
+    return report_summary_cache.stats()
+
+
+@router.get("/db-pool")
+def get_db_pool_stats() -> dict:
+    return {
+        "sync": pool_status(engine.pool),
+        "async": pool_status(async_engine.sync_engine.pool),
+    }
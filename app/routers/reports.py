@@ -1,37 +1,42 @@
 # app/routers/reports.py
+from datetime import datetime, timezone
 from typing import List
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.dependencies import get_db
-from app.models.calculation import Calculation
-from app.schemas.calculation import CalculationRead
-from app.schemas.report import ReportSummary
+from app.core.summary_cache import report_summary_cache
+from app.db.partitions import PARTITIONED, partition_bounds, partition_index
+from app.dependencies import check_calculation_owner, get_async_db, get_optional_current_user
+from app.crud.calculation import (
+    TIMESERIES_BUCKETS,
+    calculation_timeseries_async,
+    recent_calculations_async,
+)
+from app.crud.calculation_stats import (
+    read_calculation_stats_async,
+    read_user_calculation_stats_async,
+)
+from app.models.user import User
+from app.schemas.calculation import CalculationRead, dump_calculations_json
+from app.schemas.report import ReportSummary, ReportTimeseries, TimeseriesPoint
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+# Bounds the created_at range a single time series may scan
+MAX_TIMESERIES_BUCKETS = 10_000
+DEFAULT_TIMESERIES_BUCKETS = 60
 
-@router.get("/summary", response_model=ReportSummary)
-def get_summary(db: Session = Depends(get_db)) -> ReportSummary:
-    # Total calculations
-    total = db.query(func.count(Calculation.id)).scalar() or 0
-
-    # Counts per type
-    rows = (
-        db.query(Calculation.type, func.count(Calculation.id))
-        .group_by(Calculation.type)
-        .all()
-    )
-    counts_by_type = {row[0]: row[1] for row in rows}
+
+def _summary_from_stats(stats) -> ReportSummary:
+    # stats: one (type, count, sum_a, sum_b, max_id) row per type
+    counts_by_type = {row.type: row.count for row in stats}
+    total = sum(counts_by_type.values())
 
     # Averages
-    avg_a, avg_b = db.query(
-        func.avg(Calculation.a), func.avg(Calculation.b)
-    ).one()
-    average_a = float(avg_a) if avg_a is not None else None
-    average_b = float(avg_b) if avg_b is not None else None
+    average_a = sum(row.sum_a for row in stats) / total if total else None
+    average_b = sum(row.sum_b for row in stats) / total if total else None
 
     # Most used type
     most_used_type = None
@@ -39,15 +44,10 @@ def get_summary(db: Session = Depends(get_db)) -> ReportSummary:
         most_used_type = max(counts_by_type.items(), key=lambda kv: kv[1])[0]
 
     # Last calculation (by id)
-    last_calc = (
-        db.query(Calculation)
-        .order_by(Calculation.id.desc())
-        .first()
-    )
-    last_id = last_calc.id if last_calc else None
+    last_id = max((row.max_id for row in stats if row.max_id is not None), default=None)
 
     return ReportSummary(
-        total_calculations=int(total),
+        total_calculations=total,
         counts_by_type=counts_by_type,
         average_a=average_a,
         average_b=average_b,
@@ -56,17 +56,89 @@ def get_summary(db: Session = Depends(get_db)) -> ReportSummary:
     )
 
 
+async def _compute_summary(db: AsyncSession) -> ReportSummary:
+    # One row per type from the rollup; no pass over calculations
+    return _summary_from_stats(await read_calculation_stats_async(db))
+
+
+@router.get("/summary", response_model=ReportSummary)
+async def get_summary(
+    user_id: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User | None = Depends(get_optional_current_user),
+) -> ReportSummary:
+    check_calculation_owner(user_id, current_user)
+    if user_id is not None:
+        # Only this user's rows (via the (user_id, id) index); not cached
+        return _summary_from_stats(await read_user_calculation_stats_async(db, user_id))
+    # Recomputed only after a write (or once the cache entry is too old)
+    return await report_summary_cache.get(lambda: _compute_summary(db))
+
+
 @router.get("/recent", response_model=List[CalculationRead])
-def get_recent_calculations(
+async def get_recent_calculations(
     limit: int = 10,
-    db: Session = Depends(get_db),
-) -> list[Calculation]:
+    user_id: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User | None = Depends(get_optional_current_user),
+) -> Response:
+    check_calculation_owner(user_id, current_user)
     limit = max(1, min(limit, 100))  # clamp 1–100
-    items = (
-        db.query(Calculation)
-        .order_by(Calculation.id.desc())
-        .limit(limit)
-        .all()
+
+    min_id = None
+    if PARTITIONED:
+        # Bound the scan to the newest two id partitions (newest id from the
+        # rollup, O(types)) so only those are planned and scanned
+        newest = max(
+            (row.max_id for row in await read_calculation_stats_async(db) if row.max_id is not None),
+            default=None,
+        )
+        if newest is not None:
+            min_id = partition_bounds(max(partition_index(newest) - 1, 0))[0]
+
+    items = await recent_calculations_async(db, limit, user_id, min_id)
+    if min_id is not None and len(items) < limit:
+        # Sparse newest partitions (or a user's rows): fall back to the full table
+        items = await recent_calculations_async(db, limit, user_id)
+    # Newest first; rows go straight to JSON bytes (no CalculationRead models)
+    return Response(content=dump_calculations_json(items), media_type="application/json")
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive timestamps are taken as UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+@router.get("/timeseries", response_model=ReportTimeseries)
+async def get_timeseries(
+    bucket: str = Query("minute", pattern="^(minute|hour|day)$"),
+    type: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: AsyncSession = Depends(get_async_db),
+) -> ReportTimeseries:
+    # Defaults: the last DEFAULT_TIMESERIES_BUCKETS buckets up to now
+    step = TIMESERIES_BUCKETS[bucket]
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - DEFAULT_TIMESERIES_BUCKETS * step
+
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end.",
+        )
+    if (end - start) / step > MAX_TIMESERIES_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range spans more than {MAX_TIMESERIES_BUCKETS} {bucket} buckets.",
+        )
+
+    points = await calculation_timeseries_async(db, bucket, start, end, type)
+    return ReportTimeseries(
+        bucket=bucket,
+        start=start,
+        end=end,
+        points=[TimeseriesPoint(**point) for point in points],
     )
-    # return newest first is fine; or reversed(items) if you want oldest→newest
-    return items
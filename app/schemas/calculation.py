@@ -1,22 +1,14 @@
 # app/schemas/calculation.py
-from typing import Optional
-
-from pydantic import BaseModel, field_validator, model_validator
-
-# All allowed calculation types for this project
-ALLOWED_CALC_TYPES = {
-    "add",
-    "sub",
-    "mul",
-    "div",
-    "power",
-    "mod",
-    "floordiv",
-    "sqrt",
-    "log",
-    "factorial",
-    "absdiff",
-}
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from pydantic_core import to_json
+
+from app.core.calculation_factory import CalculationFactory, OPERATION_REGISTRY
+
+# All allowed calculation types: a live view of the operation registry, so
+# operations registered later (decorator or plugin) are accepted too.
+ALLOWED_CALC_TYPES = OPERATION_REGISTRY.keys()
 
 
 # ----------------------------
@@ -40,34 +32,10 @@ class CalculationBase(BaseModel):
     @model_validator(mode="after")
     def validate_all(self):
         """
-        Cross-field validation for:
-        - division/mod/floordiv by zero
-        - sqrt/log/factorial constraints
+        Cross-field validation is delegated to the operation itself
+        (division by zero, sqrt/log/factorial domains, plugin rules...).
         """
-        t = self.type
-        a = self.a
-        b = self.b
-
-        # Division-like operations cannot have b == 0
-        if t in {"div", "floordiv", "mod"} and b == 0:
-            raise ValueError("Division, floor division, and modulus by zero are not allowed.")
-
-        # Advanced operations constraints
-        if t == "sqrt":
-            if a < 0:
-                raise ValueError("Square root of negative number is not allowed.")
-
-        if t == "log":
-            if a <= 0:
-                raise ValueError("Logarithm is only defined for a > 0.")
-            if b <= 0 or b == 1:
-                raise ValueError("Logarithm base must be > 0 and != 1.")
-
-        if t == "factorial":
-            if a < 0 or int(a) != a:
-                raise ValueError("Factorial is only defined for non-negative integers.")
-
-        # absdiff, power, etc. don't need extra schema-level checks
+        CalculationFactory.get_operation(self.type).validate(self.a, self.b)
         return self
 
 
@@ -76,16 +44,152 @@ class CalculationBase(BaseModel):
 # ----------------------------
 class CalculationCreate(CalculationBase):
     # All validation is done in CalculationBase
-    pass
+
+    @model_validator(mode="before")
+    @classmethod
+    def reject_user_id(cls, data: Any) -> Any:
+        # The owner comes from the bearer token on create and never changes
+        if isinstance(data, dict) and "user_id" in data:
+            raise ValueError("user_id cannot be set; the owner is the authenticated user.")
+        return data
 
 
 # ----------------------------
 # Schema for reading (output)
 # ----------------------------
-class CalculationRead(CalculationBase):
+class CalculationRead(BaseModel):
+    # Not a CalculationBase: stored rows were validated on the way in, and
+    # expression rows (type == "expression") are not a single registry operation.
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
+    a: float
+    b: float
+    type: str
     result: float
     user_id: Optional[int] = None
+    expression: Optional[str] = None
+
+
+class CalculationPage(BaseModel):
+    items: List[CalculationRead]
+    # Pass back as ?cursor= to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
+# ----------------------------
+# Fast read path
+# ----------------------------
+# Stored rows are trusted, so read routes skip building/validating
+# CalculationRead models and encode the rows straight to JSON bytes
+# (see scripts/bench_calculation_read.py). The models above still describe
+# the responses in the OpenAPI schema.
+CALCULATION_READ_FIELDS = tuple(CalculationRead.model_fields)
+
+
+def calculation_to_dict(calc: Any) -> Dict[str, Any]:
+    """CalculationRead-shaped dict from a Calculation object."""
+    return {name: getattr(calc, name, None) for name in CALCULATION_READ_FIELDS}
+
+
+def rows_to_dicts(rows: Sequence[Any]) -> List[Dict[str, Any]]:
+    """CalculationRead-shaped dicts from column rows (Row objects)."""
+    if not rows:
+        return []
+    fields = rows[0]._fields
+    missing = {name: None for name in CALCULATION_READ_FIELDS if name not in fields}
+    items = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        item.update(missing)
+        items.append(item)
+    return items
+
+
+def dump_calculation_json(calc: Any) -> bytes:
+    # inf/nan -> null, like pydantic's own JSON mode
+    return to_json(calculation_to_dict(calc), inf_nan_mode="null")
+
+
+def dump_calculations_json(rows: Sequence[Any]) -> bytes:
+    return to_json(rows_to_dicts(rows), inf_nan_mode="null")
+
+
+def dump_calculation_page_json(rows: Sequence[Any], next_cursor: Optional[str]) -> bytes:
+    return to_json(
+        {"items": rows_to_dicts(rows), "next_cursor": next_cursor},
+        inf_nan_mode="null",
+    )
+
+
+# ----------------------------
+# Batch schemas
+# ----------------------------
+MAX_BATCH_SIZE = 10_000
+
+
+class CalculationBatchItem(BaseModel):
+    # No type/domain validators here: bad rows are rejected one by one
+    # by the batch endpoint instead of failing the whole request.
+    a: float
+    b: float
+    type: str
+
+
+class CalculationBatchCreate(BaseModel):
+    items: List[CalculationBatchItem] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class CalculationBatchRowResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    result: Optional[float] = None
+    error: Optional[str] = None
+
+
+class CalculationBatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[CalculationBatchRowResult]
+
+
+# ----------------------------
+# Expression schemas
+# ----------------------------
+EXPRESSION_CALC_TYPE = "expression"
+
+
+class ExpressionEvaluate(BaseModel):
+    expression: str = Field(..., min_length=1, max_length=500)
+    # variable name -> one value per row; all columns must have the same length
+    variables: Dict[str, List[float]] = Field(default_factory=dict)
+    # Store every successful row as a Calculation (type "expression")
+    store: bool = False
+
+    @field_validator("variables")
+    @classmethod
+    def validate_variables(cls, v: Dict[str, List[float]]) -> Dict[str, List[float]]:
+        for name, values in v.items():
+            if len(values) > MAX_BATCH_SIZE:
+                raise ValueError(f"Variable {name!r} has more than {MAX_BATCH_SIZE} values.")
+        return v
+
+
+class ExpressionEvaluateResponse(CalculationBatchResponse):
+    expression: str
+
+
+# ----------------------------
+# Import schemas
+# ----------------------------
+class CalculationImportReject(BaseModel):
+    line: int
+    error: str
+
 
-    class Config:
-        orm_mode = True
+class CalculationImportSummary(BaseModel):
+    accepted: int
+    rejected: int
+    rejects: List[CalculationImportReject]
+    # True when more rows were rejected than are listed in `rejects`
+    rejects_truncated: bool = False
@@ -1,5 +1,6 @@
 # app/schemas/report.py
-from typing import Dict, Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -11,3 +12,20 @@ class ReportSummary(BaseModel):
     average_b: Optional[float] = None
     most_used_type: Optional[str] = None
     last_calculation_id: Optional[int] = None
+
+
+class TimeseriesPoint(BaseModel):
+    bucket_start: datetime
+    type: str
+    count: int
+    average_result: Optional[float] = None
+    min_result: Optional[float] = None
+    max_result: Optional[float] = None
+
+
+class ReportTimeseries(BaseModel):
+    bucket: str
+    start: datetime
+    end: datetime
+    # Ordered by bucket_start, then type; empty buckets are omitted
+    points: List[TimeseriesPoint]
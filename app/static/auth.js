@@ -0,0 +1,47 @@
+// Shared by the static pages: session tokens and the Logout link.
+
+// Revoke the session server-side (access token and refresh token)
+// so the tokens stop working, not just vanish from this browser
+async function revokeSession() {
+    let accessToken = null;
+    let refreshToken = null;
+    try {
+        accessToken = localStorage.getItem("accessToken");
+        refreshToken = localStorage.getItem("refreshToken");
+    } catch (e) {
+        console.warn("Could not read localStorage:", e);
+    }
+    if (!accessToken) return;
+
+    try {
+        await fetch("/logout", {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+                "Authorization": "Bearer " + accessToken
+            },
+            body: JSON.stringify({ refresh_token: refreshToken })
+        });
+    } catch (e) {
+        console.warn("Backend logout failed:", e);
+    }
+}
+
+function setupLogout() {
+    const link = document.getElementById("logout-link");
+    if (!link) return;
+
+    link.addEventListener("click", async (event) => {
+        event.preventDefault();
+        await revokeSession();
+        try {
+            localStorage.removeItem("accessToken");
+            localStorage.removeItem("refreshToken");
+            localStorage.removeItem("currentUserEmail");
+            localStorage.removeItem("currentUserId");
+        } catch (e) {
+            console.warn("Could not clear localStorage:", e);
+        }
+        window.location.href = "/login-page";
+    });
+}
@@ -0,0 +1 @@
+# Maintenance and benchmark commands: python -m scripts.<name>
@@ -0,0 +1,98 @@
+# scripts/bench_calculation_read.py
+"""
+Per-row cost of serving calculation listings, before and after the lean
+read path.
+
+    python -m scripts.bench_calculation_read [--rows 10000] [--repeat 5]
+
+before: load Calculation entities, validate them into a CalculationBase
+        model (type + cross-field validators), dump, json.dumps
+        -- what FastAPI's response_model did for every row
+after:  select plain columns and encode them with dump_calculations_json
+"""
+import argparse
+import json
+import time
+from typing import List, Optional
+
+from pydantic import ConfigDict, TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401
+from app.db.base import Base
+from app.crud.calculation import READ_COLUMNS
+from app.models.calculation import Calculation
+from app.schemas.calculation import CalculationBase, dump_calculations_json
+
+
+class LegacyCalculationRead(CalculationBase):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    result: float
+    user_id: Optional[int] = None
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    types = ["add", "sub", "mul", "div", "power"]
+    with Session(engine) as db:
+        db.execute(
+            insert(Calculation),
+            [
+                {"a": float(i), "b": 2.0, "type": types[i % len(types)], "result": i + 2.0}
+                for i in range(args.rows)
+            ],
+        )
+        db.commit()
+
+    legacy = TypeAdapter(List[LegacyCalculationRead])
+
+    def legacy_serialize(rows) -> bytes:
+        validated = legacy.validate_python(rows, from_attributes=True)
+        return json.dumps(legacy.dump_python(validated, mode="json")).encode()
+
+    with Session(engine) as db:
+        entities = db.scalars(select(Calculation)).all()
+        columns = db.execute(select(*(getattr(Calculation, c) for c in READ_COLUMNS))).all()
+
+        def before_end_to_end():
+            db.expunge_all()
+            legacy_serialize(db.scalars(select(Calculation)).all())
+
+        def after_end_to_end():
+            dump_calculations_json(
+                db.execute(select(*(getattr(Calculation, c) for c in READ_COLUMNS))).all()
+            )
+
+        timings = [
+            ("serialize only", lambda: legacy_serialize(entities), lambda: dump_calculations_json(columns)),
+            ("query + serialize", before_end_to_end, after_end_to_end),
+        ]
+
+        print(f"{args.rows} rows, best of {args.repeat} (microseconds per row)")
+        print(f"{'':20}{'before':>10}{'after':>10}{'speedup':>10}")
+        for label, before, after in timings:
+            b = _best_of(before, args.repeat) / args.rows * 1e6
+            a = _best_of(after, args.repeat) / args.rows * 1e6
+            print(f"{label:20}{b:10.2f}{a:10.2f}{b / a:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# scripts/bench_password_hashing.py
+"""
+bcrypt throughput per core at each cost, for sizing the login tier.
+
+    python -m scripts.bench_password_hashing [--rounds 10 11 12] [--seconds 2] [--processes N] [--save]
+
+For each cost: milliseconds per hash on one core, hashes/sec on one core,
+and hashes/sec per core with N processes hashing at once (N defaults to
+the CPU count; the gap to the single-core figure is what shared caches,
+SMT and turbo take away). The calibrated cost for PASSWORD_HASH_TARGET_MS
+is marked; --save writes it to PASSWORD_HASH_CONFIG.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.security import (
+    BCRYPT_MIN_ROUNDS,
+    PASSWORD_HASH_CONFIG,
+    PASSWORD_HASH_TARGET_MS,
+    calibrate_bcrypt_rounds,
+    pwd_context,
+    save_bcrypt_rounds,
+)
+
+
+def _hashes_in(rounds: int, seconds: float) -> int:
+    """Hash repeatedly for `seconds`; return how many completed."""
+    handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        handler.hash("benchmark-password")
+        done += 1
+    return done
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, nargs="+", default=None)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--save", action="store_true", help="save the calibrated cost")
+    args = parser.parse_args()
+
+    calibrated = calibrate_bcrypt_rounds()
+    rounds_list = args.rounds or sorted({BCRYPT_MIN_ROUNDS, calibrated, calibrated + 1, 12})
+
+    print(f"target {PASSWORD_HASH_TARGET_MS:g} ms -> calibrated cost {calibrated}")
+    print(f"{args.processes} process(es), {args.seconds:g}s per measurement")
+    print(f"{'rounds':>6}{'ms/hash':>10}{'1 core/s':>10}{'per core/s':>12}{'total/s':>10}")
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        for rounds in rounds_list:
+            single = _hashes_in(rounds, args.seconds) / args.seconds
+            counts = pool.map(_hashes_in, [rounds] * args.processes, [args.seconds] * args.processes)
+            total = sum(counts) / args.seconds
+            marker = "  <- calibrated" if rounds == calibrated else ""
+            print(
+                f"{rounds:>6}{1000 / single:10.1f}{single:10.1f}"
+                f"{total / args.processes:12.1f}{total:10.1f}{marker}"
+            )
+
+    if args.save:
+        save_bcrypt_rounds(calibrated)
+        print(f"Saved cost {calibrated} to {PASSWORD_HASH_CONFIG}.")
+
+
+if __name__ == "__main__":
+    main()
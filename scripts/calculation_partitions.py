@@ -0,0 +1,94 @@
+# scripts/calculation_partitions.py
+"""
+Manage the id range partitions of the calculations table (PostgreSQL, CALC_PARTITIONED=true).
+
+    python -m scripts.calculation_partitions list
+    python -m scripts.calculation_partitions create [--up-to-id N]
+    python -m scripts.calculation_partitions detach calculations_p000003
+    python -m scripts.calculation_partitions archive calculations_p000003
+
+create   premakes partitions up to the current max id (or N) plus CALC_PARTITION_PREMAKE
+detach   removes a partition from calculations; its rows stay in a plain table
+archive  detaches (if needed) and moves the table into CALC_PARTITION_ARCHIVE_SCHEMA
+
+Detaching takes the partition's rows out of the calculation_stats rollup in
+the same transaction, so reports stay consistent. Run `create` regularly
+(e.g. from cron) to keep the DEFAULT partition empty.
+"""
+import argparse
+import sys
+
+from sqlalchemy import func, select
+
+import app.models  # noqa: F401
+from app.crud.calculation_stats import record_removed_totals
+from app.db.partitions import (
+    archive_table,
+    detach_partition,
+    ensure_partitions,
+    list_partitions,
+    partition_totals,
+)
+from app.db.session import SessionLocal, engine
+from app.models.calculation import Calculation
+
+
+def _detach(db, name: str) -> None:
+    conn = db.connection()
+    totals = partition_totals(conn, name)
+    detach_partition(conn, name)
+    record_removed_totals(db, totals)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="show attached partitions")
+    create = sub.add_parser("create", help="premake partitions")
+    create.add_argument("--up-to-id", type=int, default=None)
+    for command in ("detach", "archive"):
+        sub.add_parser(command).add_argument("name")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("Partitioning is only supported on PostgreSQL.")
+        return 1
+
+    with SessionLocal() as db:
+        try:
+            if args.command == "list":
+                for partition in list_partitions(db.connection()):
+                    bounds = (
+                        "DEFAULT"
+                        if partition.lower is None
+                        else f"[{partition.lower}, {partition.upper})"
+                    )
+                    print(f"{partition.name:30} {bounds}")
+                return 0
+
+            if args.command == "create":
+                up_to_id = args.up_to_id
+                if up_to_id is None:
+                    up_to_id = db.scalar(select(func.max(Calculation.id))) or 0
+                created = ensure_partitions(db.connection(), up_to_id)
+                print(f"Created {len(created)} partition(s): {', '.join(created) or '-'}")
+
+            elif args.command == "detach":
+                _detach(db, args.name)
+                print(f"Detached {args.name}.")
+
+            elif args.command == "archive":
+                if any(p.name == args.name for p in list_partitions(db.connection())):
+                    _detach(db, args.name)
+                print(f"Archived as {archive_table(db.connection(), args.name)}.")
+
+            db.commit()
+        except ValueError as e:
+            db.rollback()
+            print(e)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# scripts/rebuild_calculation_stats.py
+"""
+Recompute the calculation_stats rollup from the calculations table.
+
+    python -m scripts.rebuild_calculation_stats           # rebuild
+    python -m scripts.rebuild_calculation_stats --check   # compare only
+
+Run a rebuild once after upgrading an existing database (the rollup table
+starts empty) or whenever --check reports drift. --check exits with status 1
+when the rollup does not match.
+"""
+import argparse
+import sys
+
+import app.models  # noqa: F401
+from app.crud.calculation_stats import check_calculation_stats, rebuild_calculation_stats
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only compare the rollup with calculations; do not write",
+    )
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if args.check:
+            problems = check_calculation_stats(db)
+            for problem in problems:
+                print(problem)
+            print("calculation_stats is consistent." if not problems else f"{len(problems)} type(s) differ.")
+            return 1 if problems else 0
+
+        types = rebuild_calculation_stats(db)
+        print(f"Rebuilt calculation_stats: {types} type(s).")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
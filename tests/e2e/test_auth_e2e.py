@@ -88,3 +88,32 @@ def test_login_wrong_password_shows_error(page: Page):
 
     text = page.text_content("#message")
     assert "Invalid email or password." in text
+
+
+def test_logout_revokes_the_access_token(page: Page):
+    email = unique_email()
+    username = "user_" + uuid.uuid4().hex[:5]
+    password = "StrongPass123"
+
+    page.goto(f"{BASE_URL}/register-page")
+    page.fill("#username", username)
+    page.fill("#email", email)
+    page.fill("#password", password)
+    page.click("text=Register")
+    page.wait_for_timeout(300)
+
+    page.goto(f"{BASE_URL}/login-page")
+    page.fill("#email", email)
+    page.fill("#password", password)
+    page.click("text=Login")
+    page.wait_for_function("() => localStorage.getItem('accessToken') !== null")
+    token = page.evaluate("() => localStorage.getItem('accessToken')")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert page.request.get(f"{BASE_URL}/users/me", headers=headers).status == 200
+
+    page.goto(f"{BASE_URL}/profile-page")
+    page.click("#logout-link")
+    page.wait_for_url(f"{BASE_URL}/login-page")
+
+    assert page.evaluate("() => localStorage.getItem('accessToken')") is None
+    assert page.request.get(f"{BASE_URL}/users/me", headers=headers).status == 401
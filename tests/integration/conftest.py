@@ -1,5 +1,10 @@
 # tests/integration/conftest.py
 import os
+
+# TestClient (without a `with` block) runs each request on a fresh event loop,
+# so async connections must not be pooled across requests
+os.environ.setdefault("ASYNC_DB_NULL_POOL", "true")
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -35,3 +40,13 @@ def db_session():
         yield session
     finally:
         session.close()
+
+
+@pytest.fixture(autouse=True)
+def auth_rate_limit_off(monkeypatch):
+    # Every TestClient request comes from one IP; a shared limiter would make
+    # auth tests fail at random once the suite grows. Tests that exercise it
+    # install their own (see test_user_routes.py).
+    from app.core.rate_limit import auth_rate_limiter
+
+    monkeypatch.setattr(auth_rate_limiter, "enabled", False)
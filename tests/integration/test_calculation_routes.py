@@ -1,17 +1,40 @@
 # tests/integration/test_calculation_routes.py
 
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import delete
 
+from app.core.idempotency import idempotency_store, request_fingerprint
+from app.crud.calculation_stats import check_calculation_stats, rebuild_calculation_stats
+from app.db.session import SessionLocal
 from app.main import app
+from app.models.calculation import Calculation
+from app.models.idempotency_key import IdempotencyKey
+from app.schemas.calculation import CalculationCreate
 
 client = TestClient(app)
 
 
+def _register_and_login() -> tuple[dict, dict]:
+    """A fresh user and the Authorization header for them."""
+    suffix = uuid.uuid4().hex[:8]
+    credentials = {"username": f"owner_{suffix}", "email": f"owner_{suffix}@example.com", "password": "secret123"}
+    user = client.post("/users/register", json=credentials).json()
+    token = client.post("/login", json=credentials).json()["access_token"]
+    return user, {"Authorization": f"Bearer {token}"}
+
+
 def test_calculation_crud_round_trip():
+    _, auth = _register_and_login()
+
     # 1) Create a calculation
     create_payload = {"a": 2, "b": 3, "type": "add"}
 
-    create_resp = client.post("/calculations", json=create_payload)
+    create_resp = client.post("/calculations", json=create_payload, headers=auth)
     assert create_resp.status_code == 201
 
     created = create_resp.json()
@@ -26,7 +49,7 @@ def test_calculation_crud_round_trip():
     assert "user_id" in created
 
     # 2) Read it back
-    get_resp = client.get(f"/calculations/{calc_id}")
+    get_resp = client.get(f"/calculations/{calc_id}", headers=auth)
     assert get_resp.status_code == 200
 
     fetched = get_resp.json()
@@ -35,7 +58,7 @@ def test_calculation_crud_round_trip():
     # 3) Update (Edit) the calculation
     update_payload = {"a": 10, "b": 4, "type": "mul"}
 
-    update_resp = client.put(f"/calculations/{calc_id}", json=update_payload)
+    update_resp = client.put(f"/calculations/{calc_id}", json=update_payload, headers=auth)
     assert update_resp.status_code == 200
 
     updated = update_resp.json()
@@ -47,19 +70,24 @@ def test_calculation_crud_round_trip():
     assert updated["result"] == 40
 
     # 4) Browse (list) calculations – should include our updated one
-    list_resp = client.get("/calculations")
+    list_resp = client.get(
+        "/calculations", params={"type": "mul", "min_a": 10, "max_a": 10}, headers=auth
+    )
     assert list_resp.status_code == 200
 
-    items = list_resp.json()
+    page = list_resp.json()
+    items = page["items"]
     assert isinstance(items, list)
+    assert "next_cursor" in page
+    assert all(item["type"] == "mul" and item["a"] == 10 for item in items)
     assert any(item["id"] == calc_id for item in items)
 
     # 5) Delete calculation
-    delete_resp = client.delete(f"/calculations/{calc_id}")
+    delete_resp = client.delete(f"/calculations/{calc_id}", headers=auth)
     assert delete_resp.status_code in (200, 204)
 
     # 6) Reading again should now give 404
-    get_after_delete = client.get(f"/calculations/{calc_id}")
+    get_after_delete = client.get(f"/calculations/{calc_id}", headers=auth)
     assert get_after_delete.status_code == 404
 
 
@@ -104,3 +132,528 @@ def test_log_invalid_base_validation_error():
     # Optional: check that our error message about base is in the details
     error_messages = str(body["detail"])
     assert "Logarithm base must be > 0 and != 1" in error_messages
+
+
+def test_batch_calculation_route_partial_failure():
+    payload = {
+        "items": [
+            {"a": 2, "b": 3, "type": "add"},
+            {"a": 1, "b": 0, "type": "div"},
+            {"a": 4, "b": 0, "type": "sqrt"},
+            {"a": -8, "b": 0.5, "type": "power"},
+        ]
+    }
+
+    resp = client.post("/calculations/batch", json=payload)
+    assert resp.status_code == 201
+
+    data = resp.json()
+    assert data["accepted"] == 2
+    assert data["rejected"] == 2
+
+    rows = data["results"]
+    assert [row["index"] for row in rows] == [0, 1, 2, 3]
+    assert rows[0]["result"] == 5
+    assert rows[1]["id"] is None
+    assert "Division by zero" in rows[1]["error"]
+    assert rows[2]["result"] == 2
+    assert "integer exponent" in rows[3]["error"]
+
+    # Accepted rows are stored like any other calculation
+    stored = client.get(f"/calculations/{rows[2]['id']}")
+    assert stored.status_code == 200
+    assert stored.json()["type"] == "sqrt"
+
+
+def test_calculation_types_route():
+    resp = client.get("/calculations/types")
+    assert resp.status_code == 200
+
+    types = resp.json()
+    assert types == sorted(types)
+    assert {"add", "div", "factorial", "absdiff"} <= set(types)
+
+
+def test_over_budget_calculation_is_rejected():
+    resp = client.post("/calculations", json={"a": 1000000, "b": 0, "type": "factorial"})
+    assert resp.status_code == 422
+    assert "exceeds the limit" in resp.json()["detail"]
+
+    # Too big even to estimate: rejected the same way on every path
+    resp = client.post("/calculations", json={"a": 1e308, "b": 0, "type": "factorial"})
+    assert resp.status_code == 422
+    resp = client.post("/calculations/batch", json={"items": [{"a": 1e308, "b": 0, "type": "factorial"}]})
+    assert resp.status_code == 201
+    assert "exceeds the limit" in resp.json()["results"][0]["error"]
+    resp = client.post(
+        "/calculations/expression", json={"expression": "factorial(x)", "variables": {"x": [1e308]}}
+    )
+    assert resp.status_code == 200
+    assert "exceeds the limit" in resp.json()["results"][0]["error"]
+
+
+def test_calculation_cache_metrics_route():
+    client.post("/calculations", json={"a": 123, "b": 456, "type": "mul"})
+    client.post("/calculations", json={"a": 123, "b": 456, "type": "mul"})
+
+    resp = client.get("/metrics/calculation-cache")
+    assert resp.status_code == 200
+
+    stats = resp.json()
+    assert stats["hits"] >= 1
+    assert {"misses", "evictions", "current_bytes", "max_bytes"} <= set(stats)
+
+
+def test_db_pool_metrics_route():
+    resp = client.get("/metrics/db-pool")
+    assert resp.status_code == 200
+
+    stats = resp.json()
+    # create_all at import went through the sync pool
+    assert stats["sync"]["pool"] == "InstrumentedQueuePool"
+    assert stats["sync"]["checkouts"] >= 1
+    assert {"checked_out", "overflow", "timeouts", "wait_seconds_max"} <= set(stats["sync"])
+    assert "pool" in stats["async"]
+
+
+def test_expression_route_evaluates_and_stores():
+    payload = {
+        "expression": "sqrt(a ^ 2 + b ^ 2)",
+        "variables": {"a": [3, 5, -1], "b": [4, 12, 0]},
+        "store": True,
+    }
+
+    resp = client.post("/calculations/expression", json=payload)
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["accepted"] == 3
+    assert [row["result"] for row in data["results"]] == [5, 13, 1]
+
+    stored = client.get(f"/calculations/{data['results'][1]['id']}").json()
+    assert stored["type"] == "expression"
+    assert stored["expression"] == "sqrt(a ^ 2 + b ^ 2)"
+    assert stored["a"] == 5
+    assert stored["b"] == 12
+    assert stored["result"] == 13
+
+
+def test_expression_route_errors():
+    resp = client.post(
+        "/calculations/expression",
+        json={"expression": "x / y", "variables": {"x": [1, 1], "y": [2, 0]}},
+    )
+    assert resp.status_code == 200
+    rows = resp.json()["results"]
+    assert rows[0]["result"] == 0.5
+    assert rows[0]["id"] is None  # store defaults to false
+    assert "Division by zero" in rows[1]["error"]
+
+    resp = client.post("/calculations/expression", json={"expression": "2 +"})
+    assert resp.status_code == 400
+
+    resp = client.post(
+        "/calculations/expression",
+        json={"expression": "1e400 + a ^ 0.5", "variables": {"a": [-8, 4]}},
+    )
+    assert resp.status_code == 200
+    assert [row["result"] for row in resp.json()["results"]] == [None, None]
+    assert resp.json()["rejected"] == 2
+
+    resp = client.post("/calculations/expression", json={"expression": "(" * 200 + "1" + ")" * 200})
+    assert resp.status_code == 400
+
+
+def test_import_ndjson_reports_rejected_lines():
+    body = "\n".join(
+        [
+            '{"a": 1, "b": 2, "type": "add"}',
+            '{"a": 1, "b": 0, "type": "div"}',
+            "",
+            "not json",
+            '{"a": 1000000, "b": 0, "type": "factorial"}',
+            '{"a": 9, "b": 0, "type": "sqrt"}',
+        ]
+    )
+
+    resp = client.post(
+        "/calculations/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["accepted"] == 2
+    assert data["rejected"] == 3
+    assert [r["line"] for r in data["rejects"]] == [2, 4, 5]
+    assert data["rejects_truncated"] is False
+
+
+def test_import_rejects_owner_and_failing_rows(monkeypatch):
+    from app.core import calculation_factory, calculation_import
+
+    body = "\n".join(
+        [
+            '{"a": 1, "b": 2, "type": "add", "user_id": 1}',
+            '{"a": 2, "b": 2, "type": "mul"}',
+            '{"a": 7, "b": 2, "type": "mod"}',
+        ]
+    )
+
+    # A row whose domain error escapes the batch's own error handling
+    def broken_batch(*args):
+        raise OverflowError("boom")
+
+    def flaky_mod(self, a, b):
+        raise ValueError("mod exploded")
+
+    monkeypatch.setattr(calculation_import, "perform_calculation_batch", broken_batch)
+    monkeypatch.setattr(calculation_factory.ModOperation, "compute", flaky_mod)
+
+    resp = client.post(
+        "/calculations/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["accepted"] == 1
+    assert [reject["line"] for reject in data["rejects"]] == [1, 3]
+    assert "user_id" in data["rejects"][0]["error"]
+    assert "mod exploded" in data["rejects"][1]["error"]
+
+    # Anything else is a bug, not a reject
+    def buggy_mod(self, a, b):
+        raise TypeError("mod is broken")
+
+    monkeypatch.setattr(calculation_factory.ModOperation, "compute", buggy_mod)
+    with pytest.raises(TypeError):
+        client.post("/calculations/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+
+def test_import_csv():
+    body = "type,a,b\nmul,3,4\npower,2,10\nlog,10,1\n"
+
+    resp = client.post(
+        "/calculations/import",
+        content=body,
+        headers={"Content-Type": "text/csv"},
+    )
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["accepted"] == 2
+    assert data["rejected"] == 1
+    assert data["rejects"][0]["line"] == 4
+    assert "Logarithm base" in data["rejects"][0]["error"]
+
+    bad_header = client.post("/calculations/import?format=csv", content="x,y\n1,2\n")
+    assert bad_header.status_code == 400
+
+
+def test_export_streams_filtered_rows():
+    ids = [
+        client.post("/calculations", json={"a": i, "b": 1, "type": "absdiff"}).json()["id"]
+        for i in range(3)
+    ]
+
+    resp = client.get(
+        "/calculations/export",
+        params={"type": "absdiff", "min_id": ids[1], "max_id": ids[2]},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [row["id"] for row in rows] == ids[1:]
+    assert all(row["type"] == "absdiff" for row in rows)
+
+    csv_resp = client.get(
+        "/calculations/export",
+        params={"format": "csv", "type": "absdiff", "min_id": ids[0], "max_id": ids[0]},
+    )
+    lines = csv_resp.text.splitlines()
+    assert lines[0] == "id,a,b,type,result,user_id,expression"
+    assert lines[1].startswith(f"{ids[0]},0.0,1.0,absdiff,1.0")
+
+
+def test_export_writes_non_finite_results_as_null():
+    calc = client.post("/calculations", json={"a": 1e308, "b": 1e308, "type": "add"}).json()
+    resp = client.get("/calculations/export", params={"min_id": calc["id"], "max_id": calc["id"]})
+
+    def reject_constant(name):
+        raise ValueError(f"{name} is not valid JSON")
+
+    rows = [json.loads(line, parse_constant=reject_constant) for line in resp.text.splitlines()]
+    assert rows == [dict(calc, result=None)]
+
+
+def test_browse_keyset_pagination():
+    created = [
+        client.post("/calculations", json={"a": 7, "b": i, "type": "floordiv"}).json()["id"]
+        for i in range(1, 6)
+    ]
+    params = {"type": "floordiv", "min_a": 7, "max_a": 7, "min_b": 1, "max_b": 5, "limit": 2}
+
+    seen = []
+    cursor = None
+    while True:
+        resp = client.get("/calculations", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200
+        page = resp.json()
+        assert len(page["items"]) <= 2
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # Every matching row exactly once, in id order
+    assert seen == sorted(seen)
+    assert set(created) <= set(seen)
+    assert len(seen) == len(set(seen))
+
+    assert client.get("/calculations", params={"cursor": "garbage!"}).status_code == 400
+
+
+def test_per_user_calculations():
+    user, auth = _register_and_login()
+
+    # The owner comes from the token
+    owned = [
+        client.post("/calculations", json={"a": i, "b": 2, "type": "mul"}, headers=auth).json()
+        for i in range(3)
+    ]
+    # Someone else's row must not show up
+    client.post("/calculations", json={"a": 1, "b": 2, "type": "mul"})
+    assert all(calc["user_id"] == user["id"] for calc in owned)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/users/{user['id']}/calculations", params=params, headers=auth).json()
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [calc["id"] for calc in owned]
+
+    recent = client.get("/reports/recent", params={"user_id": user["id"], "limit": 2}, headers=auth).json()
+    assert [item["id"] for item in recent] == [owned[2]["id"], owned[1]["id"]]
+
+    summary = client.get("/reports/summary", params={"user_id": user["id"]}, headers=auth).json()
+    assert summary["total_calculations"] == 3
+    assert summary["counts_by_type"] == {"mul": 3}
+    assert summary["average_a"] == 1.0
+    assert summary["last_calculation_id"] == owned[2]["id"]
+
+    # Other users' rows need their token
+    assert client.get(f"/users/{user['id']}/calculations").status_code == 401
+    assert client.get(f"/users/{user['id'] + 1}/calculations", headers=auth).status_code == 403
+    assert client.get("/calculations", params={"user_id": user["id"] + 1}, headers=auth).status_code == 403
+    assert client.get("/reports/summary", params={"user_id": user["id"]}).status_code == 401
+    assert client.get("/reports/recent", params={"user_id": user["id"] + 1}, headers=auth).status_code == 403
+
+    # Ownership cannot be set or changed through the body
+    resp = client.post("/calculations", json={"a": 1, "b": 2, "type": "mul", "user_id": user["id"]})
+    assert resp.status_code == 422
+    resp = client.put(
+        f"/calculations/{owned[0]['id']}",
+        json={"a": 1, "b": 2, "type": "mul", "user_id": None},
+        headers=auth,
+    )
+    assert resp.status_code == 422
+
+
+def test_calculations_are_scoped_to_their_owner():
+    owner, auth = _register_and_login()
+    _, other = _register_and_login()
+    calc = client.post("/calculations", json={"a": 3, "b": 4, "type": "mul"}, headers=auth).json()
+    anonymous = client.post("/calculations", json={"a": 3, "b": 4, "type": "mul"}).json()
+    assert anonymous["user_id"] is None
+
+    # Reads: the owner sees the row, nobody else does
+    assert client.get(f"/calculations/{calc['id']}", headers=auth).status_code == 200
+    assert client.get(f"/calculations/{calc['id']}", headers=other).status_code == 404
+    assert client.get(f"/calculations/{calc['id']}").status_code == 404
+    assert client.get(f"/calculations/{anonymous['id']}").status_code == 200
+
+    def listed(**headers):
+        page = client.get("/calculations", params={"limit": 500}, headers=headers).json()
+        return [item["id"] for item in page["items"]]
+
+    assert calc["id"] not in listed(**other) and anonymous["id"] not in listed(**other)
+    assert calc["id"] not in listed()
+
+    exported = client.get("/calculations/export", headers=auth).text.splitlines()
+    assert [json.loads(line)["id"] for line in exported] == [calc["id"]]
+    exported = [json.loads(line)["id"] for line in client.get("/calculations/export").text.splitlines()]
+    assert anonymous["id"] in exported and calc["id"] not in exported
+
+    # Writes need the owner's token
+    payload = {"a": 1, "b": 1, "type": "add"}
+    assert client.put(f"/calculations/{calc['id']}", json=payload).status_code == 401
+    assert client.put(f"/calculations/{calc['id']}", json=payload, headers=other).status_code == 404
+    assert client.put(f"/calculations/{anonymous['id']}", json=payload, headers=auth).status_code == 404
+    assert client.delete(f"/calculations/{calc['id']}").status_code == 401
+    assert client.delete(f"/calculations/{calc['id']}", headers=other).status_code == 404
+    assert client.get(f"/calculations/{calc['id']}", headers=auth).json() == calc
+    assert client.delete(f"/calculations/{calc['id']}", headers=auth).status_code == 204
+
+
+def test_batch_and_expression_rows_are_owned():
+    owner, auth = _register_and_login()
+    _, other = _register_and_login()
+
+    key = uuid.uuid4().hex
+    payload = {"items": [{"a": 1, "b": 2, "type": "add"}]}
+    batch = client.post("/calculations/batch", json=payload, headers={**auth, "Idempotency-Key": key})
+    assert batch.status_code == 201
+    calc_id = batch.json()["results"][0]["id"]
+    assert client.get(f"/calculations/{calc_id}", headers=auth).json()["user_id"] == owner["id"]
+
+    # The same key from someone else is their own request, not a replay
+    resp = client.post("/calculations/batch", json=payload, headers={**other, "Idempotency-Key": key})
+    assert resp.status_code == 201
+    assert "Idempotent-Replayed" not in resp.headers
+    assert resp.json()["results"][0]["id"] != calc_id
+
+    resp = client.post(
+        "/calculations/expression",
+        json={"expression": "a * b", "variables": {"a": [2], "b": [5]}, "store": True},
+        headers=auth,
+    )
+    calc_id = resp.json()["results"][0]["id"]
+    assert client.get(f"/calculations/{calc_id}", headers=auth).json()["user_id"] == owner["id"]
+
+
+def test_idempotency_key_replays_the_first_response():
+    key = uuid.uuid4().hex
+    payload = {"a": 6, "b": 7, "type": "mul"}
+
+    first = client.post("/calculations", json=payload, headers={"Idempotency-Key": key})
+    assert first.status_code == 201
+
+    retry = client.post("/calculations", json=payload, headers={"Idempotency-Key": key})
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+    # Also from the table, as another worker would see it
+    idempotency_store.clear()
+    retry = client.post("/calculations", json=payload, headers={"Idempotency-Key": key})
+    assert retry.json() == first.json()
+
+    # Same key, different payload
+    resp = client.post(
+        "/calculations", json={"a": 6, "b": 8, "type": "mul"}, headers={"Idempotency-Key": key}
+    )
+    assert resp.status_code == 422
+
+    # Without a key every request writes
+    other = client.post("/calculations", json=payload)
+    assert other.json()["id"] != first.json()["id"]
+
+
+def test_idempotency_key_without_on_conflict_support(monkeypatch):
+    # Dialects without ON CONFLICT take the plain INSERT path, for the key
+    # claim and for the calculation_stats rollup alike
+    monkeypatch.setattr("app.db.upsert.ON_CONFLICT_DIALECTS", ())
+    key = uuid.uuid4().hex
+    payload = {"a": 2, "b": 9, "type": "mul"}
+
+    first = client.post("/calculations", json=payload, headers={"Idempotency-Key": key})
+    assert first.status_code == 201
+    idempotency_store.clear()
+    retry = client.post("/calculations", json=payload, headers={"Idempotency-Key": key})
+    assert retry.json() == first.json()
+
+    # First a type without a rollup row, then one with it
+    with SessionLocal() as db:
+        db.execute(delete(Calculation).where(Calculation.type == "mod"))
+        rebuild_calculation_stats(db)
+    for a in (7, 9):
+        resp = client.post("/calculations", json={"a": a, "b": 4, "type": "mod"})
+        assert resp.status_code == 201, resp.json()
+    with SessionLocal() as db:
+        assert check_calculation_stats(db) == []
+
+
+def test_idempotency_key_in_progress_and_failed_requests():
+    key = uuid.uuid4().hex
+    payload = {"a": 1, "b": 2, "type": "add"}
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        # Another request holds the key
+        db.add(
+            IdempotencyKey(
+                endpoint="POST /calculations",
+                key=key,
+                request_hash=request_fingerprint(b"{}"),
+                locked_at=now,
+                expires_at=now + timedelta(hours=1),
+            )
+        )
+        db.commit()
+    resp = client.post("/calculations", json=payload, headers={"Idempotency-Key": key})
+    assert resp.status_code == 422
+
+    key = uuid.uuid4().hex
+    with SessionLocal() as db:
+        db.add(
+            IdempotencyKey(
+                endpoint="POST /calculations",
+                key=key,
+                request_hash=request_fingerprint(
+                    CalculationCreate(**payload).model_dump_json().encode()
+                ),
+                locked_at=now,
+                expires_at=now + timedelta(hours=1),
+            )
+        )
+        db.commit()
+    resp = client.post("/calculations", json=payload, headers={"Idempotency-Key": key})
+    assert resp.status_code == 409
+    assert resp.headers["Retry-After"] == "1"
+
+    # A failed request frees its key, so the retry runs again
+    key = uuid.uuid4().hex
+    bad = {"a": 100000, "b": 0, "type": "factorial"}  # over the cost budget
+    for _ in range(2):
+        resp = client.post("/calculations", json=bad, headers={"Idempotency-Key": key})
+        assert resp.status_code == 422
+        assert "Idempotent-Replayed" not in resp.headers
+
+
+def test_idempotency_record_commits_with_the_calculation(monkeypatch):
+    key = uuid.uuid4().hex
+    a = float(uuid.uuid4().int % 10**9)
+    payload = {"a": a, "b": 1, "type": "add"}
+
+    async def crash(*args, **kwargs):
+        raise RuntimeError("worker died before commit")
+
+    monkeypatch.setattr(idempotency_store, "complete", crash)
+    with pytest.raises(RuntimeError):
+        client.post("/calculations", json=payload, headers={"Idempotency-Key": key})
+    monkeypatch.undo()
+
+    # Neither the row nor the claim survived, so the retry writes exactly once
+    with SessionLocal() as db:
+        assert db.query(Calculation).filter(Calculation.a == a).count() == 0
+    resp = client.post("/calculations", json=payload, headers={"Idempotency-Key": key})
+    assert resp.status_code == 201
+    with SessionLocal() as db:
+        assert db.query(Calculation).filter(Calculation.a == a).count() == 1
+
+
+def test_idempotency_key_on_batch():
+    key = uuid.uuid4().hex
+    payload = {"items": [{"a": 2, "b": 3, "type": "add"}, {"a": 1, "b": 0, "type": "div"}]}
+
+    first = client.post("/calculations/batch", json=payload, headers={"Idempotency-Key": key})
+    retry = client.post("/calculations/batch", json=payload, headers={"Idempotency-Key": key})
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
@@ -1,8 +1,13 @@
 # tests/integration/test_reports_routes.py
 
+import uuid
+
 from fastapi.testclient import TestClient
 
+from app.crud.calculation_stats import check_calculation_stats, rebuild_calculation_stats
+from app.db.session import SessionLocal
 from app.main import app
+from app.models.calculation import Calculation
 
 client = TestClient(app)
 
@@ -45,3 +50,101 @@ def test_reports_recent_limit():
     # Should contain the most recently created ones (highest ids)
     returned_ids = [item["id"] for item in items]
     assert max(returned_ids) <= max(created_ids)
+
+
+def test_summary_rollup_tracks_every_write_path():
+    # Start from a consistent rollup, whatever earlier tests wrote
+    with SessionLocal() as db:
+        rebuild_calculation_stats(db)
+
+    suffix = uuid.uuid4().hex[:8]
+    credentials = {"username": f"stats_{suffix}", "email": f"stats_{suffix}@example.com", "password": "secret123"}
+    client.post("/users/register", json=credentials)
+    auth = {"Authorization": f"Bearer {client.post('/login', json=credentials).json()['access_token']}"}
+    created = client.post("/calculations", json={"a": 7, "b": 8, "type": "mul"}, headers=auth).json()
+    doomed = client.post("/calculations", json={"a": 9, "b": 1, "type": "sub"}, headers=auth).json()
+
+    # Edit moves a row to another type; delete removes the newest of its type
+    resp = client.put(
+        f"/calculations/{created['id']}", json={"a": 1, "b": 1, "type": "absdiff"}, headers=auth
+    )
+    assert resp.status_code == 200
+    assert client.delete(f"/calculations/{doomed['id']}", headers=auth).status_code == 204
+
+    client.post("/calculations/batch", json={"items": [{"a": 1, "b": 2, "type": "add"}]})
+    client.post(
+        "/calculations/import",
+        content=b'{"a": 4, "b": 2, "type": "div"}\n',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    client.post(
+        "/calculations/expression",
+        json={"expression": "a + b", "variables": {"a": [1], "b": [2]}, "store": True},
+    )
+
+    with SessionLocal() as db:
+        assert check_calculation_stats(db) == []
+
+        # A rebuild from scratch yields the same summary
+        before = client.get("/reports/summary").json()
+        rebuild_calculation_stats(db)
+    assert client.get("/reports/summary").json() == before
+
+
+def test_summary_rollup_tracks_orm_writes():
+    with SessionLocal() as db:
+        rebuild_calculation_stats(db)
+
+        calc = Calculation(a=3, b=4, type="mul", result=12)
+        db.add(calc)
+        db.commit()
+        assert check_calculation_stats(db) == []
+
+        calc.type, calc.a, calc.result = "add", 8, 12
+        db.commit()
+        assert check_calculation_stats(db) == []
+
+        db.delete(calc)
+        db.commit()
+        assert check_calculation_stats(db) == []
+
+
+def test_summary_cache_invalidated_by_writes():
+    first = client.get("/reports/summary").json()
+    assert client.get("/reports/summary").json() == first
+
+    _create_calc(1, 1, "add")
+    second = client.get("/reports/summary").json()
+    assert second["total_calculations"] == first["total_calculations"] + 1
+
+    stats = client.get("/metrics/report-summary-cache").json()
+    assert stats["hits"] >= 1
+    assert stats["cached_version"] == stats["version"]
+
+
+def test_reports_timeseries_buckets_by_type():
+    for a in (2, 4, 9):
+        _create_calc(a, 0, "sqrt")
+
+    resp = client.get("/reports/timeseries", params={"bucket": "day", "type": "sqrt"})
+    assert resp.status_code == 200
+    data = resp.json()
+
+    assert data["bucket"] == "day"
+    assert all(point["type"] == "sqrt" for point in data["points"])
+    assert sum(point["count"] for point in data["points"]) >= 3
+    assert max(point["max_result"] for point in data["points"]) >= 3.0
+
+
+def test_reports_timeseries_rejects_bad_ranges():
+    resp = client.get(
+        "/reports/timeseries",
+        params={"start": "2025-01-02T00:00:00Z", "end": "2025-01-01T00:00:00Z"},
+    )
+    assert resp.status_code == 400
+
+    resp = client.get(
+        "/reports/timeseries",
+        params={"bucket": "minute", "start": "2000-01-01T00:00:00Z", "end": "2025-01-01T00:00:00Z"},
+    )
+    assert resp.status_code == 400
@@ -1,5 +1,6 @@
 # tests/integration/test_user_model.py
 import pytest
+from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
 
 from app.crud.user import create_user, get_user_by_username, get_user_by_email
@@ -28,6 +29,26 @@ def test_create_user_and_read_back(db_session):
     assert by_email.id == user.id
 
 
+def test_created_user_is_read_without_a_select(db_session):
+    user_in = UserCreate(username="returninguser", email="returning@example.com", password="strongpassword")
+    statements = []
+    engine = db_session.get_bind()
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        user = create_user(db_session, user_in)
+        assert user.id is not None
+        assert user.username == "returninguser"
+        assert user.created_at is not None
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    # Just the INSERT ... RETURNING
+    assert [s.split()[0] for s in statements] == ["INSERT"]
+
+
 def test_username_uniqueness_constraint(db_session):
     user1 = UserCreate(
         username="duplicateuser",
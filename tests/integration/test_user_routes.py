@@ -3,7 +3,10 @@
 import uuid
 from fastapi.testclient import TestClient
 
+from app.core.security import pwd_context, set_bcrypt_rounds
+from app.db.session import SessionLocal
 from app.main import app
+from app.models.user import User
 
 client = TestClient(app)
 
@@ -90,6 +93,48 @@ def test_update_profile_and_read_back():
     assert fetched["email"] == new_email
 
 
+def test_update_profile_to_taken_email_fails():
+    first = _unique_user_payload()
+    second = _unique_user_payload()
+    assert client.post("/users/register", json=first).status_code == 201
+    resp = client.post("/users/register", json=second)
+    assert resp.status_code == 201, resp.json()
+
+    update_resp = client.put(f"/users/{resp.json()['id']}", json={"email": first["email"]})
+    assert update_resp.status_code == 400
+    assert update_resp.json()["detail"] == "Email already taken"
+
+    # The failed update left the row alone
+    assert client.get(f"/users/{resp.json()['id']}").json()["email"] == second["email"]
+
+
+def test_taken_field_comes_from_the_constraint_not_the_message():
+    # The taken email itself mentions "username"
+    first = _unique_user_payload()
+    first["email"] = "username_" + first["email"]
+    second = _unique_user_payload()
+    assert client.post("/users/register", json=first).status_code == 201
+    resp = client.post("/users/register", json=second)
+    assert resp.status_code == 201, resp.json()
+
+    update_resp = client.put(f"/users/{resp.json()['id']}", json={"email": first["email"]})
+    assert update_resp.status_code == 400
+    assert update_resp.json()["detail"] == "Email already taken"
+
+
+def test_register_without_on_conflict_support(monkeypatch):
+    # Dialects without ON CONFLICT take the plain INSERT path
+    monkeypatch.setattr("app.db.upsert.ON_CONFLICT_DIALECTS", ())
+    user_payload = _unique_user_payload()
+
+    resp = client.post("/users/register", json=user_payload)
+    assert resp.status_code == 201, resp.json()
+    assert resp.json()["username"] == user_payload["username"]
+
+    resp = client.post("/users/register", json=user_payload)
+    assert resp.status_code in (400, 409), resp.json()
+
+
 def test_change_password_and_relogin():
     # Register user with unique payload and known old password
     user_payload = _unique_user_payload(password="oldpass")
@@ -130,3 +175,153 @@ def test_change_password_and_relogin():
         },
     )
     assert new_login.status_code == 200, new_login.json()
+
+
+def test_login_rehashes_stale_password_hash():
+    saved = pwd_context.to_dict()
+    try:
+        # Register under a cheap cost, then raise it as a recalibration would
+        set_bcrypt_rounds(4)
+        user_payload = _unique_user_payload(password="secret123")
+        user_id = client.post("/users/register", json=user_payload).json()["id"]
+        set_bcrypt_rounds(5)
+
+        resp = client.post("/users/login", json=user_payload)
+        assert resp.status_code == 200, resp.json()
+        with SessionLocal() as db:
+            assert db.get(User, user_id).password_hash.startswith("$2b$05$")
+        # And the upgraded hash still logs in
+        assert client.post("/login", json=user_payload).status_code == 200
+    finally:
+        pwd_context.load(saved)
+
+
+def test_login_is_rate_limited_per_account(monkeypatch):
+    from app import dependencies
+    from app.core.rate_limit import AuthRateLimiter, InMemoryBackend
+
+    monkeypatch.setattr(
+        dependencies, "auth_rate_limiter", AuthRateLimiter(InMemoryBackend(100), 100, 60, 2, 1)
+    )
+    user_payload = _unique_user_payload(password="secret123")
+    wrong = {**user_payload, "password": "wrong-password"}
+
+    assert client.post("/users/login", json=wrong).status_code == 401
+    assert client.post("/login", json=wrong).status_code == 401
+    # The third attempt on the same account is refused before bcrypt runs
+    resp = client.post("/users/login", json=user_payload)
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+def test_auth_routes_are_rate_limited_per_ip(monkeypatch):
+    from app import dependencies
+    from app.core.rate_limit import AuthRateLimiter, InMemoryBackend
+
+    monkeypatch.setattr(
+        dependencies, "auth_rate_limiter", AuthRateLimiter(InMemoryBackend(100), 2, 1, 100, 60)
+    )
+    wrong = {**_unique_user_payload(), "password": "wrong-password"}
+
+    assert client.post("/login", json=wrong).status_code == 401
+    assert client.post("/users/login", json=wrong).status_code == 401
+    # Any account, same IP
+    resp = client.post("/users/register", json=_unique_user_payload())
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+def test_current_user_from_bearer_token():
+    from app.core.user_cache import current_user_cache
+
+    user_payload = _unique_user_payload(password="secret123")
+    user_id = client.post("/register", json=user_payload).json()["id"]
+    token = client.post("/login", json=user_payload).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/users/me").status_code == 401
+    assert client.get("/users/me", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+    hits = current_user_cache.hits
+    for _ in range(2):
+        me = client.get("/users/me", headers=headers)
+        assert me.status_code == 200, me.json()
+        assert me.json()["id"] == user_id
+    assert current_user_cache.hits == hits + 1
+
+    # Changing the email drops the cached row; the token's subject no longer matches
+    local_part, domain = user_payload["email"].split("@", 1)
+    resp = client.put(f"/users/{user_id}", json={"email": f"{local_part}_new@{domain}"})
+    assert resp.status_code == 200, resp.json()
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+
+def test_refresh_token_rotation_and_reuse_detection():
+    user_payload = _unique_user_payload(password="secret123")
+    client.post("/register", json=user_payload)
+    first = client.post("/login", json=user_payload).json()
+    assert first["refresh_token"]
+
+    rotated = client.post("/token/refresh", json={"refresh_token": first["refresh_token"]})
+    assert rotated.status_code == 200, rotated.json()
+    second = rotated.json()
+    assert second["refresh_token"] != first["refresh_token"]
+    me = client.get("/users/me", headers={"Authorization": f"Bearer {second['access_token']}"})
+    assert me.status_code == 200
+    assert me.json()["email"] == user_payload["email"]
+
+    # Replaying the spent token is refused and revokes its successor too
+    reuse = client.post("/token/refresh", json={"refresh_token": first["refresh_token"]})
+    assert reuse.status_code == 401
+    assert reuse.json()["detail"] == "Refresh token reuse detected"
+    assert client.post("/token/refresh", json={"refresh_token": second["refresh_token"]}).status_code == 401
+
+    assert client.post("/token/refresh", json={"refresh_token": "unknown"}).status_code == 401
+
+
+def test_change_password_revokes_refresh_tokens():
+    user_payload = _unique_user_payload(password="oldpass")
+    user_id = client.post("/register", json=user_payload).json()["id"]
+    refresh_token = client.post("/login", json=user_payload).json()["refresh_token"]
+
+    resp = client.post(
+        f"/users/{user_id}/change-password",
+        json={"old_password": "oldpass", "new_password": "newpass"},
+    )
+    assert resp.status_code == 200
+    assert client.post("/token/refresh", json={"refresh_token": refresh_token}).status_code == 401
+
+
+def test_logout_revokes_access_and_refresh_token():
+    user_payload = _unique_user_payload(password="secret123")
+    client.post("/register", json=user_payload)
+    tokens = client.post("/login", json=user_payload).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/users/me", headers=headers).status_code == 200
+
+    resp = client.post("/logout", headers=headers, json={"refresh_token": tokens["refresh_token"]})
+    assert resp.status_code == 204
+    assert client.get("/users/me", headers=headers).status_code == 401
+    assert client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+    # Other sessions of the same user are unaffected
+    other = client.post("/login", json=user_payload).json()["access_token"]
+    assert client.get("/users/me", headers={"Authorization": f"Bearer {other}"}).status_code == 200
+
+
+def test_revoke_all_tokens_for_user():
+    user_payload = _unique_user_payload(password="secret123")
+    user_id = client.post("/register", json=user_payload).json()["id"]
+    sessions = [client.post("/login", json=user_payload).json() for _ in range(2)]
+    headers = [{"Authorization": f"Bearer {s['access_token']}"} for s in sessions]
+
+    assert client.post(f"/users/{user_id + 1}/revoke-tokens", headers=headers[0]).status_code == 403
+    assert client.post(f"/users/{user_id}/revoke-tokens", headers=headers[0]).status_code == 204
+    for h in headers:
+        assert client.get("/users/me", headers=h).status_code == 401
+    for s in sessions:
+        assert client.post("/token/refresh", json={"refresh_token": s["refresh_token"]}).status_code == 401
+
+    # Logging in again right away works
+    fresh = client.post("/login", json=user_payload).json()["access_token"]
+    assert client.get("/users/me", headers={"Authorization": f"Bearer {fresh}"}).status_code == 200
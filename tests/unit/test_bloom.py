@@ -0,0 +1,14 @@
+# tests/unit/test_bloom.py
+from app.core.bloom import BloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter.from_items((f"jti:{i}" for i in range(1000)), capacity=1000)
+    assert all(f"jti:{i}" in bloom for i in range(1000))
+    assert bloom.count == 1000
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter.from_items((f"jti:{i}" for i in range(1000)), capacity=1000, error_rate=0.01)
+    false_positives = sum(f"other:{i}" in bloom for i in range(10000))
+    assert false_positives < 300
@@ -4,7 +4,12 @@ import pytest
 
 from app.core.calculation_factory import (
     perform_calculation,
+    perform_calculation_batch,
     CalculationFactory,
+    OPERATION_REGISTRY,
+    BaseOperation,
+    register_operation,
+    CalculationTooExpensive,
     AddOperation,
     SubOperation,
     MulOperation,
@@ -41,6 +46,26 @@ def test_factory_invalid_type():
         CalculationFactory.get_operation("invalid_type")
 
 
+def test_factory_reuses_operation_instances():
+    assert CalculationFactory.get_operation("add") is CalculationFactory.get_operation("ADD")
+
+
+def test_register_operation_decorator():
+    @register_operation("hypot")
+    class HypotOperation(BaseOperation):
+        def compute(self, a: float, b: float) -> float:
+            return math.hypot(a, b)
+
+    try:
+        assert "hypot" in CalculationFactory.available_types()
+        assert perform_calculation(3, 4, "hypot") == 5
+
+        with pytest.raises(ValueError):
+            register_operation("hypot")(HypotOperation)
+    finally:
+        OPERATION_REGISTRY.pop("hypot", None)
+
+
 def test_add_operation():
     assert perform_calculation(5, 3, "add") == 8
 
@@ -66,6 +91,18 @@ def test_power_operation():
     assert perform_calculation(2, 3, "power") == 8
 
 
+def test_power_outside_real_domain_raises():
+    assert perform_calculation(-8, 3, "power") == -512
+    with pytest.raises(ValueError):
+        perform_calculation(-8, 0.5, "power")
+    with pytest.raises(ValueError):
+        perform_calculation(0, -1, "power")
+
+    results, errors = perform_calculation_batch([-8, 4], [0.5, 0.5], ["power", "power"])
+    assert results == [None, 2]
+    assert "integer exponent" in errors[0]
+
+
 def test_mod_operation():
     assert perform_calculation(10, 3, "mod") == 1
 
@@ -110,3 +147,69 @@ def test_factorial_invalid():
 def test_absdiff_operation():
     assert perform_calculation(10, 7, "absdiff") == 3
     assert perform_calculation(7, 10, "absdiff") == 3
+
+
+def test_batch_matches_single_calculations():
+    a = [5, 10, 2, 9, 10]
+    b = [3, 4, 3, 0, 7]
+    types = ["add", "mul", "power", "sqrt", "absdiff"]
+
+    results, errors = perform_calculation_batch(a, b, types)
+
+    assert errors == [None] * 5
+    assert results == [perform_calculation(x, y, t) for x, y, t in zip(a, b, types)]
+
+
+def test_batch_reports_domain_errors_per_row():
+    results, errors = perform_calculation_batch(
+        [6, 1, 10, -1, 4],
+        [3, 0, 1, 0, 2],
+        ["div", "div", "log", "factorial", "nope"],
+    )
+
+    assert results[0] == 2
+    assert results[1:] == [None, None, None, None]
+    assert "Division by zero" in errors[1]
+    assert "Logarithm base" in errors[2]
+    assert "Factorial" in errors[3]
+    assert "Invalid calculation type" in errors[4]
+
+
+def test_batch_length_mismatch():
+    with pytest.raises(ValueError):
+        perform_calculation_batch([1, 2], [1], ["add", "add"])
+
+
+def test_cost_estimates_for_expensive_operations():
+    assert CalculationFactory.get_operation("add").estimate_cost(1e300, 1e300) == 0
+    assert math.isclose(CalculationFactory.get_operation("power").estimate_cost(2, 100), 100)
+    # log2(10!) = log2(3628800) ~ 21.8
+    assert math.isclose(
+        CalculationFactory.get_operation("factorial").estimate_cost(10, 0),
+        math.log2(math.factorial(10)),
+    )
+
+
+def test_over_budget_operations_are_rejected():
+    with pytest.raises(CalculationTooExpensive):
+        perform_calculation(1e6, 0, "factorial")
+    with pytest.raises(CalculationTooExpensive):
+        perform_calculation(10, 1e9, "power")
+    # Shrinking powers stay cheap
+    assert perform_calculation(10, -1e9, "power") == 0
+
+
+def test_batch_rejects_over_budget_rows_only():
+    results, errors = perform_calculation_batch([5, 1e6, 1e308], [0, 0, 0], ["factorial"] * 3)
+    assert results[0] == 120
+    assert errors[0] is None
+    assert results[1:] == [None, None]
+    assert "exceeds the limit" in errors[1]
+    assert "exceeds the limit" in errors[2]
+
+
+def test_factorial_cost_of_huge_operand_is_infinite():
+    # log2(a!) itself overflows a float here
+    assert CalculationFactory.get_operation("factorial").estimate_cost(1e308, 0) == math.inf
+    with pytest.raises(CalculationTooExpensive):
+        perform_calculation(1e308, 0, "factorial")
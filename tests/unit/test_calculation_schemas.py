@@ -1,5 +1,6 @@
 import pytest
 from pydantic import ValidationError
+from app.core.calculation_factory import OPERATION_REGISTRY, BaseOperation, register_operation
 from app.schemas.calculation import CalculationCreate
 
 
@@ -25,3 +26,38 @@ def test_invalid_type():
 def test_divide_by_zero_invalid():
     with pytest.raises(ValidationError):
         CalculationCreate(a=5, b=0, type="div")
+
+
+def test_registered_operation_is_accepted_with_its_own_rules():
+    @register_operation("recip")
+    class ReciprocalOperation(BaseOperation):
+        def validate(self, a: float, b: float) -> None:
+            if a == 0:
+                raise ValueError("Reciprocal of zero is not allowed.")
+
+        def compute(self, a: float, b: float) -> float:
+            self.validate(a, b)
+            return 1 / a
+
+    try:
+        assert CalculationCreate(a=4, b=0, type="recip").type == "recip"
+        with pytest.raises(ValidationError):
+            CalculationCreate(a=0, b=0, type="recip")
+    finally:
+        OPERATION_REGISTRY.pop("recip", None)
+
+    with pytest.raises(ValidationError):
+        CalculationCreate(a=4, b=0, type="recip")
+
+
+def test_fast_read_path_matches_calculation_read():
+    import json
+
+    from app.models.calculation import Calculation
+    from app.schemas.calculation import CalculationRead, dump_calculation_json
+
+    calc = Calculation(id=7, a=2.0, b=3.0, type="add", result=5.0)
+
+    fast = json.loads(dump_calculation_json(calc))
+    slow = CalculationRead.model_validate(calc).model_dump(mode="json")
+    assert fast == slow
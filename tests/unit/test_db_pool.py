@@ -0,0 +1,34 @@
+# tests/unit/test_db_pool.py
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.db.pool import InstrumentedQueuePool, pool_status
+
+
+def test_pool_records_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    before = InstrumentedQueuePool.stats.snapshot()
+    try:
+        with engine.connect():
+            status = pool_status(engine.pool)
+            assert status["checked_out"] == 1
+            assert status["size"] == 1
+
+            # The only connection is taken: the next checkout waits, then gives up
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        after = pool_status(engine.pool)
+    finally:
+        engine.dispose()
+
+    assert after["checked_out"] == 0
+    assert after["checkouts"] == before["checkouts"] + 1
+    assert after["timeouts"] == before["timeouts"] + 1
+    assert after["wait_seconds_max"] >= 0
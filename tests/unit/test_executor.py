@@ -0,0 +1,86 @@
+# tests/unit/test_executor.py
+import asyncio
+import os
+
+import pytest
+
+from app.core import executor
+from app.core.calculation_factory import OPERATION_REGISTRY, BaseOperation, CalculationTooExpensive
+from app.core.executor import HeavyLane, HeavyLaneBroken, HeavyLaneBusy, HeavyLaneTimeout
+
+
+@pytest.fixture
+def lane():
+    lane = HeavyLane(max_workers=1, max_queue=0, timeout=30)
+    yield lane
+    lane.shutdown()
+
+
+def test_heavy_lane_computes_in_worker_process(lane):
+    assert lane.run(10, 0, "factorial") == 3628800
+    # Domain errors raised in the worker come back unchanged
+    with pytest.raises(ValueError):
+        lane.run(-1, 0, "factorial")
+
+
+def test_heavy_lane_rejects_when_full(lane):
+    lane._slots.acquire()
+    try:
+        with pytest.raises(HeavyLaneBusy):
+            lane.run(5, 0, "factorial")
+    finally:
+        lane._slots.release()
+    assert lane.stats()["rejected"] == 1
+
+
+def test_heavy_lane_timeout(lane):
+    # The first call has to start a worker, so it cannot finish in 0s
+    with pytest.raises(HeavyLaneTimeout):
+        lane.run(5, 0, "factorial", timeout=0)
+    assert lane.stats()["timeouts"] == 1
+
+
+def test_run_calculation_lanes(monkeypatch, lane):
+    monkeypatch.setattr(executor, "PROCESS_POOL_ENABLED", True)
+    monkeypatch.setattr(executor, "heavy_lane", lane)
+
+    # Cheap operations never touch the pool, nor does float power
+    assert executor.run_calculation(2, 3, "add") == 5
+    assert executor.run_calculation(2, 10, "power") == 1024
+    assert lane._executor is None
+    with pytest.raises(CalculationTooExpensive):
+        executor.run_calculation(10, 1e9, "power")
+
+    assert executor.run_calculation(5, 0, "factorial") == 120
+    assert lane._executor is not None
+
+    # Over-budget operands are refused before taking a slot
+    with pytest.raises(CalculationTooExpensive):
+        executor.run_calculation(1e6, 0, "factorial")
+
+
+def test_heavy_lane_run_async(lane):
+    assert asyncio.run(lane.run_async(10, 0, "factorial")) == 3628800
+    with pytest.raises(HeavyLaneTimeout):
+        asyncio.run(lane.run_async(200, 0, "factorial", timeout=0))
+    assert lane.stats()["timeouts"] == 1
+
+
+class _CrashOperation(BaseOperation):
+    def compute(self, a: float, b: float) -> float:
+        os._exit(1)
+
+
+def test_heavy_lane_recovers_from_a_dead_worker(monkeypatch, lane):
+    # Workers are forked after this, so they see the operation too
+    monkeypatch.setitem(OPERATION_REGISTRY, "crash", _CrashOperation())
+
+    with pytest.raises(HeavyLaneBroken):
+        lane.run(0, 0, "crash")
+    assert lane.stats()["broken"] == 1
+    # The next call gets a fresh pool
+    assert lane.run(5, 0, "factorial") == 120
+
+    with pytest.raises(HeavyLaneBroken):
+        asyncio.run(lane.run_async(0, 0, "crash"))
+    assert asyncio.run(lane.run_async(5, 0, "factorial")) == 120
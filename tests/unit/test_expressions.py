@@ -0,0 +1,63 @@
+# tests/unit/test_expressions.py
+import math
+
+import pytest
+
+from app.core.expressions import Const, ExpressionError, compile_expression
+
+
+def test_operator_precedence_and_associativity():
+    assert compile_expression("1 + 2 * 3").evaluate_many({}) == ([7], [None])
+    assert compile_expression("2 ^ 3 ^ 2").evaluate_many({}) == ([512], [None])
+    assert compile_expression("-2 ^ 2").evaluate_many({}) == ([-4], [None])
+    assert compile_expression("(7 - 1) // 4 % 5").evaluate_many({}) == ([1], [None])
+
+
+def test_function_calls_use_registry_operations():
+    results, errors = compile_expression("log(x, 10) + factorial(3) + absdiff(1, 4)").evaluate_many(
+        {"x": [100]}
+    )
+    assert errors == [None]
+    assert math.isclose(results[0], 2 + 6 + 3)
+
+
+def test_vector_evaluation_with_per_row_errors():
+    plan = compile_expression("sqrt(a - b) / b")
+    results, errors = plan.evaluate_many({"a": [10, 1, 8], "b": [1, 2, 0]})
+
+    assert results == [3, None, None]
+    assert errors[0] is None
+    assert "Square root" in errors[1]
+    assert "Division by zero" in errors[2]
+
+
+def test_compiled_plans_are_cached():
+    assert compile_expression("a * b + 1") is compile_expression("a * b + 1")
+    assert compile_expression("a * b + 1").variables == ["a", "b"]
+
+
+@pytest.mark.parametrize("text", ["", "1 +", "(1", "1 2", "nope(1)", "2 $ 3"])
+def test_invalid_expressions(text):
+    with pytest.raises(ExpressionError):
+        compile_expression(text)
+
+
+def test_deep_nesting_is_rejected():
+    assert compile_expression("(" * 40 + "1" + ")" * 40).output == Const(1.0)
+    for text in ("(" * 200 + "1" + ")" * 200, "-" * 200 + "1", "a" + " ^ a" * 120):
+        with pytest.raises(ExpressionError):
+            compile_expression(text)
+
+
+def test_non_finite_and_non_real_results_are_row_errors():
+    results, errors = compile_expression("a * 1e308 * 10").evaluate_many({"a": [0, 1]})
+    assert results == [0, None]
+    assert "finite" in errors[1]
+
+
+def test_missing_or_mismatched_variables():
+    plan = compile_expression("a + b")
+    with pytest.raises(ExpressionError):
+        plan.evaluate_many({"a": [1]})
+    with pytest.raises(ExpressionError):
+        plan.evaluate_many({"a": [1, 2], "b": [1]})
@@ -0,0 +1,63 @@
+# tests/unit/test_hashing.py
+import asyncio
+
+import pytest
+
+from app.core.hashing import HashingBusy, HashingPool
+from app.core.security import get_password_hash, verify_password
+
+
+@pytest.fixture
+def pool():
+    pool = HashingPool(max_workers=1, max_concurrency=1, max_queue=0)
+    yield pool
+    pool.shutdown()
+
+
+def test_hashing_pool_hashes_in_worker_process(pool):
+    async def scenario():
+        hashed = await pool.run(get_password_hash, "secret123")
+        return hashed, await pool.run(verify_password, "secret123", hashed)
+
+    hashed, ok = asyncio.run(scenario())
+    assert hashed != "secret123" and ok
+    assert pool._executor is not None
+    stats = pool.stats()
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+
+
+def test_hashing_pool_rejects_when_queue_full(pool):
+    async def scenario():
+        await pool._semaphore.acquire()
+        try:
+            with pytest.raises(HashingBusy):
+                await pool.run(get_password_hash, "secret123")
+        finally:
+            pool._semaphore.release()
+
+    asyncio.run(scenario())
+    assert pool.stats()["rejected"] == 1
+
+
+def test_hashing_pool_queues_up_to_limit():
+    pool = HashingPool(max_workers=1, max_concurrency=1, max_queue=2)
+
+    async def scenario():
+        hashes = await asyncio.gather(*(pool.run(get_password_hash, f"pw{i}") for i in range(3)))
+        return [verify_password(f"pw{i}", h) for i, h in enumerate(hashes)]
+
+    try:
+        assert asyncio.run(scenario()) == [True, True, True]
+        stats = pool.stats()
+        assert stats["peak_queued"] == 2
+        assert stats["rejected"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_hashing_pool_disabled_uses_threadpool():
+    pool = HashingPool(max_workers=1, max_concurrency=1, max_queue=0, enabled=False)
+    hashed = asyncio.run(pool.run(get_password_hash, "secret123"))
+    assert verify_password("secret123", hashed)
+    assert pool._executor is None
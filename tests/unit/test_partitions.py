@@ -0,0 +1,28 @@
+# tests/unit/test_partitions.py
+import pytest
+
+from app.db import partitions
+
+
+def test_partition_ranges(monkeypatch):
+    monkeypatch.setattr(partitions, "PARTITION_SIZE", 1000)
+
+    assert partitions.partition_index(0) == 0
+    assert partitions.partition_index(999) == 0
+    assert partitions.partition_index(1000) == 1
+    assert partitions.partition_bounds(3) == (3000, 4000)
+    assert partitions.partition_name(3) == "calculations_p000003"
+
+
+def test_partition_table_options(monkeypatch):
+    monkeypatch.setattr(partitions, "PARTITIONED", False)
+    assert partitions.partition_table_options() == {}
+
+    monkeypatch.setattr(partitions, "PARTITIONED", True)
+    assert partitions.partition_table_options() == {"postgresql_partition_by": "RANGE (id)"}
+
+
+def test_archive_refuses_foreign_table_names():
+    # Checked before any SQL runs, so no connection is needed
+    with pytest.raises(ValueError):
+        partitions.archive_table(None, 'users"; DROP TABLE users; --')
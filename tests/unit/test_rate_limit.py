@@ -0,0 +1,54 @@
+# tests/unit/test_rate_limit.py
+import pytest
+
+from app.core.rate_limit import AuthRateLimiter, InMemoryBackend, RateLimited
+
+
+def test_bucket_allows_burst_then_refills():
+    backend = InMemoryBackend(max_keys=100)
+    # 3 tokens, one per second
+    assert [backend.take("k", 1.0, 3, now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert backend.take("k", 1.0, 3, now=0.0) == pytest.approx(1.0)
+    assert backend.take("k", 1.0, 3, now=0.5) == pytest.approx(0.5)
+    assert backend.take("k", 1.0, 3, now=1.0) == 0.0
+
+
+def test_full_idle_buckets_are_evicted():
+    backend = InMemoryBackend(max_keys=100)
+    backend.take("a", 1.0, 2, now=0.0)
+    backend.take("b", 1.0, 2, now=0.5)
+    # "a" is full again at t=1, "b" only at t=1.5
+    backend.take("c", 1.0, 2, now=1.2)
+    assert backend.stats()["keys"] == 2
+    assert backend.evicted == 1
+
+
+def test_max_keys_drops_least_recently_used():
+    backend = InMemoryBackend(max_keys=2)
+    for i, key in enumerate("abc"):
+        backend.take(key, 1.0, 5, now=float(i) / 100)
+    assert backend.stats()["keys"] == 2
+    assert "a" not in backend._buckets
+
+
+def test_auth_rate_limiter_ip_and_account():
+    limiter = AuthRateLimiter(InMemoryBackend(100), 2, 60, 1, 60)
+    limiter.check_ip("1.2.3.4")
+    limiter.check_ip("1.2.3.4")
+    with pytest.raises(RateLimited) as e:
+        limiter.check_ip("1.2.3.4")
+    assert 0 < e.value.retry_after <= 1
+    limiter.check_ip("5.6.7.8")
+
+    limiter.check_account("Someone@Example.com")
+    with pytest.raises(RateLimited):
+        limiter.check_account(" someone@example.com")
+    assert limiter.stats()["limited_ip"] == 1
+    assert limiter.stats()["limited_account"] == 1
+
+
+def test_auth_rate_limiter_disabled():
+    limiter = AuthRateLimiter(InMemoryBackend(100), 1, 1, 1, 1, enabled=False)
+    for _ in range(5):
+        limiter.check_ip("1.2.3.4")
+        limiter.check_account("someone@example.com")
@@ -0,0 +1,95 @@
+# tests/unit/test_result_cache.py
+import asyncio
+import math
+
+import pytest
+
+from app.core.calculation_factory import perform_calculation
+from app.core.result_cache import ResultCache
+
+
+class CountingCompute:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, a, b, calc_type):
+        self.calls += 1
+        return perform_calculation(a, b, calc_type)
+
+
+def test_cache_hit_skips_compute():
+    cache = ResultCache(max_bytes=1_000_000, ttl_seconds=60)
+    compute = CountingCompute()
+
+    assert cache.get_or_compute(2, 3, "add", compute) == 5
+    assert cache.get_or_compute(2, 3, "ADD", compute) == 5
+    assert compute.calls == 1
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_cache_replays_domain_errors():
+    cache = ResultCache(max_bytes=1_000_000, ttl_seconds=60)
+    compute = CountingCompute()
+
+    for _ in range(3):
+        with pytest.raises(ValueError, match="Division by zero"):
+            cache.get_or_compute(1, 0, "div", compute)
+    assert compute.calls == 1
+
+
+def test_cache_evicts_by_size():
+    # Room for two small results
+    cache = ResultCache(max_bytes=600, ttl_seconds=60)
+    compute = CountingCompute()
+
+    cache.get_or_compute(1, 1, "add", compute)
+    cache.get_or_compute(2, 2, "add", compute)
+    cache.get_or_compute(3, 3, "add", compute)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["current_bytes"] <= 600
+
+    # Least recently used entry (1 + 1) was dropped
+    cache.get_or_compute(1, 1, "add", compute)
+    assert compute.calls == 4
+
+    # Too large to ever fit: computed but not cached
+    cache = ResultCache(max_bytes=300, ttl_seconds=60)
+    assert cache.get_or_compute(170, 0, "factorial", compute) == math.factorial(170)
+    assert cache.get_or_compute(170, 0, "factorial", compute) == math.factorial(170)
+    assert compute.calls == 6
+
+
+def test_cache_ttl_and_bypass():
+    cache = ResultCache(max_bytes=1_000_000, ttl_seconds=0)
+    compute = CountingCompute()
+    cache.get_or_compute(2, 3, "add", compute)
+    cache.get_or_compute(2, 3, "add", compute)
+    assert compute.calls == 2
+
+    cache = ResultCache(max_bytes=1_000_000, ttl_seconds=60, enabled=False)
+    cache.get_or_compute(2, 3, "add", compute)
+    cache.get_or_compute(2, 3, "add", compute)
+    assert compute.calls == 4
+    assert cache.stats()["entries"] == 0
+
+
+def test_async_cache_shares_entries_with_sync():
+    cache = ResultCache(max_bytes=1_000_000, ttl_seconds=60)
+    compute = CountingCompute()
+
+    async def compute_async(a, b, calc_type):
+        return compute(a, b, calc_type)
+
+    assert cache.get_or_compute(2, 3, "add", compute) == 5
+    assert asyncio.run(cache.get_or_compute_async(2, 3, "add", compute_async)) == 5
+    assert compute.calls == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(cache.get_or_compute_async(1, 0, "div", compute_async))
+    with pytest.raises(ValueError):
+        cache.get_or_compute(1, 0, "div", compute)
+    assert compute.calls == 2
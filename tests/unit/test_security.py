@@ -10,3 +10,48 @@ def test_password_hash_and_verify():
     assert verify_password(password, hash_1)
     assert verify_password(password, hash_2)
     assert not verify_password("wrongpassword", hash_1)
+
+
+def test_choose_bcrypt_rounds():
+    from app.core.security import BCRYPT_MAX_ROUNDS, BCRYPT_MIN_ROUNDS, choose_bcrypt_rounds
+
+    # 10 ms at the floor: 20 ms, 40 ms fit in 50 ms, 80 ms does not
+    assert choose_bcrypt_rounds(0.010, 50) == BCRYPT_MIN_ROUNDS + 2
+    # Slow hardware never goes below the floor
+    assert choose_bcrypt_rounds(0.200, 50) == BCRYPT_MIN_ROUNDS
+    assert choose_bcrypt_rounds(0.000001, 50) == BCRYPT_MAX_ROUNDS
+
+
+def test_configure_password_hashing_uses_saved_cost(monkeypatch, tmp_path):
+    from app.core import security
+
+    saved = security.pwd_context.to_dict()
+    path = str(tmp_path / "password_hash.json")
+    monkeypatch.setattr(security, "BCRYPT_ROUNDS", None)
+    monkeypatch.setattr(security, "PASSWORD_HASH_CONFIG", path)
+    monkeypatch.setattr(security, "calibrate_bcrypt_rounds", lambda: 11)
+    try:
+        # No file yet: calibrate and save
+        assert security.configure_password_hashing() == 11
+        assert security.bcrypt_rounds() == 11
+
+        # A saved cost wins over calibrating again
+        security.save_bcrypt_rounds(10, path, security.PASSWORD_HASH_TARGET_MS)
+        assert security.configure_password_hashing() == 10
+
+        # Hashes below the configured cost are flagged for rehashing
+        old = security.pwd_context.handler("bcrypt").using(rounds=4).hash("secret")
+        ok, new_hash = security.verify_and_update_password("secret", old)
+        assert ok and new_hash.startswith("$2b$10$")
+    finally:
+        security.pwd_context.load(saved)
+
+
+def test_refresh_token_hash_is_keyed_and_stable():
+    from app.core.security import hash_refresh_token, new_refresh_token
+
+    token = new_refresh_token()
+    assert token != new_refresh_token()
+    assert hash_refresh_token(token) == hash_refresh_token(token)
+    assert len(hash_refresh_token(token)) == 64
+    assert token not in hash_refresh_token(token)
@@ -0,0 +1,72 @@
+# tests/unit/test_summary_cache.py
+import asyncio
+
+from app.core.summary_cache import SummaryCache
+from app.schemas.report import ReportSummary
+
+
+class CountingSummary:
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self) -> ReportSummary:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return ReportSummary(total_calculations=self.calls, counts_by_type={})
+
+
+def test_summary_cached_until_version_bump():
+    cache = SummaryCache(ttl_seconds=60)
+    compute = CountingSummary()
+
+    async def scenario():
+        assert (await cache.get(compute)).total_calculations == 1
+        assert (await cache.get(compute)).total_calculations == 1
+        cache.bump()
+        assert (await cache.get(compute)).total_calculations == 2
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == 1 / 3
+
+
+def test_summary_ttl_and_staleness_window():
+    compute = CountingSummary()
+
+    expired = SummaryCache(ttl_seconds=0)
+    asyncio.run(expired.get(compute))
+    asyncio.run(expired.get(compute))
+    assert compute.calls == 2
+
+    # Within the staleness window a bump does not force a recompute
+    relaxed = SummaryCache(ttl_seconds=60, max_staleness=60)
+    asyncio.run(relaxed.get(compute))
+    relaxed.bump()
+    asyncio.run(relaxed.get(compute))
+    assert compute.calls == 3
+
+
+def test_concurrent_misses_are_coalesced():
+    cache = SummaryCache(ttl_seconds=60)
+    compute = CountingSummary(delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get(compute) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+    assert compute.calls == 1
+    assert {r.total_calculations for r in results} == {1}
+    assert cache.stats()["coalesced"] == 9
+
+
+def test_write_during_compute_invalidates_result():
+    cache = SummaryCache(ttl_seconds=60)
+
+    async def compute_with_write():
+        cache.bump()
+        return ReportSummary(total_calculations=0, counts_by_type={})
+
+    asyncio.run(cache.get(compute_with_write))
+    assert cache.stats()["cached_version"] != cache.version
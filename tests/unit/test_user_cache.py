@@ -0,0 +1,39 @@
+# tests/unit/test_user_cache.py
+import time
+
+from app.core.user_cache import CurrentUserCache
+from app.models.user import User
+
+
+def _user(user_id: int) -> User:
+    return User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com")
+
+
+def test_cache_honours_exp_and_size():
+    cache = CurrentUserCache(max_entries=2, ttl_seconds=60)
+    now = time.time()
+    cache.put("expired", {"exp": now - 1}, _user(1), cache.generation)
+    assert cache.get("expired") is None
+
+    for token, user_id in (("a", 1), ("b", 2), ("c", 3)):
+        cache.put(token, {"exp": now + 60}, _user(user_id), cache.generation)
+    assert cache.get("a") is None
+    assert cache.get("c")[0].id == 3
+    assert cache.stats()["entries"] == 2
+
+
+def test_invalidate_user_drops_all_tokens_and_stale_puts():
+    cache = CurrentUserCache(max_entries=10, ttl_seconds=60)
+    claims = {"exp": time.time() + 60}
+    cache.put("t1", claims, _user(1), cache.generation)
+    cache.put("t2", claims, _user(1), cache.generation)
+    cache.put("t3", claims, _user(2), cache.generation)
+
+    generation = cache.generation
+    cache.invalidate_user(1)
+    assert cache.get("t1") is None and cache.get("t2") is None
+    assert cache.get("t3")[0].id == 2
+
+    # A row loaded before the invalidation is not cached
+    cache.put("t4", claims, _user(1), generation)
+    assert cache.get("t4") is None